@@ -18,6 +18,10 @@ module csr_file (
     input wire [31:0] trap_cause, // Exception/Interrupt cause (e.g., 0x80000007 for timer)
     input wire mret_trigger,      // Asserted when executing MRET
 
+    // Performance counter events (one increment per cycle they are high)
+    input wire instret_event,     // An instruction retired (minstret)
+    input wire [3:0] hpm_event,   // mhpmcounter3..6, see below
+
     // Outputs to core control
     output wire [31:0] mtvec_out, // Address to jump to on trap
     output wire [31:0] mepc_out,  // Address to return to on MRET
@@ -40,6 +44,17 @@ module csr_file (
     // mcause (Machine Cause)
     reg [31:0] mcause;
 
+    // Performance counters (64-bit, Zicntr/Zihpm)
+    // mhpmcounter3: load cycles spent in S_MEM_WB (PIPELINE core: load-use interlock cycles)
+    // mhpmcounter4: taken branches and jumps
+    // mhpmcounter5: traps taken (exceptions and interrupts)
+    // mhpmcounter6: debug stall cycles
+    reg [63:0] mcycle;
+    reg [63:0] minstret;
+    reg [63:0] mhpmcounter [3:6];
+    // mcountinhibit: CY (bit 0), IR (bit 2), HPM3..6 (bits 3..6)
+    reg [6:0] mcountinhibit;
+
     // mip (Machine Interrupt Pending) - read-only for software, updated by hardware
     // MTIP (bit 7) mapped to timer_irq, MEIP (bit 11) mapped to ext_irq
     wire [31:0] mip = {20'b0, ext_irq, 3'b0, timer_irq, 7'b0};
@@ -60,6 +75,27 @@ module csr_file (
     localparam CSR_MEPC    = 12'h341;
     localparam CSR_MCAUSE  = 12'h342;
     localparam CSR_MIP     = 12'h344;
+    localparam CSR_MCOUNTINHIBIT = 12'h320;
+
+    // Counter CSRs: mcycle 0xB00, minstret 0xB02, mhpmcounter3..6 0xB03-0xB06,
+    // their upper halves at +0x80 (mcycleh, ...) and read-only shadows at
+    // 0xC00-0xC86 (cycle, instret, hpmcounterN[h]) for rdcycle/rdinstret.
+    wire [2:0] cnt_idx  = csr_addr[2:0];  // 0: cycle, 2: instret, 3..6: hpm
+    wire       cnt_high = csr_addr[7];
+    wire is_counter = (csr_addr[11:8] == 4'hB || csr_addr[11:8] == 4'hC) &&
+                      csr_addr[6:3] == 4'b0 && cnt_idx != 3'd1 && cnt_idx != 3'd7;
+    reg [63:0] cnt_value;
+    always @(*) begin
+        case (cnt_idx)
+            3'd0:    cnt_value = mcycle;
+            3'd2:    cnt_value = minstret;
+            3'd3:    cnt_value = mhpmcounter[3];
+            3'd4:    cnt_value = mhpmcounter[4];
+            3'd5:    cnt_value = mhpmcounter[5];
+            3'd6:    cnt_value = mhpmcounter[6];
+            default: cnt_value = 64'b0;
+        endcase
+    end
 
     // CSR Read
     always @(*) begin
@@ -70,10 +106,51 @@ module csr_file (
             CSR_MEPC:    csr_rdata = mepc;
             CSR_MCAUSE:  csr_rdata = mcause;
             CSR_MIP:     csr_rdata = mip;
-            default:     csr_rdata = 32'b0;
+            CSR_MCOUNTINHIBIT: csr_rdata = {25'b0, mcountinhibit};
+            default:     csr_rdata = is_counter ? (cnt_high ? cnt_value[63:32] : cnt_value[31:0]) : 32'b0;
         endcase
     end
 
+    // Counters: a software write to a machine counter CSR takes precedence
+    // over that cycle's increment; the 0xC.. shadows are read-only.
+    wire cnt_we = csr_we && is_counter && csr_addr[11:8] == 4'hB;
+    integer k;
+    always @(posedge clk or posedge rst) begin
+        if (rst) begin
+            mcycle   <= 64'b0;
+            minstret <= 64'b0;
+            for (k = 3; k <= 6; k = k + 1)
+                mhpmcounter[k] <= 64'b0;
+            mcountinhibit <= 7'b0;
+        end else begin
+            if (cnt_we && cnt_idx == 3'd0) begin
+                if (cnt_high) mcycle[63:32] <= csr_wdata;
+                else          mcycle[31:0]  <= csr_wdata;
+            end else if (!mcountinhibit[0]) begin
+                mcycle <= mcycle + 64'd1;
+            end
+
+            if (cnt_we && cnt_idx == 3'd2) begin
+                if (cnt_high) minstret[63:32] <= csr_wdata;
+                else          minstret[31:0]  <= csr_wdata;
+            end else if (instret_event && !mcountinhibit[2]) begin
+                minstret <= minstret + 64'd1;
+            end
+
+            for (k = 3; k <= 6; k = k + 1) begin
+                if (cnt_we && cnt_idx == k) begin
+                    if (cnt_high) mhpmcounter[k][63:32] <= csr_wdata;
+                    else          mhpmcounter[k][31:0]  <= csr_wdata;
+                end else if (hpm_event[k - 3] && !mcountinhibit[k]) begin
+                    mhpmcounter[k] <= mhpmcounter[k] + 64'd1;
+                end
+            end
+
+            if (csr_we && csr_addr == CSR_MCOUNTINHIBIT)
+                mcountinhibit <= csr_wdata[6:0] & 7'b1111101;
+        end
+    end
+
     // CSR Write and Trap Handling
     always @(posedge clk or posedge rst) begin
         if (rst) begin
@@ -61,6 +61,8 @@ module data_memory(
     end
 
     reg [31:0] raw_cpu_rdata;
+    reg [2:0]  funct3_reg;
+    reg [1:0]  byte_offset_reg;
 
     // 纯同步真双口 RAM 模板
     // 端口 A (CPU)
@@ -70,6 +72,10 @@ module data_memory(
         if (we_mask[2]) mem_b2[word_addr] <= aligned_wdata[23:16];
         if (we_mask[3]) mem_b3[word_addr] <= aligned_wdata[31:24];
         raw_cpu_rdata <= {mem_b3[word_addr], mem_b2[word_addr], mem_b1[word_addr], mem_b0[word_addr]};
+        // Extend with the access that was issued, not whatever is on the
+        // port now (the pipelined core has moved on to the next instruction)
+        funct3_reg <= funct3;
+        byte_offset_reg <= byte_offset;
     end
 
     // 端口 B (JTAG)
@@ -86,17 +92,17 @@ module data_memory(
 
     // 纯组合逻辑：CPU 读数据符号扩展
     always @(*) begin
-        case (funct3)
+        case (funct3_reg)
             3'b010: read_data = raw_cpu_rdata; // LW
-            3'b001: read_data = byte_offset[1] ? {{16{raw_cpu_rdata[31]}}, raw_cpu_rdata[31:16]} : {{16{raw_cpu_rdata[15]}}, raw_cpu_rdata[15:0]}; // LH
-            3'b000: case (byte_offset) // LB
+            3'b001: read_data = byte_offset_reg[1] ? {{16{raw_cpu_rdata[31]}}, raw_cpu_rdata[31:16]} : {{16{raw_cpu_rdata[15]}}, raw_cpu_rdata[15:0]}; // LH
+            3'b000: case (byte_offset_reg) // LB
                         2'b00: read_data = {{24{raw_cpu_rdata[7]}},  raw_cpu_rdata[7:0]};
                         2'b01: read_data = {{24{raw_cpu_rdata[15]}}, raw_cpu_rdata[15:8]};
                         2'b10: read_data = {{24{raw_cpu_rdata[23]}}, raw_cpu_rdata[23:16]};
                         2'b11: read_data = {{24{raw_cpu_rdata[31]}}, raw_cpu_rdata[31:24]};
                     endcase
-            3'b101: read_data = byte_offset[1] ? {16'b0, raw_cpu_rdata[31:16]} : {16'b0, raw_cpu_rdata[15:0]}; // LHU
-            3'b100: case (byte_offset) // LBU
+            3'b101: read_data = byte_offset_reg[1] ? {16'b0, raw_cpu_rdata[31:16]} : {16'b0, raw_cpu_rdata[15:0]}; // LHU
+            3'b100: case (byte_offset_reg) // LBU
                         2'b00: read_data = {24'b0, raw_cpu_rdata[7:0]};
                         2'b01: read_data = {24'b0, raw_cpu_rdata[15:8]};
                         2'b10: read_data = {24'b0, raw_cpu_rdata[23:16]};
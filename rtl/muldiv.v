@@ -0,0 +1,90 @@
+// RV32M unit: MUL/MULH/MULHSU/MULHU in one cycle, DIV/DIVU/REM/REMU with a
+// radix-2 restoring divider (1 setup + 32 iteration cycles, then ready).
+//
+// `start` is held while an M instruction is in execute; `ready` tells the
+// core it can complete. A division runs IDLE -> BUSY -> DONE and stays in
+// DONE until the core acknowledges completion (`ack`) or drops `start`
+// (the instruction was abandoned), so back-to-back divisions restart.
+module muldiv(
+    input wire clk,
+    input wire rst,
+    input wire start,
+    input wire ack,
+    input wire [2:0] funct3,
+    input wire [31:0] operand1,
+    input wire [31:0] operand2,
+    output wire [31:0] result,
+    output wire ready
+);
+
+    localparam F3_MUL    = 3'b000;
+    localparam F3_MULH   = 3'b001;
+    localparam F3_MULHSU = 3'b010;
+
+    localparam IDLE = 2'd0;
+    localparam BUSY = 2'd1;
+    localparam DONE = 2'd2;
+
+    // --- Multiplier: 33x33 signed product, signs extended per funct3 ---
+    wire op1_signed = (funct3 == F3_MULH) || (funct3 == F3_MULHSU);
+    wire op2_signed = (funct3 == F3_MULH);
+    wire signed [32:0] mul_a = {op1_signed & operand1[31], operand1};
+    wire signed [32:0] mul_b = {op2_signed & operand2[31], operand2};
+    wire signed [65:0] product = mul_a * mul_b;
+    wire [31:0] mul_result = (funct3 == F3_MUL) ? product[31:0] : product[63:32];
+
+    // --- Divider: unsigned magnitudes, signs fixed up at the end ---
+    wire is_div = funct3[2];
+    wire div_signed = !funct3[0];                 // DIV / REM
+    wire [31:0] abs1 = (div_signed && operand1[31]) ? -operand1 : operand1;
+    wire [31:0] abs2 = (div_signed && operand2[31]) ? -operand2 : operand2;
+
+    reg [1:0]  state;
+    reg [4:0]  count;
+    reg [31:0] quotient;      // shifts the dividend out as quotient bits come in
+    reg [31:0] remainder;
+    reg [31:0] divisor;
+    reg        neg_quotient, neg_remainder, want_remainder;
+
+    wire [32:0] shifted = {remainder, quotient[31]};
+    wire [33:0] diff = {1'b0, shifted} - {2'b0, divisor};
+    wire fits = !diff[33];
+
+    always @(posedge clk or posedge rst) begin
+        if (rst) begin
+            state <= IDLE;
+        end else if (!start) begin
+            state <= IDLE;
+        end else begin
+            case (state)
+                IDLE: if (is_div) begin
+                    quotient       <= abs1;
+                    remainder      <= 32'b0;
+                    divisor        <= abs2;
+                    // Division by zero: quotient all ones (-1), remainder the dividend
+                    neg_quotient   <= div_signed && (operand1[31] ^ operand2[31]) && operand2 != 32'b0;
+                    neg_remainder  <= div_signed && operand1[31];
+                    want_remainder <= funct3[1];
+                    count          <= 5'd0;
+                    state          <= BUSY;
+                end
+                BUSY: begin
+                    remainder <= fits ? diff[31:0] : shifted[31:0];
+                    quotient  <= {quotient[30:0], fits};
+                    count     <= count + 5'd1;
+                    if (count == 5'd31)
+                        state <= DONE;
+                end
+                DONE: if (ack) state <= IDLE;
+                default: state <= IDLE;
+            endcase
+        end
+    end
+
+    wire [31:0] div_result = want_remainder ? (neg_remainder ? -remainder : remainder)
+                                            : (neg_quotient  ? -quotient  : quotient);
+
+    assign ready  = !is_div || state == DONE;
+    assign result = is_div ? div_result : mul_result;
+
+endmodule
@@ -1,4 +1,10 @@
-module riscv_core(
+module riscv_core #(
+	// 0: multi-cycle FSM (S_FETCH -> S_EXEC [-> S_MEM_WB]), 2 cycles per
+	//    instruction, 3 per load and 35 per division.
+	// 1: 3-stage pipeline (fetch / decode-execute / writeback), about 1 cycle
+	//    per instruction; see "3-STAGE PIPELINE" below.
+	parameter PIPELINE = 0
+) (
 	input wire clk,
 	input wire rst,
 	output wire timer_interrupt,
@@ -39,9 +45,15 @@ module riscv_core(
 	// Note: 0x80001000 is used as the data section address by pre-compiled ISA tests
 	// (linked at 0x00000000, data ALIGN(0x1000)). Using 0x80002000 avoids collisions.
 	localparam TOHOST_ADDR = 32'h80002000;
+	// HTIF-style reply mailbox (scripts/htif.py): the program clears it with a
+	// store and polls it with loads; simulation hosts set it hierarchically.
+	localparam FROMHOST_ADDR = 32'h80002004;
 
 	// Datapath signals
+	// pc_current is the PC of the instruction being executed; fetch_pc is the
+	// instruction_memory fetch address (the same register in the FSM).
 	wire [31:0] pc_current, pc_next, pc_plus_4, pc_branch;
+	wire [31:0] fetch_pc;
 
 	// Debug stall state: CPU is halted whenever debug_stall is asserted.
 	// JTAG clears it by driving debug_stall=0 (typically via DEBUG_RESET command).
@@ -55,6 +67,7 @@ module riscv_core(
 	wire [31:0] imm_extended;
 	wire [31:0] alu_result, alu_operand2;
 	wire [31:0] reg_read_data1, reg_read_data2;
+	wire [31:0] rs1_data, rs2_data;       // register operands after forwarding
 	wire [31:0] mem_read_data;
 	wire [31:0] write_back_data;
 
@@ -79,14 +92,17 @@ module riscv_core(
 	wire is_ecall  = is_system && (funct3 == 3'b000) && (instruction[31:20] == 12'h000);
 	wire is_ebreak = is_system && (funct3 == 3'b000) && (instruction[31:20] == 12'h001);
 
+	// RV32M decode (OP with funct7 = 0000001), executed by muldiv
+	wire is_muldiv = (opcode == OPCODE_R_TYPE) && (instruction[31:25] == 7'b0000001);
+
 	// CSR Data path
 	wire [31:0] csr_rdata;
 	reg  [31:0] csr_wdata;
 	always @(*) begin
 		case (funct3)
-			3'b001: csr_wdata = reg_read_data1; // CSRRW
-			3'b010: csr_wdata = csr_rdata | reg_read_data1; // CSRRS
-			3'b011: csr_wdata = csr_rdata & ~reg_read_data1; // CSRRC
+			3'b001: csr_wdata = rs1_data; // CSRRW
+			3'b010: csr_wdata = csr_rdata | rs1_data; // CSRRS
+			3'b011: csr_wdata = csr_rdata & ~rs1_data; // CSRRC
 			3'b101: csr_wdata = {27'b0, rs1}; // CSRRWI (rs1 field is zimm)
 			3'b110: csr_wdata = csr_rdata | {27'b0, rs1}; // CSRRSI
 			3'b111: csr_wdata = csr_rdata & ~{27'b0, rs1}; // CSRRCI
@@ -94,7 +110,7 @@ module riscv_core(
 		endcase
 	end
 
-	wire csr_we = is_csr && instruction_done && (funct3[1:0] != 2'b00 || rs1 != 5'b0); // don't write if rs1=0 for RS/RC
+	wire csr_we = is_csr && instruction_done && !stall && (funct3[1:0] == 2'b01 || rs1 != 5'b0); // don't write if rs1=0 for RS/RC
 
 	// Exception / Interrupt Logic
 	wire timer_irq_internal = timer_interrupt_internal;
@@ -109,13 +125,17 @@ module riscv_core(
 	wire interrupt_pending = mstatus_mie && ( (mie_mtie && mip_mtip) || (mie_meie && mip_meip) );
 	
 	// We take a trap when we are at S_FETCH (before executing a new instruction) and an interrupt is pending,
-	// OR when we finish executing an ECALL/EBREAK
-	wire trap_trigger = (cpu_state == S_FETCH && interrupt_pending) || (instruction_done && (is_ecall || is_ebreak));
+	// OR when we finish executing an ECALL/EBREAK. A debug-halted core (stalled in S_FETCH) takes no
+	// interrupt: mepc/mstatus must not be rewritten on every stalled cycle.
+	// PIPELINE: the interrupt is taken instead of executing the valid instruction in X.
+	wire irq_take = PIPELINE ? (x_valid && interrupt_pending && !stall)
+	                         : (cpu_state == S_FETCH && interrupt_pending && !stall);
+	wire trap_trigger = irq_take || (instruction_done && (is_ecall || is_ebreak));
 	wire mret_trigger = instruction_done && is_mret;
 	
-	wire [31:0] trap_pc = (cpu_state == S_FETCH && interrupt_pending) ? pc_current : pc_current; // for ecall it's pc_current
-	wire [31:0] trap_cause = (cpu_state == S_FETCH && interrupt_pending && mie_meie && mip_meip) ? 32'h8000000B : // Machine external int
-	                         (cpu_state == S_FETCH && interrupt_pending && mie_mtie && mip_mtip) ? 32'h80000007 : // Machine timer int
+	wire [31:0] trap_pc = pc_current; // interrupted instruction, or the ECALL/EBREAK itself
+	wire [31:0] trap_cause = (irq_take && mie_meie && mip_meip) ? 32'h8000000B : // Machine external int
+	                         (irq_take && mie_mtie && mip_mtip) ? 32'h80000007 : // Machine timer int
 	                         is_ecall ? 32'd11 : // Environment call from M-mode
 	                         is_ebreak ? 32'd3 : // Breakpoint
 	                         32'd0;
@@ -136,8 +156,9 @@ module riscv_core(
 	wire is_timer_access = (alu_result >= 32'hFFFF0000) && (alu_result <= 32'hFFFF000F);
 	wire is_gpio_access = (alu_result >= 32'hFFFF0010) && (alu_result <= 32'hFFFF001F);
 	wire is_tohost_access = (alu_result == TOHOST_ADDR);
-	wire is_instr_mem_access = (alu_result[31:15] == 17'h1_0000);
-	wire is_data_mem_access = !(is_timer_access || is_gpio_access || is_tohost_access || is_instr_mem_access);
+	wire is_fromhost_access = (alu_result == FROMHOST_ADDR);
+	wire is_instr_mem_access = (alu_result[31:15] == 17'h1_0000) && !is_fromhost_access;
+	wire is_data_mem_access = !(is_timer_access || is_gpio_access || is_tohost_access || is_fromhost_access || is_instr_mem_access);
 	
 
 
@@ -151,11 +172,11 @@ module riscv_core(
 
     reg [1:0] cpu_state;
 
-    
+    // (PIPELINE: unused, stays in S_FETCH)
     always @(posedge clk or posedge rst) begin
         if (rst) begin
             cpu_state <= S_FETCH;
-        end else if (!cpu_stall) begin
+        end else if (!cpu_stall && !PIPELINE) begin
             if (trap_trigger || mret_trigger) begin
                 cpu_state <= S_FETCH; // reset to fetch after trap/mret
             end else begin
@@ -163,7 +184,7 @@ module riscv_core(
                     S_FETCH:  if (!interrupt_pending) cpu_state <= S_EXEC;
                     S_EXEC:   if (opcode == OPCODE_I_TYPE_LOAD) 
                                   cpu_state <= S_MEM_WB;
-                              else 
+                              else if (!muldiv_wait) // divisions stay in S_EXEC until muldiv is ready
                                   cpu_state <= S_FETCH;
                     S_MEM_WB: cpu_state <= S_FETCH;
                     default:  cpu_state <= S_FETCH;
@@ -173,14 +194,111 @@ module riscv_core(
     end
 
 
-    // 指令完成标志
+    // 指令完成标志 (PIPELINE: the instruction in X executes this cycle)
     wire is_load = (opcode == OPCODE_I_TYPE_LOAD);
-    wire instruction_done = (cpu_state == S_EXEC && !is_load) || (cpu_state == S_MEM_WB);
+    wire instruction_done = PIPELINE ? x_exec
+                                     : ((cpu_state == S_EXEC && !is_load && !muldiv_wait) || (cpu_state == S_MEM_WB));
 
     // 【核心】覆盖原有的控制信号
     wire real_pc_stall  = stall || (!instruction_done && !trap_trigger && !mret_trigger); //  trap/mret 强制放行 PC 更新
     wire real_reg_write = reg_write && instruction_done && !is_ecall && !is_ebreak && !is_mret; // SYSTEM 指令不一定写寄存器 // 只有指令最后 1 周期才写寄存器
-    wire real_mem_write = mem_write && (cpu_state == S_EXEC); // 写内存只在 EXEC 阶段触发 1 次
+    wire real_mem_write = mem_write && (PIPELINE ? instruction_done : (cpu_state == S_EXEC)); // 写内存只在 EXEC 阶段触发 1 次
+
+	// ==========================================
+	// 3-STAGE PIPELINE (PIPELINE=1)
+	// ==========================================
+	// F: fetch_pc addresses instruction_memory; its output register holds
+	//    the instruction when it reaches X.
+	// X: decode, register read, ALU, branch resolution, loads/stores issued
+	//    to the BRAMs, CSR access, traps and mret. Everything except the
+	//    register write happens here, so an instruction leaving X has
+	//    committed and traps are precise without cancelling W.
+	// W: register write. Load data comes from the BRAM output registers of
+	//    data_memory/instruction_memory; other results were computed in X.
+	// Hazards:
+	//  * W -> X forwarding of every result computed in X;
+	//  * load-use interlock: an instruction in X that reads the rd of a
+	//    memory load in W waits one cycle (x_hold) and reads the register
+	//    file after the write, rather than forwarding from the BRAM output;
+	//  * divisions hold X (x_hold) until muldiv is ready;
+	//  * taken branches, jumps, traps and mret redirect fetch from X and
+	//    squash the fetch in flight (one bubble);
+	//  * debug stall: X does not execute, W drains, and fetch rewinds to the
+	//    instruction in X, so a halted core has nothing in flight and pc_reg
+	//    holds the next PC, as in S_FETCH.
+	// With PIPELINE = 0 the X and W registers below are held at their reset
+	// values (x_valid = 0, x_hold = 0), so the FSM build carries none of them.
+	reg        x_valid;
+	reg [31:0] pc_x;
+	reg        w_valid, w_reg_write, w_from_dmem, w_from_imem;
+	reg [4:0]  w_rd;
+	reg [31:0] w_result;
+
+	wire uses_rs1 = !(opcode == OPCODE_LUI || opcode == OPCODE_AUIPC || opcode == OPCODE_JAL);
+	wire uses_rs2 = (opcode == OPCODE_R_TYPE || opcode == OPCODE_S_TYPE || opcode == OPCODE_B_TYPE);
+	wire w_late = w_from_dmem || w_from_imem;          // value only exists in W
+	wire w_fwd = PIPELINE && w_reg_write && w_rd != 5'b0;
+	wire load_use = w_fwd && w_late && x_valid &&
+	                ((uses_rs1 && rs1 == w_rd) || (uses_rs2 && rs2 == w_rd));
+	wire x_exec = x_valid && !stall && !interrupt_pending && !load_use && !muldiv_wait;
+	wire x_hold = PIPELINE && (load_use || (x_valid && muldiv_wait)) && !stall && !irq_take;
+	wire redirect = trap_trigger || mret_trigger || (instruction_done && (jump || take_branch));
+
+	assign rs1_data = (w_fwd && !w_late && w_rd == rs1) ? w_result : reg_read_data1;
+	assign rs2_data = (w_fwd && !w_late && w_rd == rs2) ? w_result : reg_read_data2;
+
+	wire [31:0] w_data = w_from_dmem ? mem_read_data_from_data_mem :
+	                     w_from_imem ? mem_read_data_from_instr_mem :
+	                     w_result;
+
+	wire [31:0] fetch_next = stall    ? (x_valid ? pc_x : fetch_pc) : // debug halt: rewind to X
+	                         redirect ? pc_next :
+	                         fetch_pc + 32'd4;
+
+	always @(posedge clk or posedge rst) begin
+		if (rst) begin
+			x_valid <= 1'b0;
+			pc_x    <= 32'h80000000;
+		end else if (!PIPELINE || stall || redirect) begin
+			x_valid <= 1'b0;
+		end else if (!x_hold) begin
+			x_valid <= 1'b1;
+			pc_x    <= fetch_pc;
+		end
+	end
+
+	always @(posedge clk or posedge rst) begin
+		if (rst) begin
+			w_valid     <= 1'b0;
+			w_reg_write <= 1'b0;
+			w_from_dmem <= 1'b0;
+			w_from_imem <= 1'b0;
+			w_rd        <= 5'b0;
+			w_result    <= 32'b0;
+		end else if (PIPELINE) begin
+			w_valid     <= instruction_done && !trap_trigger;
+			w_reg_write <= real_reg_write;
+			w_from_dmem <= is_load && is_data_mem_access;
+			w_from_imem <= is_load && is_instr_mem_access;
+			w_rd        <= rd;
+			w_result    <= write_back_data;
+		end
+	end
+
+	// W copies of the committed instruction, only for the commit interface below
+	reg [31:0] w_pc, w_insn, w_mem_addr, w_mem_data;
+	reg        w_mem_write;
+	reg [1:0]  w_mem_size;
+	always @(posedge clk) begin
+		if (PIPELINE) begin
+			w_pc        <= pc_current;
+			w_insn      <= instruction;
+			w_mem_write <= real_mem_write;
+			w_mem_addr  <= alu_result;
+			w_mem_data  <= rs2_data;
+			w_mem_size  <= funct3[1:0];
+		end
+	end
 
 	// Read/write enable signals for each component
 	wire data_mem_read_enable = mem_read && is_data_mem_access;
@@ -199,16 +317,18 @@ module riscv_core(
 	pc_register pc_reg(
 		.clk(clk),
 		.rst(rst),
-		.stall(real_pc_stall),
-		.pc_in(pc_next),
-		.pc_out(pc_current)
+		.stall(PIPELINE ? x_hold : real_pc_stall),
+		.pc_in(PIPELINE ? fetch_next : pc_next),
+		.pc_out(fetch_pc)
 	);
+	assign pc_current = PIPELINE ? pc_x : fetch_pc;
 
 	// 2. Instruction Memory
+	// (PIPELINE: while X is held the BRAM re-reads X's instruction)
 	wire [31:0] mem_read_data_from_instr_mem;
 	instruction_memory instr_mem(
 		.clk(clk),
-		.address(pc_current),
+		.address(x_hold ? pc_x : fetch_pc),
 		.instruction(instruction),
 		.data_addr(alu_result),
 		.funct3(funct3),
@@ -234,9 +354,9 @@ module riscv_core(
 		.rst(rst),
 		.read_reg1(rs1),
 		.read_reg2(rs2),
-		.write_reg(rd),
-		.write_data(write_back_data),
-		.write_enable(real_reg_write),
+		.write_reg(PIPELINE ? w_rd : rd),
+		.write_data(PIPELINE ? w_data : write_back_data),
+		.write_enable(PIPELINE ? w_reg_write : real_reg_write),
 		.read_data1(reg_read_data1),
 		.read_data2(reg_read_data2),
 		.debug_read_addr(debug_reg_addr),
@@ -263,9 +383,9 @@ module riscv_core(
 	wire [31:0] alu_operand1;
 	assign alu_operand1 = (opcode == OPCODE_AUIPC) ? pc_current :
 		(opcode == OPCODE_LUI) ? 32'b0 :
-		reg_read_data1;
+		rs1_data;
 
-	assign alu_operand2 = alu_src ? imm_extended : reg_read_data2;
+	assign alu_operand2 = alu_src ? imm_extended : rs2_data;
 	alu alu_inst(
 		.operand1(alu_operand1),
 		.operand2(alu_operand2),
@@ -274,11 +394,30 @@ module riscv_core(
 		.zero(alu_zero_flag)
 	);
 
+	// 7b. RV32M Multiply/Divide Unit
+	// Started with the operands of the instruction in execute (PIPELINE: once
+	// no load-use interlock is pending); a division keeps it waiting ~33 cycles.
+	wire [31:0] muldiv_result;
+	wire muldiv_ready;
+	wire muldiv_start = is_muldiv && (PIPELINE ? (x_valid && !load_use) : (cpu_state == S_EXEC));
+	wire muldiv_wait = is_muldiv && !muldiv_ready;
+	muldiv muldiv_inst(
+		.clk(clk),
+		.rst(rst),
+		.start(muldiv_start),
+		.ack(instruction_done && !stall),
+		.funct3(funct3),
+		.operand1(rs1_data),
+		.operand2(rs2_data),
+		.result(muldiv_result),
+		.ready(muldiv_ready)
+	);
+
 	// 8. Data Memory
 	data_memory data_mem(
 		.clk(clk),
 		.address(alu_result),
-		.write_data(reg_read_data2),
+		.write_data(rs2_data),
 		.write_enable(data_mem_write_enable),
 		.read_data(mem_read_data_from_data_mem),
 		.funct3(funct3),
@@ -295,13 +434,21 @@ module riscv_core(
 		.clk(clk),
 		.rst(rst),
 		.address(alu_result),
-		.write_data(reg_read_data2),
+		.write_data(rs2_data),
 		.write_enable(timer_write_enable),
 		.read_data(timer_read_data),
 		.interrupt(timer_interrupt_internal)
 	);
 
-	
+	// Performance counter events
+	wire retire_event = instruction_done && !stall && !trap_trigger; // trapping ECALL/EBREAK do not retire
+	wire [3:0] hpm_event = {
+		stall,                                        // mhpmcounter6: debug stall cycles
+		trap_trigger && !stall,                       // mhpmcounter5: traps taken
+		retire_event && (jump || take_branch),        // mhpmcounter4: taken branches/jumps
+		PIPELINE ? (x_hold && load_use) : (cpu_state == S_MEM_WB && !stall) // mhpmcounter3: load S_MEM_WB cycles (PIPELINE: load-use stalls)
+	};
+
 	// 11. CSR File
 	csr_file csr_inst(
 		.clk(clk),
@@ -316,6 +463,8 @@ module riscv_core(
 		.trap_pc(trap_pc),
 		.trap_cause(trap_cause),
 		.mret_trigger(mret_trigger),
+		.instret_event(retire_event),
+		.hpm_event(hpm_event),
 		.mtvec_out(mtvec_out),
 		.mepc_out(mepc_out),
 		.mstatus_mie(mstatus_mie),
@@ -330,7 +479,7 @@ module riscv_core(
 		.clk(clk),
 		.rst(rst),
 		.address(alu_result),
-		.write_data(reg_read_data2),
+		.write_data(rs2_data),
 		.write_enable(gpio_write_enable),
 		.read_data(gpio_read_data),
 		.gpio_pins(gpio_pins)
@@ -338,16 +487,51 @@ module riscv_core(
 
 	// tohost logic for riscv-tests
 	assign host_write_enable = real_mem_write && (alu_result == TOHOST_ADDR);
-	assign host_data_out = reg_read_data2;
+	assign host_data_out = rs2_data;
+
+	// fromhost mailbox: never written by hardware other than program stores
+	reg [31:0] fromhost;
+	always @(posedge clk or posedge rst) begin
+		if (rst)
+			fromhost <= 32'b0;
+		else if (real_mem_write && is_fromhost_access)
+			fromhost <= rs2_data;
+	end
+
+	// Architectural view for testbenches and debuggers: arch_pc is the PC of
+	// the next instruction to execute; at an arch_boundary every earlier
+	// instruction is complete (S_FETCH; PIPELINE: no register write pending).
+	wire [31:0] arch_pc = PIPELINE ? (x_valid ? pc_x : fetch_pc) : pc_current;
+	wire arch_boundary = PIPELINE ? !w_reg_write : (cpu_state == S_FETCH);
+
+	// Raising debug_stall in a cycle with debug_halt_ok halts the core at an
+	// instruction boundary with arch_pc == debug_halt_pc (tb/uvm DebugTarget).
+	wire debug_halt_ok = PIPELINE ? (!stall && !redirect && !x_hold)
+	                              : ((instruction_done || trap_trigger) && !stall);
+	wire [31:0] debug_halt_pc = PIPELINE ? fetch_pc : pc_next;
+
+	// Commit interface for the testbench trace: one pulse per retired
+	// instruction, in the cycle its register write (if any) happens
+	wire        commit_valid     = PIPELINE ? w_valid : (instruction_done && !trap_trigger && !stall);
+	wire [31:0] commit_pc        = PIPELINE ? w_pc : pc_current;
+	wire [31:0] commit_insn      = PIPELINE ? w_insn : instruction;
+	wire        commit_rd_write  = PIPELINE ? w_reg_write : real_reg_write;
+	wire [4:0]  commit_rd        = PIPELINE ? w_rd : rd;
+	wire [31:0] commit_rd_data   = PIPELINE ? w_data : write_back_data;
+	wire        commit_mem_write = PIPELINE ? (w_valid && w_mem_write) : real_mem_write;
+	wire [31:0] commit_mem_addr  = PIPELINE ? w_mem_addr : alu_result;
+	wire [31:0] commit_mem_data  = PIPELINE ? w_mem_data : rs2_data;
+	wire [1:0]  commit_mem_size  = PIPELINE ? w_mem_size : funct3[1:0];
 
 	// Debug outputs
 	assign timer_interrupt = timer_interrupt_internal;
 	assign debug_stall_status = cpu_stall;
-	assign debug_pc_value = pc_current;
+	assign debug_pc_value = arch_pc;
 
 	// Read data multiplexer
 	assign mem_read_data = is_timer_access ? timer_read_data :
 		is_gpio_access ? gpio_read_data :
+		is_fromhost_access ? fromhost :
 		is_instr_mem_access ? mem_read_data_from_instr_mem :
 		mem_read_data_from_data_mem;
 
@@ -374,7 +558,8 @@ module riscv_core(
 		pc_plus_4;
 
 	// Write back logic
-	assign write_back_data = is_csr ? csr_rdata : jump ? pc_plus_4 : (mem_to_reg ? mem_read_data : alu_result);
+	assign write_back_data = is_csr ? csr_rdata : jump ? pc_plus_4 : mem_to_reg ? mem_read_data :
+		is_muldiv ? muldiv_result : alu_result;
 
 	// Debug trace (simulation only)
 `ifdef SIMULATION
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""Benchmark driver: core CPI and simulator throughput with a regression gate.
+
+Runs the programs of sw/bench (Dhrystone/CoreMark-style kernels,
+memcpy/memset, a branch-heavy kernel and, when FreeRTOS is available, a
+context-switch loop) on the RTL testbench or on scripts/iss.py and records
+per benchmark:
+
+  * cycles / instret / CPI of the measured kernel, read back from the
+    program's `bench_result` record (sw/bench/bench.h) through the
+    testbench's +SIGNATURE dump;
+  * the total simulated cycles (+PERF), wall time and host speed in
+    simulated cycles per second.
+
+RTL runs are cross-checked against the ISS: the kernels' checksums must
+match. Every run is compared with the latest history entry for the same
+simulator and core mode (riscv_core PIPELINE: fsm or pipeline). Cycle, instret and CPI increases beyond --threshold percent, or
+speed drops beyond --speed-threshold percent, fail the run. Passing runs
+are appended to the JSON history, so the baseline is always the last good run.
+
+Usage:
+    python3 scripts/bench.py [--build] [--sim icarus|verilator|iss] [--pipeline 0|1] [dhrystone ...]
+        [--history build/bench_history.json] [--threshold 1] [--speed-threshold 25]
+"""
+import argparse
+import datetime
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import elf_loader
+import htif
+import iss as iss_model
+import perf_report
+import signature
+import sim_cache
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+BENCH_DIR = os.path.join(PROJECT_ROOT, 'sw', 'bench')
+DEFAULT_HISTORY = os.path.join(PROJECT_ROOT, 'build', 'bench_history.json')
+
+BENCH_MAGIC = 0xBE9C0001
+RESULT_FIELDS = ('magic', 'cycles_lo', 'cycles_hi', 'instret_lo', 'instret_hi',
+                 'iterations', 'checksum', 'reserved')
+
+# metric -> +1 if higher is worse, -1 if lower is worse
+GATED = {'cycles': 1, 'instret': 1, 'cpi': 1, 'sim_speed': -1}
+
+
+class BenchError(Exception):
+    pass
+
+
+def find_benchmarks(names=()):
+    """{name: elf path} of the built benchmarks, optionally filtered."""
+    found = {f[:-4]: os.path.join(BENCH_DIR, f)
+             for f in sorted(os.listdir(BENCH_DIR)) if f.endswith('.elf')}
+    if names:
+        missing = [n for n in names if n not in found]
+        if missing:
+            raise BenchError(f"not built: {', '.join(missing)} (run with --build)")
+        found = {n: found[n] for n in names}
+    return found
+
+
+def result_region(elf):
+    """(first data_memory word, word count) of the bench_result record."""
+    sym = next((s for s in elf.symtab if s.name == 'bench_result'), None)
+    if sym is None:
+        raise BenchError('no bench_result symbol')
+    return (sym.value & (elf_loader.MEM_BYTES - 1)) >> 2, max(sym.size // 4, len(RESULT_FIELDS))
+
+
+def decode_result(words):
+    if len(words) < len(RESULT_FIELDS):
+        raise BenchError(f'bench_result has {len(words)} words')
+    r = dict(zip(RESULT_FIELDS, words))
+    if r['magic'] != BENCH_MAGIC:
+        raise BenchError('bench_stop() never ran (bad bench_result magic)')
+    cycles = (r['cycles_hi'] << 32) | r['cycles_lo']
+    instret = (r['instret_hi'] << 32) | r['instret_lo']
+    return {'cycles': cycles, 'instret': instret,
+            'cpi': round(cycles / instret, 4) if instret else None,
+            'iterations': r['iterations'], 'checksum': f"0x{r['checksum']:08x}"}
+
+
+def run_iss(elf_path, max_cycles):
+    sim = iss_model.Iss()
+    elf = sim.load_elf(elf_path)
+    proxy = htif.HostProxy.for_iss(sim, write=lambda text: None)
+    start = time.perf_counter()
+    halt = sim.run(max_cycles=max_cycles)
+    wall = time.perf_counter() - start
+    if proxy.exited:
+        halt.value = proxy.exit_value
+    verdict = sim.verdict(halt)
+    if verdict != 'PASS':
+        raise BenchError(f'ISS: {verdict}')
+    first, count = result_region(elf)
+    result = decode_result(list(sim.words[first:first + count]))
+    result.update(total_cycles=sim.cycles, wall_seconds=round(wall, 3))
+    return result
+
+
+def run_rtl(elf_path, image, simulator, max_cycles, timeout, work_dir):
+    prefix = os.path.join(work_dir, os.path.basename(elf_path)[:-4])
+    elf = elf_loader.load_elf_images(elf_path, prefix)
+    first, count = result_region(elf)
+    sig_path = prefix + '.signature'
+    cmd = sim_cache.run_command(image, simulator) + [
+        f'+TESTFILE={prefix}.mem', f'+DATAFILE={prefix}', f'+MAX_CYCLES={max_cycles}', '+PERF',
+        f'+SIGNATURE={sig_path}', f'+SIG_BEGIN={first:x}', f'+SIG_END={first + count:x}']
+    start = time.perf_counter()
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        raise BenchError(f'simulator timed out after {timeout}s')
+    except OSError as e:
+        raise BenchError(str(e))
+    wall = time.perf_counter() - start
+    output = proc.stdout + proc.stderr
+    lines = output.splitlines()
+    if not any(line.startswith('PASS') for line in lines):
+        raise BenchError('RTL: ' + next((l for l in lines if l.startswith('FAIL')), 'no verdict'))
+    try:
+        result = decode_result(signature.read_words(sig_path))
+    except OSError as e:
+        raise BenchError(f'RTL signature: {e}')
+    runs = perf_report.parse_runs(lines)
+    result.update(total_cycles=runs[-1].get('mcycle') if runs else None, wall_seconds=round(wall, 3))
+    return result
+
+
+def run_benchmark(name, elf_path, options):
+    """Runs one benchmark; returns (name, result dict or None, error or None)."""
+    try:
+        if options['sim'] == 'iss':
+            result = run_iss(elf_path, options['max_cycles'])
+        else:
+            result = run_rtl(elf_path, options['image'], options['sim'], options['max_cycles'],
+                             options['timeout'], options['work_dir'])
+            if options['check']:
+                ref = run_iss(elf_path, options['max_cycles'])
+                if ref['checksum'] != result['checksum']:
+                    raise BenchError(f"checksum {result['checksum']} != ISS {ref['checksum']}")
+    except (BenchError, elf_loader.ElfError, OSError) as e:
+        return name, None, str(e)
+    total, wall = result.get('total_cycles'), result['wall_seconds']
+    result['sim_speed'] = round(total / wall) if total and wall else None
+    return name, result, None
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def core_mode(pipeline):
+    return 'pipeline' if pipeline else 'fsm'
+
+
+def baseline(history, sim, core):
+    # Entries from before the core mode was recorded are FSM runs
+    return next((entry for entry in reversed(history)
+                 if entry.get('sim') == sim and entry.get('core', 'fsm') == core), None)
+
+
+def compare(results, base, threshold, speed_threshold):
+    """Returns (report rows, regression messages) against a baseline entry."""
+    rows, regressions = [], []
+    base_results = base['results'] if base else {}
+    for name, r in sorted(results.items()):
+        old = base_results.get(name, {})
+        row = [name]
+        for metric, worse in GATED.items():
+            new_v, old_v = r.get(metric), old.get(metric)
+            delta = None
+            if new_v is not None and old_v:
+                delta = 100.0 * (new_v - old_v) / old_v
+                limit = speed_threshold if metric == 'sim_speed' else threshold
+                if delta * worse > limit:
+                    regressions.append(f"{name}: {metric} {old_v} -> {new_v} ({delta:+.1f}%)")
+            row.append((new_v, delta))
+        rows.append(row)
+    return rows, regressions
+
+
+def _cell(value, delta, fmt):
+    text = '-' if value is None else format(value, fmt)
+    return text + (f" ({delta:+.1f}%)" if delta is not None and abs(delta) >= 0.05 else '')
+
+
+def print_table(rows):
+    print(f"{'benchmark':<14} {'cycles':>22} {'instret':>22} {'CPI':>16} {'cycles/s':>20}")
+    for name, cycles, instret, cpi, speed in rows:
+        print(f"{name:<14} {_cell(*cycles, 'd'):>22} {_cell(*instret, 'd'):>22} "
+              f"{_cell(*cpi, '.3f'):>16} {_cell(*speed, 'd'):>20}")
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+                             capture_output=True, text=True)
+    except OSError:
+        return None
+    return out.stdout.strip() or None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the sw/bench benchmarks and track them over time.')
+    parser.add_argument('benchmarks', nargs='*', help='benchmarks to run (default: every built one)')
+    parser.add_argument('--build', action='store_true', help='run make -C sw/bench first')
+    parser.add_argument('--sim', default=os.environ.get('SIM', 'icarus'),
+                        choices=sorted(sim_cache.SIMULATORS) + ['iss'],
+                        help='simulator, or iss for scripts/iss.py (default: %(default)s)')
+    parser.add_argument('--pipeline', type=int, choices=(0, 1), default=int(os.environ.get('PIPELINE', 0)),
+                        help='riscv_core PIPELINE mode of the image (default: %(default)s)')
+    parser.add_argument('--vvp-file', help='prebuilt tb_isa_test image (default: build it via sim_cache)')
+    parser.add_argument('--no-check', action='store_true', help='skip the ISS checksum cross-check')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='parallel runs (default 1: parallel runs skew the speed numbers)')
+    parser.add_argument('--max-cycles', type=int, default=5000000, help='cycle limit per benchmark')
+    parser.add_argument('--timeout', type=int, default=1800, help='seconds per RTL run')
+    parser.add_argument('--history', default=DEFAULT_HISTORY, help='JSON history (default: %(default)s)')
+    parser.add_argument('--threshold', type=float, default=1.0,
+                        help='allowed cycles/instret/CPI increase in percent (default: %(default)s)')
+    parser.add_argument('--speed-threshold', type=float, default=25.0,
+                        help='allowed host speed drop in percent (default: %(default)s)')
+    parser.add_argument('--no-record', action='store_true', help='do not append this run to the history')
+    args = parser.parse_args()
+
+    if args.sim == 'iss' and args.pipeline:
+        print('ERROR: the ISS models the FSM core only (drop --pipeline)')
+        sys.exit(2)
+    core = core_mode(args.pipeline)
+
+    if args.build:
+        if subprocess.run(['make', '-C', BENCH_DIR]).returncode != 0:
+            print('ERROR: building sw/bench failed')
+            sys.exit(2)
+    try:
+        benchmarks = find_benchmarks(args.benchmarks)
+    except (BenchError, OSError) as e:
+        print(f"ERROR: {e}")
+        sys.exit(2)
+    if not benchmarks:
+        print('ERROR: no benchmarks built in sw/bench (run with --build)')
+        sys.exit(2)
+
+    image = None
+    if args.sim != 'iss':
+        try:
+            image = sim_cache.build_image(args.sim, args.vvp_file, args.pipeline)
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"ERROR: cannot build the {args.sim} testbench: {e}")
+            sys.exit(2)
+
+    with tempfile.TemporaryDirectory(prefix='bench-') as work_dir:
+        options = {'sim': args.sim, 'image': image, 'max_cycles': args.max_cycles,
+                   'timeout': args.timeout, 'work_dir': work_dir, 'check': not args.no_check}
+        with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+            outcomes = list(pool.map(lambda item: run_benchmark(*item, options), benchmarks.items()))
+
+    results, failed = {}, []
+    for name, result, error in outcomes:
+        if error:
+            failed.append(f"{name}: {error}")
+        else:
+            results[name] = result
+
+    history = load_history(args.history)
+    base = baseline(history, args.sim, core)
+    rows, regressions = compare(results, base, args.threshold, args.speed_threshold)
+    print(f"Benchmarks on {args.sim} ({core})" + (f", baseline {base['timestamp']} ({base.get('commit') or '?'})"
+                                         if base else ', no baseline yet'))
+    print_table(rows)
+    for message in failed:
+        print(f"FAIL: {message}")
+    for message in regressions:
+        print(f"REGRESSION: {message}")
+
+    if not failed and not regressions and not args.no_record:
+        history.append({'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+                        'commit': _git_commit(), 'sim': args.sim, 'core': core,
+                        'results': results})
+        os.makedirs(os.path.dirname(os.path.abspath(args.history)), exist_ok=True)
+        with open(args.history, 'w') as f:
+            json.dump(history, f, indent=1)
+        print(f"Recorded in {args.history}")
+    sys.exit(1 if failed or regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,42 +1,121 @@
-import sys
+"""Converts raw binary images to Verilog $readmemh word files.
+
+This is the single bin-to-mem implementation shared by the Makefile flow,
+`generate_mem_files.sh` and the riscof `mycpu` plugin. Whole images are
+converted in bulk (NumPy when available, `struct.iter_unpack` otherwise),
+and a directory mode converts every test in one process.
+
+Usage:
+    python bin_to_mem.py <input_bin_file> <output_mem_file>
+    python bin_to_mem.py --dir <bin_dir> <mem_dir> [-j N] [--force]
+"""
+import argparse
 import os
+import struct
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; struct is fast enough for test images
+    np = None
+
+
+def bytes_to_words(data):
+    """Returns the little-endian 32-bit words of `data`, zero-padding the tail."""
+    if len(data) % 4:
+        data = bytes(data) + b'\0' * (4 - len(data) % 4)
+    if np is not None:
+        return np.frombuffer(data, dtype='<u4').tolist()
+    return [w for (w,) in struct.iter_unpack('<I', data)]
+
+
+def format_words(words):
+    """Formats words as $readmemh text, one 8-digit hex word per line."""
+    if not words:
+        return ''
+    return ('%08x\n' * len(words)) % tuple(words)
+
 
 def convert_bin_to_mem(bin_file, mem_file):
     """Converts a raw binary file to a Verilog-readable hex memory file."""
     try:
         with open(bin_file, 'rb') as f_in:
-            with open(mem_file, 'w') as f_out:
-                while True:
-                    # Read 4 bytes at a time (32-bit instruction)
-                    word = f_in.read(4)
-                    if not word:
-                        break
-                    # Ensure the word is 4 bytes long, pad with zeros if not
-                    if len(word) < 4:
-                        word = word.ljust(4, b'\0')
-
-                    # Convert to a hex string and write to the output file
-                    # The RISC-V architecture is little-endian
-                    hex_str = "".join(f"{b:02x}" for b in reversed(word))
-                    f_out.write(hex_str + '\n')
+            data = f_in.read()
+        with open(mem_file, 'w') as f_out:
+            f_out.write(format_words(bytes_to_words(data)))
         return True
     except IOError as e:
         print(f"Error during file conversion: {e}")
         return False
 
-def main():
-    if len(sys.argv) != 3:
-        print("Usage: python bin_to_mem.py <input_bin_file> <output_mem_file>")
-        sys.exit(1)
 
-    bin_file = sys.argv[1]
-    mem_file = sys.argv[2]
+def is_up_to_date(src, dst):
+    """True if `dst` exists and is not older than `src`."""
+    try:
+        return os.path.getmtime(dst) >= os.path.getmtime(src)
+    except OSError:
+        return False
+
+
+def _convert_one(pair):
+    return pair, convert_bin_to_mem(*pair)
+
+
+def convert_dir(bin_dir, mem_dir, jobs=1, force=False):
+    """Converts every <bin_dir>/*.bin to <mem_dir>/*.mem.
+
+    Outputs newer than their input are skipped unless `force` is set. With
+    jobs > 1 the conversions are spread over a process pool.
+    Returns (converted, skipped, failed) counts.
+    """
+    os.makedirs(mem_dir, exist_ok=True)
+    todo = []
+    skipped = 0
+    for entry in sorted(os.listdir(bin_dir)):
+        if not entry.endswith('.bin'):
+            continue
+        src = os.path.join(bin_dir, entry)
+        dst = os.path.join(mem_dir, entry[:-len('.bin')] + '.mem')
+        if not force and is_up_to_date(src, dst):
+            skipped += 1
+        else:
+            todo.append((src, dst))
+
+    if jobs > 1 and len(todo) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(_convert_one, todo))
+    else:
+        results = [_convert_one(pair) for pair in todo]
+
+    failed = sum(not ok for _, ok in results)
+    return len(results) - failed, skipped, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert raw binaries to $readmemh .mem files.')
+    parser.add_argument('--dir', action='store_true',
+                        help='treat the arguments as directories and convert every .bin')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='parallel conversions in --dir mode (0 = all cores)')
+    parser.add_argument('--force', action='store_true',
+                        help='in --dir mode, regenerate outputs that are up to date')
+    parser.add_argument('input', help='input .bin file (or directory with --dir)')
+    parser.add_argument('output', help='output .mem file (or directory with --dir)')
+    args = parser.parse_args()
 
-    if not os.path.exists(bin_file):
-        print(f"Error: Input file not found: {bin_file}")
+    if not os.path.exists(args.input):
+        print(f"Error: Input file not found: {args.input}")
         sys.exit(1)
 
-    if not convert_bin_to_mem(bin_file, mem_file):
+    if args.dir:
+        jobs = args.jobs or os.cpu_count() or 1
+        converted, skipped, failed = convert_dir(args.input, args.output, jobs, args.force)
+        print(f"Generated {converted} .mem files in {args.output} "
+              f"({skipped} up to date, {failed} failed)")
+        if failed:
+            sys.exit(1)
+    elif not convert_bin_to_mem(args.input, args.output):
         sys.exit(1)
 
 if __name__ == '__main__':
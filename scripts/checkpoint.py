@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""Architectural checkpoints of riscv_core.
+
+A checkpoint holds everything needed to resume a program at an instruction
+boundary: PC, x1-x31, the csr_file registers and counters, the timer's
+mtime/mtimecmp, the GPIO registers, the fromhost mailbox and both
+memories. It is stored next to a prefix as
+
+  <prefix>.state         $readmemh words in the STATE_FIELDS order, one
+                         `value // name` line each (64-bit values are two
+                         words, low first)
+  <prefix>.mem           instruction memory image
+  <prefix>.b0-3.mem      data_memory byte lanes
+
+so the testbench loads it with four $readmemh calls and the memories use
+the same sparse format as elf_loader.py images.
+
+Checkpoints are taken at the start of an instruction (the core in
+S_FETCH, nothing in flight), either
+
+  * on the RTL: tb_isa_test.v +CHECKPOINT=<prefix> +CHECKPOINT_AT=<cycle>
+    writes the first boundary at or after that cycle (`make checkpoint`);
+  * or on the ISS, which reaches the same point orders of magnitude
+    faster: `checkpoint.py capture`.
+
+and resumed with tb_isa_test.v +RESTORE=<prefix> (hierarchical init before
+the first clock), the cocotb environment (PROGRAM=<prefix>.state; x1-x31
+and data memory go through the debug_* ports) or any ISS-based tool given
+<prefix>.state as its program.
+
+Usage:
+    python3 scripts/checkpoint.py capture <program> <prefix> --cycles N [--console]
+    python3 scripts/checkpoint.py info <prefix>
+    python3 scripts/checkpoint.py diff <prefix_a> <prefix_b>
+"""
+import argparse
+import sys
+
+import elf_loader
+
+VERSION = 1
+MASK = 0xFFFFFFFF
+NOP = 0x00000013
+COUNTERS = ('mcycle', 'minstret', 'mhpmcounter3', 'mhpmcounter4', 'mhpmcounter5', 'mhpmcounter6')
+CSRS = ('mstatus', 'mie', 'mtvec', 'mepc', 'mcause', 'mcountinhibit')
+
+# Word layout of <prefix>.state; tb_isa_test.v uses the same indices (CK_*)
+STATE_FIELDS = (['version', 'pc'] + [f'x{i}' for i in range(32)] + list(CSRS)
+                + [f'{name}{half}' for name in COUNTERS for half in ('', 'h')]
+                + ['mtime', 'mtimeh', 'mtimecmp', 'mtimecmph', 'gpio_data', 'gpio_dir', 'fromhost'])
+
+
+class CheckpointError(Exception):
+    pass
+
+
+class Checkpoint:
+    """Architectural state of one riscv_core hart plus both memories."""
+
+    def __init__(self):
+        self.pc = 0x80000000
+        self.x = [0] * 32
+        self.csrs = dict.fromkeys(CSRS, 0)
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.mtime = 0
+        self.mtimecmp = 0
+        self.gpio_data = 0
+        self.gpio_dir = 0
+        self.fromhost = 0
+        self.imem = {}                 # word index -> word, populated words only
+        self.dmem = bytearray(elf_loader.MEM_BYTES)
+
+    # ------------------------------------------------------------------
+    # Files
+    # ------------------------------------------------------------------
+
+    def state_words(self):
+        values = {'version': VERSION, 'pc': self.pc, 'gpio_data': self.gpio_data,
+                  'gpio_dir': self.gpio_dir, 'fromhost': self.fromhost}
+        values.update((f'x{i}', v) for i, v in enumerate(self.x))
+        values.update(self.csrs)
+        wide = dict(self.counters, mtime=self.mtime, mtimecmp=self.mtimecmp)
+        for name, value in wide.items():
+            values[name] = value
+            values[name + 'h'] = value >> 32
+        return [values[name] & MASK for name in STATE_FIELDS]
+
+    def _set_state_words(self, words):
+        if len(words) < len(STATE_FIELDS):
+            raise CheckpointError(f'state has {len(words)} words, expected {len(STATE_FIELDS)}')
+        get = dict(zip(STATE_FIELDS, words)).get
+        if get('version') != VERSION:
+            raise CheckpointError(f'unsupported checkpoint version {get("version")}')
+
+        def wide(name):
+            return (get(name + 'h') << 32) | get(name)
+
+        self.pc = get('pc')
+        self.x = [0] + [get(f'x{i}') for i in range(1, 32)]
+        self.csrs = {name: get(name) for name in CSRS}
+        self.counters = {name: wide(name) for name in COUNTERS}
+        self.mtime = wide('mtime')
+        self.mtimecmp = wide('mtimecmp')
+        self.gpio_data = get('gpio_data')
+        self.gpio_dir = get('gpio_dir')
+        self.fromhost = get('fromhost')
+
+    def save(self, prefix):
+        """Writes <prefix>.state, <prefix>.mem and <prefix>.b0-3.mem."""
+        with open(prefix + '.state', 'w') as f:
+            f.write('// riscv_core checkpoint (scripts/checkpoint.py)\n')
+            for name, value in zip(STATE_FIELDS, self.state_words()):
+                f.write(f'{value:08x} // {name}\n')
+        imem = bytearray(elf_loader.MEM_BYTES)
+        ranges = []
+        for index, value in self.imem.items():
+            imem[index * 4:index * 4 + 4] = (value & MASK).to_bytes(4, 'little')
+            ranges.append((index * 4, index * 4 + 4))
+        dranges = [(i * 4, i * 4 + 4) for i in range(elf_loader.MEM_WORDS)
+                   if any(self.dmem[i * 4:i * 4 + 4])]
+        paths = elf_loader.image_paths(prefix)
+        with open(paths[0], 'w') as f:
+            f.write(elf_loader.format_instruction_image(imem, elf_loader.merge_ranges(ranges)))
+        dranges = elf_loader.merge_ranges(dranges)
+        for lane, path in enumerate(paths[1:]):
+            with open(path, 'w') as f:
+                f.write(elf_loader.format_data_lane(self.dmem, dranges, lane))
+
+    @classmethod
+    def load(cls, prefix):
+        """Reads a checkpoint saved by save() or by tb_isa_test.v."""
+        if prefix.endswith('.state'):
+            prefix = prefix[:-len('.state')]
+        ckpt = cls()
+        try:
+            state = dict(elf_loader.read_mem(prefix + '.state'))
+            ckpt._set_state_words([state.get(i, 0) for i in range(len(STATE_FIELDS))])
+            ckpt.imem = dict(elf_loader.read_mem(prefix + '.mem'))
+            if elf_loader.data_prefix(prefix + '.mem'):
+                ckpt.dmem = elf_loader.read_data_lanes(prefix)[0]
+        except ValueError as e:
+            raise CheckpointError(f'{prefix}: {e}') from e
+        return ckpt
+
+    # ------------------------------------------------------------------
+    # ISS (scripts/iss.py)
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_iss(cls, iss):
+        """State of an Iss stopped between two instructions."""
+        ckpt = cls()
+        ckpt.pc = iss.pc
+        ckpt.x = list(iss.x)
+        ckpt.csrs = {name: getattr(iss, name) for name in CSRS}
+        # Iss.counter() is the value an instruction would read: mcycle
+        # includes that instruction's own S_FETCH cycle
+        ckpt.counters = {name: iss.counter(index) for name, index
+                         in zip(COUNTERS, (0, 2, 3, 4, 5, 6))}
+        ckpt.counters['mcycle'] = (ckpt.counters['mcycle'] - 1) & 0xFFFFFFFFFFFFFFFF
+        ckpt.mtime = iss.mtime
+        ckpt.mtimecmp = iss.mtimecmp
+        ckpt.gpio_data = iss.gpio_data
+        ckpt.gpio_dir = iss.gpio_dir
+        ckpt.fromhost = iss.fromhost
+        # Everything up to the last non-NOP word: unpopulated words read as
+        # NOP on the ISS, but as X in a freshly loaded instruction_memory
+        last = max((i for i, w in enumerate(iss.imem) if w != NOP), default=-1)
+        ckpt.imem = dict(enumerate(iss.imem[:last + 1]))
+        ckpt.dmem = bytearray(iss.dmem)
+        return ckpt
+
+    def restore_iss(self, iss):
+        """Puts an Iss into this state (memories included)."""
+        for index, value in self.imem.items():
+            iss.imem[index] = value
+        iss.dmem[:] = self.dmem
+        iss.reset()
+        iss.pc = self.pc
+        iss.x[:] = self.x
+        for name, value in self.csrs.items():
+            setattr(iss, name, value)
+        iss.mtimecmp = self.mtimecmp
+        iss.gpio_data = self.gpio_data
+        iss.gpio_dir = self.gpio_dir
+        iss.fromhost = self.fromhost
+        # The ISS derives mtime and the counters from its cycle and
+        # instruction counts; software-written offsets make up the rest
+        iss.cycles = self.mtime
+        iss.instret = self.counters['minstret']
+        for name, index in zip(COUNTERS, (0, 2, 3, 4, 5, 6)):
+            target = self.counters[name] + (1 if index == 0 else 0)
+            iss._counter_offsets[index] = target - iss.counter(index)
+        iss._update_irq()
+
+    # ------------------------------------------------------------------
+
+    def summary(self):
+        lines = [f"pc        0x{self.pc:08x}",
+                 f"mtime     {self.mtime}   mtimecmp {self.mtimecmp}"]
+        lines += [f"{name:<13} {self.counters[name]}" for name in COUNTERS]
+        lines.append('  '.join(f"{name} 0x{self.csrs[name]:08x}" for name in CSRS))
+        lines.append(f"gpio data 0x{self.gpio_data:08x} dir 0x{self.gpio_dir:08x}   "
+                     f"fromhost 0x{self.fromhost:08x}")
+        for row in range(0, 32, 4):
+            lines.append('  '.join(f"x{i:<2} 0x{self.x[i]:08x}" for i in range(row, row + 4)))
+        dwords = sum(1 for i in range(0, len(self.dmem), 4) if any(self.dmem[i:i + 4]))
+        lines.append(f"memories  {len(self.imem)} instruction words, {dwords} non-zero data words")
+        return '\n'.join(lines)
+
+    def diff(self, other):
+        """Differences to `other` as 'name: a != b' strings."""
+        diffs = [f"{name}: 0x{a:08x} != 0x{b:08x}" for name, a, b
+                 in zip(STATE_FIELDS, self.state_words(), other.state_words()) if a != b]
+        imem = [i for i in sorted(set(self.imem) | set(other.imem))
+                if self.imem.get(i) != other.imem.get(i)]
+        if imem:
+            diffs.append(f"instruction memory: {len(imem)} words, first at word 0x{imem[0]:x}")
+        dmem = [i for i in range(0, len(self.dmem), 4) if self.dmem[i:i + 4] != other.dmem[i:i + 4]]
+        if dmem:
+            diffs.append(f"data memory: {len(dmem)} words, first at 0x{dmem[0]:04x}")
+        return diffs
+
+
+def capture(program, prefix, cycles, console=False):
+    """Runs `program` on the ISS for `cycles` and checkpoints it; returns the Checkpoint."""
+    import htif
+    import iss as iss_model
+
+    sim = iss_model.Iss()
+    sim.load(program)
+    if console:
+        def putc(value):
+            sys.stdout.write(chr(value & 0xFF))
+            return False
+        sim.on_tohost = putc
+        proxy = None
+    else:
+        proxy = htif.HostProxy.for_iss(sim)
+    halt = sim.run(max_cycles=cycles, stop_on_self_loop=False)
+    sys.stdout.flush()
+    if halt.reason != 'limit' or (proxy is not None and proxy.exited):
+        raise CheckpointError(f'{program} stopped ({halt.reason}) after {sim.cycles} cycles, '
+                              f'before the checkpoint at cycle {cycles}')
+    ckpt = Checkpoint.from_iss(sim)
+    ckpt.save(prefix)
+    return ckpt
+
+
+def main():
+    parser = argparse.ArgumentParser(description='riscv_core architectural checkpoints.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('capture', help='run a program on the ISS and checkpoint it')
+    p.add_argument('program', help='ELF, .mem or .bin (or a .state to continue from)')
+    p.add_argument('prefix', help='output prefix (<prefix>.state, .mem, .b0-3.mem)')
+    p.add_argument('--cycles', type=int, required=True,
+                   help='checkpoint at the first instruction boundary at or after this cycle')
+    p.add_argument('--console', action='store_true',
+                   help='tohost writes are raw console characters (sw/main.c)')
+    p = sub.add_parser('info', help='print a checkpoint')
+    p.add_argument('prefix')
+    p = sub.add_parser('diff', help='compare two checkpoints, e.g. RTL against ISS')
+    p.add_argument('a')
+    p.add_argument('b')
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'capture':
+            ckpt = capture(args.program, args.prefix, args.cycles, args.console)
+            if args.console:
+                print()
+            print(f"checkpoint {args.prefix}: pc 0x{ckpt.pc:08x} at cycle {ckpt.mtime}, "
+                  f"{ckpt.counters['minstret']} instructions retired")
+        elif args.command == 'info':
+            print(Checkpoint.load(args.prefix).summary())
+        else:
+            diffs = Checkpoint.load(args.a).diff(Checkpoint.load(args.b))
+            for line in diffs:
+                print(line)
+            print('IDENTICAL' if not diffs else f'{len(diffs)} differences')
+            sys.exit(1 if diffs else 0)
+    except (OSError, CheckpointError, elf_loader.ElfError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
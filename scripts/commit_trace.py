@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""Streaming lockstep comparison of commit traces.
+
+Reads the DUT commit trace written by tb_isa_test.v (+TRACE=<path>) next to
+a reference: a spike `--log-commits` log (DUT-spike.log from riscof_spike.py)
+or the in-repo ISS (scripts/iss.py) run on the same program. Both sides are
+generators, so even multi-million-instruction FreeRTOS runs are compared in
+constant memory, and the comparison stops at the first divergence.
+
+Traces and logs may be stored compressed: `.gz` and `.zst` files (see
+riscof_spike.py's `commit_log` option) are decompressed on the fly.
+
+Compared per retired instruction: PC, instruction word, rd write (x0 writes
+are ignored) and store address/value. Load addresses, CSR writes and
+anything else spike adds to a line are skipped.
+
+Usage:
+    python3 scripts/commit_trace.py <dut.trace> --ref DUT-spike.log[.gz|.zst]
+    python3 scripts/commit_trace.py <dut.trace> --iss <program.elf|.mem>
+"""
+import argparse
+import collections
+import gzip
+import io
+import itertools
+import re
+import subprocess
+import sys
+
+import iss as iss_model
+
+try:
+    import zstandard
+except ImportError:  # optional; the zstd command line tool is used instead
+    zstandard = None
+
+Commit = collections.namedtuple('Commit', 'pc insn rd rd_value mem_addr mem_value')
+
+_COMMIT_RE = re.compile(r'core\s+\d+:\s+\d\s+0x([0-9a-fA-F]+)\s+\(0x([0-9a-fA-F]+)\)(.*)')
+_REG_RE = re.compile(r'\bx\s*(\d+)\s+0x([0-9a-fA-F]+)')
+_STORE_RE = re.compile(r'\bmem\s+0x([0-9a-fA-F]+)\s+0x([0-9a-fA-F]+)')
+
+_STORE_MASKS = {0: 0xFF, 1: 0xFFFF, 2: 0xFFFFFFFF}
+
+
+# commit log format -> (file suffix, streaming compressor reading stdin)
+COMPRESSORS = {
+    'plain': ('', None),
+    'gzip': ('.gz', 'gzip -1 -c'),
+    'zstd': ('.zst', 'zstd -q -c'),
+}
+
+
+def compressor(fmt):
+    """(suffix, shell command) for a COMPRESSORS format; ValueError otherwise."""
+    try:
+        return COMPRESSORS[fmt]
+    except KeyError:
+        raise ValueError(f"unknown commit log format '{fmt}' (choose from {', '.join(COMPRESSORS)})")
+
+
+class _PipeReader(io.TextIOWrapper):
+    """Text stream over a decompressor's stdout; closing reaps the process."""
+
+    def __init__(self, proc):
+        super().__init__(proc.stdout, errors='replace')
+        self._proc = proc
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._proc.kill()
+            self._proc.wait()
+
+
+def open_trace(path):
+    """Opens a trace for line iteration, decompressing .gz and .zst files on the fly."""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', errors='replace')
+    if path.endswith('.zst'):
+        if zstandard is not None:
+            reader = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+            return io.TextIOWrapper(reader, errors='replace')
+        return _PipeReader(subprocess.Popen(['zstd', '-d', '-c', '-q', path], stdout=subprocess.PIPE))
+    return open(path, errors='replace')
+
+
+def parse_commits(lines):
+    """Yields a Commit for every commit line (spike or testbench format).
+
+    Spike's plain instruction-trace lines (`core 0: 0x... (0x...) mnemonic`)
+    lack the privilege-level field and are skipped, as are exception lines.
+    """
+    for line in lines:
+        m = _COMMIT_RE.match(line)
+        if not m:
+            continue
+        rest = m.group(3)
+        rd = rd_value = mem_addr = mem_value = None
+        reg = _REG_RE.search(rest)
+        if reg and reg.group(1) != '0':
+            rd, rd_value = int(reg.group(1)), int(reg.group(2), 16) & 0xFFFFFFFF
+        store = _STORE_RE.search(rest)
+        if store:
+            mem_addr, mem_value = int(store.group(1), 16) & 0xFFFFFFFF, int(store.group(2), 16)
+        yield Commit(int(m.group(1), 16) & 0xFFFFFFFF, int(m.group(2), 16),
+                     rd, rd_value, mem_addr, mem_value)
+
+
+def _writes_rd(inst):
+    """Mirrors riscv_core.v real_reg_write for a retired instruction."""
+    opcode = inst & 0x7F
+    if opcode == 0x73:
+        return (inst >> 12) & 0x7 != 0 or inst >> 20 not in (0x000, 0x001, 0x302)
+    return opcode in (0x33, 0x13, 0x03, 0x6F, 0x67, 0x37, 0x17)
+
+
+def iss_commits(sim, max_cycles=None):
+    """Yields the ISS's commits one instruction at a time.
+
+    Stops after a tohost write, when the PC stops changing (the end-of-test
+    self loop) or after `max_cycles`. Interrupt entries and trapping
+    ECALL/EBREAK produce no commit, like the testbench trace.
+    """
+    x = sim.x
+    while max_cycles is None or sim.cycles < max_cycles:
+        pc = sim.pc
+        inst = sim.fetch(pc)
+        opcode = inst & 0x7F
+        mem_addr = mem_value = None
+        if opcode == 0x23:
+            imm_s = iss_model.sext(((inst >> 25) << 5) | ((inst >> 7) & 0x1F), 12)
+            mem_addr = (x[(inst >> 15) & 0x1F] + imm_s) & iss_model.MASK
+            mem_value = x[(inst >> 20) & 0x1F] & _STORE_MASKS.get((inst >> 12) & 0x3, 0xFFFFFFFF)
+        try:
+            retired = sim.step()
+        except iss_model.Halt:
+            yield Commit(pc, inst, None, None, mem_addr, mem_value)
+            return
+        if retired is None:
+            continue                                      # interrupt taken in S_FETCH
+        if opcode == 0x73 and inst in (0x00000073, 0x00100073):
+            continue                                      # trapping ECALL/EBREAK
+        rd = (inst >> 7) & 0x1F
+        if rd and _writes_rd(inst):
+            yield Commit(pc, inst, rd, x[rd], mem_addr, mem_value)
+        else:
+            yield Commit(pc, inst, None, None, mem_addr, mem_value)
+        if sim.pc == pc:
+            return
+
+
+def skip_to(commits, pc):
+    """Drops leading commits until `pc` (e.g. spike's boot ROM at 0x1000)."""
+    for c in commits:
+        if c.pc == pc:
+            yield c
+            break
+    yield from commits
+
+
+def format_commit(c):
+    if c is None:
+        return '<end of trace>'
+    text = f"0x{c.pc:08x} (0x{c.insn:08x})"
+    if c.rd is not None:
+        text += f" x{c.rd} 0x{c.rd_value:08x}"
+    if c.mem_addr is not None:
+        text += f" mem 0x{c.mem_addr:08x} 0x{c.mem_value:x}"
+    return text
+
+
+def _field_diffs(dut, ref):
+    return [name for name in Commit._fields if getattr(dut, name) != getattr(ref, name)]
+
+
+class Divergence:
+    def __init__(self, index, dut, ref, history):
+        self.index = index
+        self.dut = dut
+        self.ref = ref
+        self.history = history
+
+    def report(self):
+        lines = [f"DIVERGENCE at commit {self.index}"]
+        if self.dut is not None and self.ref is not None:
+            lines[0] += f" ({', '.join(_field_diffs(self.dut, self.ref))} differ)"
+        for c in self.history:
+            lines.append(f"    {format_commit(c)}")
+        lines.append(f"  dut: {format_commit(self.dut)}")
+        lines.append(f"  ref: {format_commit(self.ref)}")
+        return '\n'.join(lines)
+
+
+def compare(dut, ref, context=5, allow_shorter=True):
+    """Walks both commit streams in lockstep.
+
+    Returns (matched, divergence) where divergence is None if the streams
+    agree. With `allow_shorter`, one side ending early is not a divergence
+    (the testbench and the ISS detect the end-of-test loop differently).
+    """
+    history = collections.deque(maxlen=context)
+    matched = 0
+    while True:
+        d, r = next(dut, None), next(ref, None)
+        if d is None or r is None:
+            if d is r or allow_shorter:
+                return matched, None
+            return matched, Divergence(matched, d, r, history)
+        if d != r:
+            return matched, Divergence(matched, d, r, history)
+        history.append(d)
+        matched += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare a DUT commit trace with a reference.')
+    parser.add_argument('dut', help='testbench commit trace (+TRACE=<path>)')
+    ref = parser.add_mutually_exclusive_group(required=True)
+    ref.add_argument('--ref', help='reference commit log (spike --log-commits)')
+    ref.add_argument('--iss', metavar='PROGRAM', help='run scripts/iss.py on PROGRAM as reference')
+    parser.add_argument('--max-cycles', type=int, default=None,
+                        help='ISS cycle limit (default: run until the test ends)')
+    parser.add_argument('--context', type=int, default=5,
+                        help='matching commits to print before a divergence')
+    parser.add_argument('--strict', action='store_true',
+                        help='also fail if one trace ends before the other')
+    args = parser.parse_args()
+
+    with open_trace(args.dut) as dut_file:
+        dut = parse_commits(dut_file)
+        first = next(dut, None)
+        if first is None:
+            print(f"ERROR: no commits in {args.dut}")
+            sys.exit(1)
+        dut = itertools.chain([first], dut)
+
+        if args.ref:
+            # spike starts in its boot ROM; align on the DUT's first PC
+            ref_file = open_trace(args.ref)
+            ref_stream = skip_to(parse_commits(ref_file), first.pc)
+        else:
+            ref_file = None
+            sim = iss_model.Iss()
+            sim.load(args.iss)
+            ref_stream = iss_commits(sim, args.max_cycles)
+
+        try:
+            matched, divergence = compare(dut, ref_stream, args.context, not args.strict)
+        finally:
+            if ref_file:
+                ref_file.close()
+
+    if divergence:
+        print(divergence.report())
+        sys.exit(1)
+    print(f"MATCH: {matched} commits")
+
+
+if __name__ == '__main__':
+    main()
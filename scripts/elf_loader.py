@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""Pure-Python ELF32 loader that builds memory images for riscv_core.
+
+Reads PT_LOAD segments and the symbol table directly, so no objcopy or
+per-test interpreter is needed. Two images are produced:
+
+  * an instruction image for `instruction_memory` (32-bit words). Every
+    loadable byte is placed at its load address (LMA) within the 32 KB
+    window, which is the same layout `objcopy -O binary` produced;
+  * a data image for `data_memory`, holding the initialised bytes of the
+    writable segments at their run address (VMA). `data_memory` stores
+    bytes in four lanes (mem_b0..mem_b3), so the image is written as four
+    lane files that `$readmemh` can load directly.
+
+Both images are written with `@address` tags and only cover the regions
+the program actually populates, so the testbenches load only those words
+instead of clearing and rewriting whole memories. A directory mode builds
+the images of every ELF in one process (`make gen-mem`).
+
+Usage:
+    python3 scripts/elf_loader.py <elf> <out_prefix>
+        -> <out_prefix>.mem and <out_prefix>.b0.mem .. <out_prefix>.b3.mem
+    python3 scripts/elf_loader.py --dir <elf_dir> <mem_dir> [-j N] [--force]
+"""
+import argparse
+import collections
+import os
+import struct
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from bin_to_mem import bytes_to_words, format_words, is_up_to_date
+
+# riscv_core memory map
+IMEM_BASE = 0x80000000
+MEM_BYTES = 0x8000           # 32 KB each for instruction_memory and data_memory
+MEM_WORDS = MEM_BYTES // 4
+
+PT_LOAD = 1
+STT_NOTYPE, STT_FUNC = 0, 2
+PF_X, PF_W = 0x1, 0x2
+SHT_SYMTAB = 2
+EM_RISCV = 243
+
+
+Symbol = collections.namedtuple('Symbol', 'name value size type bind')
+
+
+class ElfError(Exception):
+    pass
+
+
+class Segment:
+    def __init__(self, vaddr, paddr, data, memsz, flags):
+        self.vaddr = vaddr
+        self.paddr = paddr
+        self.data = data
+        self.memsz = memsz
+        self.flags = flags
+
+    @property
+    def executable(self):
+        return bool(self.flags & PF_X)
+
+    @property
+    def writable(self):
+        return bool(self.flags & PF_W)
+
+    def __repr__(self):
+        return (f"Segment(vaddr=0x{self.vaddr:08x}, paddr=0x{self.paddr:08x}, "
+                f"filesz=0x{len(self.data):x}, memsz=0x{self.memsz:x}, flags={self.flags})")
+
+
+class ElfFile:
+    """Loadable segments, entry point and symbols of a little-endian ELF32 file."""
+
+    def __init__(self, data):
+        if data[:4] != b'\x7fELF':
+            raise ElfError('not an ELF file')
+        if data[4] != 1 or data[5] != 1:
+            raise ElfError('only little-endian ELF32 is supported')
+        (e_type, e_machine, _, self.entry, e_phoff, e_shoff, _, _,
+         e_phentsize, e_phnum, e_shentsize, e_shnum, _) = struct.unpack_from('<HHIIIIIHHHHHH', data, 16)
+        if e_machine != EM_RISCV:
+            raise ElfError(f'unexpected machine type {e_machine}')
+
+        self.segments = []
+        for i in range(e_phnum):
+            (p_type, p_offset, p_vaddr, p_paddr, p_filesz, p_memsz,
+             p_flags, _) = struct.unpack_from('<8I', data, e_phoff + i * e_phentsize)
+            if p_type == PT_LOAD and p_memsz:
+                self.segments.append(Segment(p_vaddr, p_paddr,
+                                             data[p_offset:p_offset + p_filesz], p_memsz, p_flags))
+
+        self.symbols = {}
+        self.symtab = []            # every defined Symbol, in table order
+        sections = [struct.unpack_from('<10I', data, e_shoff + i * e_shentsize)
+                    for i in range(e_shnum)] if e_shoff else []
+        for sh in sections:
+            if sh[1] != SHT_SYMTAB:
+                continue
+            strtab = sections[sh[6]]
+            str_off = strtab[4]
+            for off in range(sh[4], sh[4] + sh[5], sh[9] or 16):
+                st_name, st_value, st_size, st_info, _, st_shndx = struct.unpack_from('<IIIBBH', data, off)
+                if not st_name or st_shndx == 0:
+                    continue
+                start = str_off + st_name
+                name = data[start:data.index(b'\0', start)].decode(errors='replace')
+                self.symtab.append(Symbol(name, st_value, st_size, st_info & 0xF, st_info >> 4))
+                # Prefer global definitions over local labels of the same name
+                if name not in self.symbols or st_info >> 4:
+                    self.symbols[name] = st_value
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls(f.read())
+
+    def symbol(self, name, default=None):
+        return self.symbols.get(name, default)
+
+    def code_symbols(self):
+        """Function and untyped (assembly) symbols inside executable segments."""
+        text = [(seg.vaddr, seg.vaddr + seg.memsz) for seg in self.segments if seg.executable]
+        return [sym for sym in self.symtab
+                if sym.type in (STT_NOTYPE, STT_FUNC) and not sym.name.startswith(('.L', '$'))
+                and any(lo <= sym.value < hi for lo, hi in text)]
+
+    @property
+    def signature_range(self):
+        """(begin_signature, end_signature) addresses, or None if absent."""
+        begin, end = self.symbol('begin_signature'), self.symbol('end_signature')
+        if begin is None or end is None:
+            return None
+        return begin, end
+
+    def read(self, addr, size):
+        """Initialised bytes at run address `addr` (zeros outside file data)."""
+        out = bytearray(size)
+        for seg in self.segments:
+            lo, hi = max(addr, seg.vaddr), min(addr + size, seg.vaddr + len(seg.data))
+            if lo < hi:
+                out[lo - addr:hi - addr] = seg.data[lo - seg.vaddr:hi - seg.vaddr]
+        return bytes(out)
+
+
+def _window_offset(addr, size, what):
+    offset = addr & (MEM_BYTES - 1)
+    if offset + size > MEM_BYTES:
+        raise ElfError(f'{what} at 0x{addr:08x} (+0x{size:x}) does not fit the 32 KB memory')
+    return offset
+
+
+def merge_ranges(ranges):
+    merged = []
+    for lo, hi in sorted(ranges):
+        if merged and lo <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], hi)
+        else:
+            merged.append([lo, hi])
+    return [tuple(r) for r in merged]
+
+
+def _place(segments, addr_of, what, align=1):
+    buf = bytearray(MEM_BYTES)
+    ranges = []
+    for seg in segments:
+        if not seg.data:
+            continue
+        off = _window_offset(addr_of(seg), len(seg.data), what)
+        buf[off:off + len(seg.data)] = seg.data
+        ranges.append((off & ~(align - 1), (off + len(seg.data) + align - 1) & ~(align - 1)))
+    return buf, merge_ranges(ranges)
+
+
+def instruction_image(elf):
+    """(buffer, [(lo, hi), ...]) for instruction_memory, placed by LMA.
+
+    Ranges are word-aligned byte offsets covering every populated word.
+    """
+    return _place(elf.segments, lambda s: s.paddr, 'segment', align=4)
+
+
+def data_image(elf):
+    """(buffer, [(lo, hi), ...]) for data_memory: writable segments by VMA."""
+    return _place([s for s in elf.segments if s.writable], lambda s: s.vaddr, 'data segment')
+
+
+def format_instruction_image(buf, ranges):
+    """$readmemh word text with one @word_address tag per populated range."""
+    return ''.join(f'@{lo >> 2:x}\n' + format_words(bytes_to_words(buf[lo:hi]))
+                   for lo, hi in ranges)
+
+
+def format_data_lane(buf, ranges, lane):
+    """$readmemh byte text for data_memory lane `lane` (mem_b<lane>)."""
+    chunks = []
+    for lo, hi in ranges:
+        first = lo + ((lane - lo) & 3)
+        values = buf[first:hi:4]
+        if values:
+            chunks.append(f'@{first >> 2:x}\n' + ('%02x\n' * len(values)) % tuple(values))
+    return ''.join(chunks)
+
+
+def image_paths(prefix):
+    """[<prefix>.mem, <prefix>.b0.mem, .. <prefix>.b3.mem]"""
+    return [prefix + '.mem'] + [f'{prefix}.b{lane}.mem' for lane in range(4)]
+
+
+def data_prefix(mem_path):
+    """Prefix of the data lane files next to `mem_path`, or None if there are none."""
+    prefix = mem_path[:-len('.mem')] if mem_path.endswith('.mem') else mem_path
+    return prefix if os.path.isfile(prefix + '.b0.mem') else None
+
+
+def read_mem(path):
+    """Yields (address, value) for every entry of a $readmemh file.
+
+    `@address` tags are honoured; addresses are in units of the file's
+    entries (words for .mem, bytes of one lane for .bN.mem). `//` comments
+    are skipped, and so are undefined entries (x/z digits, as $writememh
+    writes for never-written memory).
+    """
+    addr = 0
+    with open(path) as f:
+        for line in f:
+            for token in line.split('//', 1)[0].split():
+                if token.startswith('@'):
+                    addr = int(token[1:], 16)
+                    continue
+                if not any(c in 'xXzZ' for c in token):
+                    yield addr, int(token, 16)
+                addr += 1
+
+
+def read_data_lanes(prefix):
+    """(buffer, [(lo, hi), ...]) of the data image in <prefix>.b0-3.mem.
+
+    The inverse of format_data_lane(), shaped like data_image().
+    """
+    buf = bytearray(MEM_BYTES)
+    ranges = []
+    for lane in range(4):
+        for index, value in read_mem(f'{prefix}.b{lane}.mem'):
+            off = (index * 4 + lane) & (MEM_BYTES - 1)
+            buf[off] = value
+            ranges.append((off, off + 1))
+    return buf, merge_ranges(ranges)
+
+
+def write_images(elf, prefix):
+    """Writes <prefix>.mem and <prefix>.b0.mem .. <prefix>.b3.mem; returns the paths."""
+    paths = image_paths(prefix)
+    with open(paths[0], 'w') as f:
+        f.write(format_instruction_image(*instruction_image(elf)))
+    buf, ranges = data_image(elf)
+    for lane, path in enumerate(paths[1:]):
+        with open(path, 'w') as f:
+            f.write(format_data_lane(buf, ranges, lane))
+    return paths
+
+
+def load_elf_images(elf_path, prefix):
+    """Loads `elf_path` and writes its memory images; returns the ElfFile."""
+    elf = ElfFile.load(elf_path)
+    write_images(elf, prefix)
+    return elf
+
+
+def is_elf(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read(4) == b'\x7fELF'
+    except OSError:
+        return False
+
+
+def _convert_one(pair):
+    elf_path, prefix = pair
+    try:
+        load_elf_images(elf_path, prefix)
+        return pair, None
+    except (OSError, ElfError) as e:
+        return pair, str(e)
+
+
+def convert_dir(elf_dir, mem_dir, jobs=1, force=False):
+    """Writes <mem_dir>/<name>.mem and lane files for every ELF in `elf_dir`.
+
+    Images whose five files are all newer than the ELF are skipped unless
+    `force` is set. With jobs > 1 the ELFs are spread over a process pool.
+    Returns (converted, skipped, failed) counts.
+    """
+    os.makedirs(mem_dir, exist_ok=True)
+    todo = []
+    skipped = 0
+    for entry in sorted(os.listdir(elf_dir)):
+        src = os.path.join(elf_dir, entry)
+        if not os.path.isfile(src) or not is_elf(src):
+            continue
+        prefix = os.path.join(mem_dir, os.path.splitext(entry)[0] if entry.endswith('.elf') else entry)
+        if not force and all(is_up_to_date(src, path) for path in image_paths(prefix)):
+            skipped += 1
+        else:
+            todo.append((src, prefix))
+
+    if jobs > 1 and len(todo) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(_convert_one, todo))
+    else:
+        results = [_convert_one(pair) for pair in todo]
+
+    failed = 0
+    for (src, _), error in results:
+        if error:
+            print(f"Error: {src}: {error}")
+            failed += 1
+    return len(results) - failed, skipped, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build riscv_core memory images from an ELF.')
+    parser.add_argument('--dir', action='store_true',
+                        help='treat the arguments as directories and convert every ELF')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='parallel conversions in --dir mode (0 = all cores)')
+    parser.add_argument('--force', action='store_true',
+                        help='in --dir mode, regenerate images that are up to date')
+    parser.add_argument('elf', help='input ELF32 file (or directory with --dir)')
+    parser.add_argument('prefix', help='output prefix for the .mem/.bN.mem images '
+                        '(or directory with --dir)')
+    args = parser.parse_args()
+
+    if args.dir:
+        if not os.path.isdir(args.elf):
+            print(f"Error: Input directory not found: {args.elf}")
+            sys.exit(1)
+        jobs = args.jobs or os.cpu_count() or 1
+        converted, skipped, failed = convert_dir(args.elf, args.prefix, jobs, args.force)
+        print(f"Generated {converted} images in {args.prefix} "
+              f"({skipped} up to date, {failed} failed)")
+        if failed:
+            sys.exit(1)
+        return
+
+    try:
+        elf = load_elf_images(args.elf, args.prefix)
+    except (OSError, ElfError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    print(f"entry: 0x{elf.entry:08x}")
+    for seg in elf.segments:
+        print(f"  {seg}")
+    for name in ('begin_signature', 'end_signature', 'tohost'):
+        if name in elf.symbols:
+            print(f"  {name}: 0x{elf.symbols[name]:08x}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,467 @@
+#!/usr/bin/env python3
+"""Constrained-random differential fuzzer: riscv_core RTL vs scripts/iss.py.
+
+Every seed deterministically produces one RV32IM + Zicsr program, assembled
+here without a toolchain, that stays inside riscv_core's memory map:
+
+  * code at 0x80000000 in the 32 KB instruction_memory window, well below
+    the tohost word 0x80002000;
+  * loads and stores are aligned and based on reserved registers: x3 points
+    into a 4 KB scratch region of data_memory (0x2000-0x2FFF, randomly
+    initialised), x4 at instruction_memory (loads read code, stores are
+    dropped by both models). Timer/GPIO MMIO is never touched, so results
+    do not depend on cycle timing;
+  * forward branches, JAL and AUIPC+JALR land on instruction-group
+    boundaries; backward branches only close bounded counted loops (x30);
+  * CSR accesses: reads of mstatus/mie/mtvec/mepc/mcause/mip/minstret(h),
+    writes to mepc/mcause only; ECALL/EBREAK go to a handler that resumes
+    at mepc + 4 (x31 is its scratch register).
+
+The epilogue stores x1..x30, mepc and mcause after the scratch region and
+writes 1 to tohost. The RTL (tb_isa_test.v, +SIGNATURE) and the ISS then
+dump the scratch region and register block, which must match word for
+word. Seeds fan out over a process pool; every seed is logged, and a
+failing seed's program, images and reproduce command are kept.
+
+Usage:
+    python3 scripts/fuzz_core.py --count 1000 [--seed S] [-j N] [--sim verilator]
+    python3 scripts/fuzz_core.py --seed 1234 --count 1 --keep     # reproduce one seed
+    python3 scripts/fuzz_core.py --count 200 --iss-only           # generator self-check
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import elf_loader
+import iss as iss_model
+import signature
+import sim_cache
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+DEFAULT_OUT_DIR = os.path.join(PROJECT_ROOT, 'build', 'fuzz')
+
+GENERATOR_VERSION = 2           # bump when the same seed would produce a different program
+
+CODE_BASE = 0x80000000
+DATA_BASE = 0x00002800          # x3; imm12 reaches 0x2000-0x2FFF
+SCRATCH = (0x2000, 0x3000)      # byte range of the random scratch region
+DUMP_BASE = 0x3000              # x1..x30, mepc, mcause
+DUMP_WORDS = 32
+SIG_BEGIN = SCRATCH[0] >> 2
+SIG_END = (DUMP_BASE >> 2) + DUMP_WORDS
+TOHOST = iss_model.TOHOST_ADDR
+
+X_DATA, X_IMEM, X_LOOP, X_TMP = 3, 4, 30, 31
+FREE_REGS = [r for r in range(1, 30) if r not in (X_DATA, X_IMEM)]
+
+CSR_READ = (0x300, 0x304, 0x305, 0x341, 0x342, 0x344, 0xB02, 0xB82)
+CSR_WRITE = (0x341, 0x342)
+
+# Instruction group weights
+WEIGHTS = {
+    'alu_reg': 30, 'alu_imm': 30, 'upper': 5, 'load': 12, 'store': 12,
+    'branch': 8, 'jal': 3, 'jalr': 2, 'csr': 5, 'trap': 1, 'loop': 2, 'muldiv': 6,
+}
+
+SIM_TIMEOUT = 120
+
+
+# ----------------------------------------------------------------------
+# Encoders
+# ----------------------------------------------------------------------
+
+def r_type(funct7, rs2, rs1, funct3, rd, opcode=0x33):
+    return (funct7 << 25) | (rs2 << 20) | (rs1 << 15) | (funct3 << 12) | (rd << 7) | opcode
+
+
+def i_type(imm, rs1, funct3, rd, opcode):
+    return ((imm & 0xFFF) << 20) | (rs1 << 15) | (funct3 << 12) | (rd << 7) | opcode
+
+
+def s_type(imm, rs2, rs1, funct3):
+    imm &= 0xFFF
+    return ((imm >> 5) << 25) | (rs2 << 20) | (rs1 << 15) | (funct3 << 12) | ((imm & 0x1F) << 7) | 0x23
+
+
+def b_type(offset, rs2, rs1, funct3):
+    o = offset & 0x1FFF
+    return (((o >> 12) & 1) << 31) | (((o >> 5) & 0x3F) << 25) | (rs2 << 20) | (rs1 << 15) | \
+        (funct3 << 12) | (((o >> 1) & 0xF) << 8) | (((o >> 11) & 1) << 7) | 0x63
+
+
+def u_type(imm20, rd, opcode):
+    return ((imm20 & 0xFFFFF) << 12) | (rd << 7) | opcode
+
+
+def j_type(offset, rd):
+    o = offset & 0x1FFFFF
+    return (((o >> 20) & 1) << 31) | (((o >> 1) & 0x3FF) << 21) | (((o >> 11) & 1) << 20) | \
+        (((o >> 12) & 0xFF) << 12) | (rd << 7) | 0x6F
+
+
+def csr_type(csr, rs1, funct3, rd):
+    return i_type(csr, rs1, funct3, rd, 0x73)
+
+
+def load_const(rd, value):
+    """LUI + ADDI for a 32-bit constant."""
+    value &= 0xFFFFFFFF
+    lo = value & 0xFFF
+    if lo >= 0x800:
+        lo -= 0x1000
+    hi = ((value - lo) >> 12) & 0xFFFFF
+    return [u_type(hi, rd, 0x37), i_type(lo, rd, 0, rd, 0x13)]
+
+
+ECALL = 0x00000073
+EBREAK = 0x00100073
+MRET = 0x30200073
+
+
+# ----------------------------------------------------------------------
+# Generator
+# ----------------------------------------------------------------------
+
+class Generator:
+    """Builds one program from `rng` as a list of instruction groups.
+
+    Groups are lists of words or unresolved control-flow tuples; control
+    flow only targets group starts, so it never lands inside a multi-word
+    sequence. `assemble()` resolves targets once every group is placed.
+    """
+
+    def __init__(self, rng, length):
+        self.rng = rng
+        self.length = length
+
+    def reg(self):
+        return self.rng.choice(FREE_REGS)
+
+    def src(self):
+        # x0, the reserved bases and the loop counter are fair game to read
+        return self.rng.randrange(32)
+
+    def imm12(self):
+        r = self.rng.random()
+        if r < 0.3:
+            return self.rng.choice((0, 1, -1, 2047, -2048, 0x7F0, -0x800 + 1))
+        return self.rng.randrange(-2048, 2048)
+
+    def value32(self):
+        r = self.rng.random()
+        if r < 0.3:
+            return self.rng.choice((0, 1, 0xFFFFFFFF, 0x80000000, 0x7FFFFFFF, 0xFFFF, 0x8000))
+        return self.rng.getrandbits(32)
+
+    def alu_reg(self):
+        funct3 = self.rng.randrange(8)
+        funct7 = 0x20 if funct3 in (0, 5) and self.rng.random() < 0.5 else 0
+        return [r_type(funct7, self.src(), self.src(), funct3, self.reg())]
+
+    def muldiv(self):
+        # RV32M; value32() operands hit the /0 and -2**31 / -1 corner cases
+        return [r_type(1, self.src(), self.src(), self.rng.randrange(8), self.reg())]
+
+    def alu_imm(self):
+        funct3 = self.rng.randrange(8)
+        if funct3 in (1, 5):                                  # shifts: shamt + funct7
+            imm = self.rng.randrange(32) | (0x400 if funct3 == 5 and self.rng.random() < 0.5 else 0)
+        else:
+            imm = self.imm12()
+        return [i_type(imm, self.src(), funct3, self.reg(), 0x13)]
+
+    def upper(self):
+        opcode = self.rng.choice((0x37, 0x17))                 # LUI / AUIPC
+        return [u_type(self.rng.getrandbits(20), self.reg(), opcode)]
+
+    def load(self):
+        funct3 = self.rng.choice((0, 1, 2, 4, 5))
+        size = 1 << (funct3 & 3)
+        if self.rng.random() < 0.15:
+            base, imm = X_IMEM, self.rng.randrange(0, 2048 // size) * size
+        else:
+            base, imm = X_DATA, self.rng.randrange(-2048 // size, 2048 // size) * size
+        return [i_type(imm, base, funct3, self.reg(), 0x03)]
+
+    def store(self):
+        funct3 = self.rng.randrange(3)
+        size = 1 << funct3
+        if self.rng.random() < 0.05:
+            base, imm = X_IMEM, self.rng.randrange(0, 2048 // size) * size
+        else:
+            base, imm = X_DATA, self.rng.randrange(-2048 // size, 2048 // size) * size
+        return [s_type(imm, self.src(), base, funct3)]
+
+    def branch(self, index):
+        funct3 = self.rng.choice((0, 1, 4, 5, 6, 7))
+        return [('branch', funct3, self.src(), self.src(), index + 1 + self.rng.randrange(1, 8))]
+
+    def jal(self, index):
+        rd = self.reg() if self.rng.random() < 0.7 else 0
+        return [('jal', rd, index + 1 + self.rng.randrange(1, 8))]
+
+    def jalr(self, index):
+        rd = self.reg() if self.rng.random() < 0.7 else 0
+        return [u_type(0, X_TMP, 0x17), ('jalr', rd, index + 1 + self.rng.randrange(1, 8))]
+
+    def csr(self):
+        funct3 = self.rng.choice((1, 2, 3, 5, 6, 7))
+        if self.rng.random() < 0.5:
+            # Pure read: CSRRS/CSRRC with rs1 = x0 or a zero immediate never write
+            return [csr_type(self.rng.choice(CSR_READ), 0, self.rng.choice((2, 3, 6, 7)), self.reg())]
+        rs1 = self.src() if funct3 < 4 else self.rng.randrange(32)
+        return [csr_type(self.rng.choice(CSR_WRITE), rs1, funct3, self.reg())]
+
+    def trap(self):
+        return [self.rng.choice((ECALL, EBREAK))]
+
+    def loop(self):
+        """A counted loop: only straight-line ALU/memory ops in its body."""
+        body = []
+        for _ in range(self.rng.randrange(1, 7)):
+            kind = self.rng.choice(('alu_reg', 'alu_imm', 'load', 'store', 'upper', 'muldiv'))
+            body += getattr(self, kind)()
+        count = self.rng.randrange(1, 9)
+        back = -4 * (len(body) + 1)
+        return ([i_type(count, 0, 0, X_LOOP, 0x13)] + body +
+                [i_type(-1, X_LOOP, 0, X_LOOP, 0x13), b_type(back, 0, X_LOOP, 1)])
+
+    def groups(self):
+        rng = self.rng
+        kinds = list(WEIGHTS)
+        weights = [WEIGHTS[k] for k in kinds]
+
+        prologue = []
+        for r in FREE_REGS + [X_LOOP]:
+            prologue += load_const(r, self.value32())
+        prologue += load_const(X_DATA, DATA_BASE) + load_const(X_IMEM, CODE_BASE)
+        groups = [prologue, None]                             # [1]: mtvec setup, placed later
+
+        body_start = len(groups)
+        for i in range(self.length):
+            kind = rng.choices(kinds, weights)[0]
+            index = body_start + i
+            if kind in ('branch', 'jal', 'jalr'):
+                groups.append(getattr(self, kind)(index))
+            else:
+                groups.append(getattr(self, kind)())
+        end = len(groups)
+
+        epilogue = load_const(X_TMP, DUMP_BASE)
+        for r in range(1, 31):
+            epilogue.append(s_type((r - 1) * 4, r, X_TMP, 2))
+        for n, csr in enumerate((0x341, 0x342)):
+            epilogue += [csr_type(csr, 0, 2, 1), s_type((30 + n) * 4, 1, X_TMP, 2)]
+        epilogue += load_const(X_TMP, TOHOST) + [i_type(1, 0, 0, 1, 0x13), s_type(0, 1, X_TMP, 2),
+                                                j_type(0, 0)]
+        handler = [csr_type(0x341, 0, 2, X_TMP), i_type(4, X_TMP, 0, X_TMP, 0x13),
+                   csr_type(0x341, X_TMP, 1, 0), MRET]
+        groups += [epilogue, handler]
+
+        # Clamp forward targets to the epilogue
+        for g in groups[body_start:end]:
+            for n, item in enumerate(g):
+                if isinstance(item, tuple) and item[-1] > end:
+                    g[n] = item[:-1] + (end,)
+        groups[1] = [('const', 0, end + 1), ('const', 1, end + 1), csr_type(0x305, X_TMP, 1, 0)]
+        return groups
+
+
+def assemble(groups):
+    """Places the groups from CODE_BASE and resolves control flow; returns words."""
+    starts = []
+    addr = CODE_BASE
+    for g in groups:
+        starts.append(addr)
+        addr += 4 * len(g)
+    words = []
+    for g in groups:
+        for item in g:
+            pc = CODE_BASE + 4 * len(words)
+            if not isinstance(item, tuple):
+                words.append(item)
+            elif item[0] == 'branch':
+                _, funct3, rs1, rs2, target = item
+                words.append(b_type(starts[target] - pc, rs2, rs1, funct3))
+            elif item[0] == 'jal':
+                words.append(j_type(starts[item[2]] - pc, item[1]))
+            elif item[0] == 'jalr':
+                # Follows AUIPC X_TMP, 0 at pc - 4
+                words.append(i_type(starts[item[2]] - (pc - 4), X_TMP, 0, item[1], 0x67))
+            else:                                             # ('const', half, group): LUI/ADDI of its address
+                words.append(load_const(X_TMP, starts[item[2]])[item[1]])
+    return words
+
+
+def generate(seed, length):
+    """(instruction words, scratch bytes) of the program for `seed`."""
+    rng = random.Random(f'{GENERATOR_VERSION}:{seed}')
+    groups = Generator(rng, length).groups()
+    scratch = bytes(rng.getrandbits(8) for _ in range(SCRATCH[1] - SCRATCH[0]))
+    return assemble(groups), scratch
+
+
+# ----------------------------------------------------------------------
+# Runners
+# ----------------------------------------------------------------------
+
+def write_images(words, scratch, prefix):
+    """<prefix>.mem and the data lane files <prefix>.b0-3.mem for tb_isa_test.v."""
+    imem = b''.join(w.to_bytes(4, 'little') for w in words)
+    with open(prefix + '.mem', 'w') as f:
+        f.write(elf_loader.format_instruction_image(imem, [(0, len(imem))]))
+    dmem = bytearray(elf_loader.MEM_BYTES)
+    dmem[SCRATCH[0]:SCRATCH[1]] = scratch
+    for lane in range(4):
+        with open(f'{prefix}.b{lane}.mem', 'w') as f:
+            f.write(elf_loader.format_data_lane(dmem, [SCRATCH], lane))
+
+
+def run_iss(words, scratch, max_cycles):
+    """Runs the program on the ISS; returns (signature words, message or None)."""
+    sim = iss_model.Iss()
+    sim.load_words(words)
+    sim.dmem[SCRATCH[0]:SCRATCH[1]] = scratch
+    halt = sim.run(max_cycles=max_cycles, stop_on_self_loop=False)
+    if halt.reason != 'tohost' or halt.value != 1:
+        return None, f"reference did not finish: {halt.reason} after {sim.cycles} cycles"
+    return list(sim.words[SIG_BEGIN:SIG_END]), None
+
+
+def run_rtl(prefix, image, simulator, max_cycles, timeout):
+    """Runs tb_isa_test on the images; returns (signature words, message or None)."""
+    sig_path = prefix + '.signature'
+    cmd = sim_cache.run_command(image, simulator) + [
+        f'+TESTFILE={prefix}.mem', f'+DATAFILE={prefix}', f'+MAX_CYCLES={max_cycles}',
+        f'+SIGNATURE={sig_path}', f'+SIG_BEGIN={SIG_BEGIN:x}', f'+SIG_END={SIG_END:x}']
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return None, f"simulator timed out after {timeout}s"
+    except OSError as e:
+        return None, str(e)
+    output = proc.stdout + proc.stderr
+    if not any(line.startswith('PASS') for line in output.splitlines()):
+        fail = next((line for line in output.splitlines() if line.startswith('FAIL')), 'no verdict')
+        return None, f"RTL: {fail}"
+    try:
+        return signature.read_words(sig_path), None
+    except OSError as e:
+        return None, f"RTL signature: {e}"
+
+
+def _describe(offset):
+    addr = (SIG_BEGIN + offset) << 2
+    if addr >= DUMP_BASE:
+        n = (addr - DUMP_BASE) >> 2
+        return f"x{n + 1}" if n < 30 else ('mepc', 'mcause')[n - 30]
+    return f"mem[0x{addr:04x}]"
+
+
+def compare(ref, dut):
+    """List of 'what ref=.. rtl=..' strings for the differing words."""
+    diffs = [f"{_describe(i)} iss=0x{r:08x} rtl=0x{d:08x}"
+             for i, (r, d) in enumerate(zip(ref, dut)) if r != d]
+    if len(ref) != len(dut):
+        diffs.append(f"signature length iss={len(ref)} rtl={len(dut)}")
+    return diffs
+
+
+def run_seed(seed, options):
+    """Generates and runs one seed; returns a result dict (JSON-serialisable)."""
+    start = time.monotonic()
+    result = {'seed': seed, 'status': 'pass', 'message': ''}
+    words, scratch = generate(seed, options['length'])
+    ref, message = run_iss(words, scratch, options['max_cycles'])
+    if message:
+        result.update(status='ref-fail', message=message)
+    elif options['image']:
+        prefix = os.path.join(options['out_dir'], f'seed_{seed}')
+        write_images(words, scratch, prefix)
+        dut, message = run_rtl(prefix, options['image'], options['sim'],
+                               options['max_cycles'], options['timeout'])
+        if message:
+            result.update(status='rtl-fail', message=message)
+        else:
+            diffs = compare(ref, dut)
+            if diffs:
+                result.update(status='mismatch', message='; '.join(diffs[:6]) +
+                              (f' (+{len(diffs) - 6} more)' if len(diffs) > 6 else ''))
+        if result['status'] == 'pass' and not options['keep']:
+            for suffix in ('.mem', '.b0.mem', '.b1.mem', '.b2.mem', '.b3.mem', '.signature'):
+                if os.path.exists(prefix + suffix):
+                    os.remove(prefix + suffix)
+    result['seconds'] = round(time.monotonic() - start, 3)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Differential random-program fuzzer for riscv_core.')
+    parser.add_argument('--count', type=int, default=100, help='programs to run (default: %(default)s)')
+    parser.add_argument('--seed', type=int, help='first seed (default: time based); seeds are consecutive')
+    parser.add_argument('--length', type=int, default=400,
+                        help='instruction groups per program (default: %(default)s)')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help='worker processes (default: all cores)')
+    parser.add_argument('--sim', default=os.environ.get('SIM', 'icarus'),
+                        choices=sorted(sim_cache.SIMULATORS), help='RTL simulator')
+    parser.add_argument('--vvp-file', help='prebuilt tb_isa_test image (default: build it via sim_cache)')
+    parser.add_argument('--iss-only', action='store_true',
+                        help='only generate and run the reference (generator self-check)')
+    parser.add_argument('--max-cycles', type=int, default=200000, help='cycle limit per program')
+    parser.add_argument('--timeout', type=int, default=SIM_TIMEOUT, help='seconds per RTL run')
+    parser.add_argument('--out-dir', default=DEFAULT_OUT_DIR,
+                        help='images of failing seeds (default: %(default)s)')
+    parser.add_argument('--keep', action='store_true', help='keep the images of passing seeds too')
+    parser.add_argument('--log', help='JSON log of every seed (default: <out-dir>/fuzz-<seed>.json)')
+    args = parser.parse_args()
+
+    base = args.seed if args.seed is not None else int(time.time() * 1000) & 0xFFFFFFFF
+    seeds = range(base, base + args.count)
+    os.makedirs(args.out_dir, exist_ok=True)
+
+    image = None
+    if not args.iss_only:
+        try:
+            image = sim_cache.build_image(args.sim, args.vvp_file)
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"ERROR: cannot build the {args.sim} testbench: {e}")
+            sys.exit(2)
+    options = {'length': args.length, 'max_cycles': args.max_cycles, 'image': image,
+               'sim': args.sim, 'timeout': args.timeout, 'out_dir': args.out_dir, 'keep': args.keep}
+
+    print(f"Fuzzing {args.count} programs, seeds {base}..{base + args.count - 1}, "
+          f"{args.jobs} jobs, reference=iss, dut={'none' if args.iss_only else args.sim}")
+    start = time.monotonic()
+    results = []
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        chunksize = max(1, args.count // (args.jobs * 8))
+        for result in pool.map(run_seed, seeds, [options] * args.count, chunksize=chunksize):
+            results.append(result)
+            if result['status'] != 'pass':
+                print(f"  seed {result['seed']}: {result['status'].upper()} {result['message']}")
+    wall = time.monotonic() - start
+
+    failed = [r for r in results if r['status'] != 'pass']
+    log = args.log or os.path.join(args.out_dir, f'fuzz-{base}.json')
+    with open(log, 'w') as f:
+        json.dump({'generator_version': GENERATOR_VERSION, 'base_seed': base, 'count': args.count,
+                   'length': args.length, 'sim': None if args.iss_only else args.sim,
+                   'wall_seconds': round(wall, 3), 'results': results}, f, indent=1)
+
+    print(f"{len(results) - len(failed)}/{len(results)} passed in {wall:.1f}s "
+          f"({len(results) / wall if wall else 0:.1f} programs/s); log: {log}")
+    for r in failed:
+        print(f"  reproduce: python3 scripts/fuzz_core.py --seed {r['seed']} --count 1 --keep "
+              f"--length {args.length}{' --sim ' + args.sim if not args.iss_only else ''}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
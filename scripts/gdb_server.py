@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+"""GDB remote serial protocol server for riscv_core.
+
+Speaks RSP on a local TCP socket and maps the debugger's requests onto a
+target with six methods:
+
+  read_registers()                   x0..x31 and pc (33 values)
+  write_registers(values)            the same 33 values
+  read_memory(addr, length)          bytes, or None if not accessible
+  write_memory(addr, data)           False if not accessible
+  step()                             run one instruction
+  resume(breakpoints, interrupted)   run until the PC reaches a breakpoint
+                                     or interrupted() returns True
+
+step() and resume() return the program's exit code once it has exited
+through tohost (scripts/htif.py), else None. Every call is one transfer:
+a `g` packet is a single read_registers(), an `m`/`M` packet of any length
+a single read_memory()/write_memory(), so a target that lives in another
+thread (the cocotb simulation, tb/uvm/riscv_env.py DebugTarget) pays one
+round trip per packet rather than one per word. qSupported advertises a
+large PacketSize so that GDB's `load` and memory dumps use few packets.
+
+Breakpoints (Z0/Z1) are PC matches kept by the server and checked by the
+target, so no EBREAK is patched into instruction memory. Addresses follow
+the core's map: 0x80000000-0x80007FFF is instruction memory, the timer and
+GPIO at 0xFFFF0000 and above are not accessible, anything else is data
+memory aliased on address[14:0].
+
+Without a simulator, the server runs programs on the ISS:
+
+    python3 scripts/gdb_server.py <program.elf|.mem|.bin|.state> [--port 3333] [--console]
+    riscv64-unknown-elf-gdb <program.elf> -ex 'target remote :3333'
+"""
+import argparse
+import select
+import socket
+import sys
+
+import checkpoint
+import elf_loader
+import htif
+import iss as iss_model
+
+MASK = 0xFFFFFFFF
+IMEM_WINDOW = 0x10000          # address[31:15] of the instruction memory window
+MMIO_BASE = 0xFFFF0000
+MEM_WORDS = 8192
+PACKET_SIZE = 0x4000
+SIGINT = 2
+SIGTRAP = 5
+POLL_STEPS = 10000             # ISS steps between checks for ^C
+
+REG_NAMES = ['zero', 'ra', 'sp', 'gp', 'tp', 't0', 't1', 't2', 'fp', 's1'] + \
+            [f'a{i}' for i in range(8)] + [f's{i}' for i in range(2, 12)] + \
+            [f't{i}' for i in range(3, 7)]
+
+TARGET_XML = (
+    '<?xml version="1.0"?>\n'
+    '<!DOCTYPE target SYSTEM "gdb-target.dtd">\n'
+    '<target version="1.0">\n'
+    '<architecture>riscv:rv32</architecture>\n'
+    '<feature name="org.gnu.gdb.riscv.cpu">\n'
+    + ''.join(f'<reg name="{name}" bitsize="32" type="{"data_ptr" if name in ("sp", "fp") else "int"}"/>\n'
+              for name in REG_NAMES)
+    + '<reg name="pc" bitsize="32" type="code_ptr"/>\n'
+    '</feature>\n'
+    '</target>\n')
+
+
+class RspError(Exception):
+    pass
+
+
+def region(addr):
+    """'imem', 'dmem' or None (memory-mapped I/O) for a byte address."""
+    if addr >> 15 == IMEM_WINDOW:
+        return 'imem'
+    if addr < MMIO_BASE:
+        return 'dmem'
+    return None
+
+
+def word_span(addr, length):
+    """Word addresses (addr >> 2) covering [addr, addr + length)."""
+    return range(addr >> 2, (addr + length + 3) >> 2)
+
+
+def merge_bytes(addr, data, words):
+    """Overlays `data` at byte address `addr` onto `words` (the span's old values)."""
+    buf = bytearray(b''.join(w.to_bytes(4, 'little') for w in words))
+    off = addr & 3
+    buf[off:off + len(data)] = data
+    return [int.from_bytes(buf[i:i + 4], 'little') for i in range(0, len(buf), 4)]
+
+
+def _hex_words(values):
+    return ''.join(v.to_bytes(4, 'little').hex() for v in values)
+
+
+def _parse_words(text):
+    data = bytes.fromhex(text)
+    return [int.from_bytes(data[i:i + 4], 'little') for i in range(0, len(data), 4)]
+
+
+def _escape(data):
+    out = bytearray()
+    for c in data:
+        if c in b'#$}*':
+            out += bytes((0x7D, c ^ 0x20))
+        else:
+            out.append(c)
+    return bytes(out)
+
+
+class RspConnection:
+    """Packet framing, acknowledgements and ^C detection on one socket."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.buf = bytearray()
+        self.ack = True
+
+    def _fill(self, timeout=None):
+        if timeout is not None:
+            ready, _, _ = select.select([self.sock], [], [], timeout)
+            if not ready:
+                return False
+        chunk = self.sock.recv(65536)
+        if not chunk:
+            raise ConnectionError('GDB closed the connection')
+        self.buf += chunk
+        return True
+
+    def interrupted(self):
+        """True once if GDB sent ^C; never blocks. Used while the target runs."""
+        while self._fill(0):
+            pass
+        i = self.buf.find(b'\x03')
+        if i < 0:
+            return False
+        del self.buf[i]
+        return True
+
+    def recv(self):
+        """Next packet body, or '\\x03' for an interrupt request."""
+        while True:
+            if self.buf:
+                c = self.buf[0]
+                if c == 0x03:
+                    del self.buf[0]
+                    return '\x03'
+                if c != ord('$'):
+                    del self.buf[0]                       # acks and line noise
+                    continue
+                end = self.buf.find(b'#')
+                if end >= 0 and len(self.buf) >= end + 3:
+                    body = bytes(self.buf[1:end])
+                    checksum = bytes(self.buf[end + 1:end + 3])
+                    del self.buf[:end + 3]
+                    if self.ack:
+                        ok = checksum.lower() == b'%02x' % (sum(body) & 0xFF)
+                        self.sock.sendall(b'+' if ok else b'-')
+                        if not ok:
+                            continue
+                    return body.decode('latin-1')
+            self._fill()
+
+    def send(self, body):
+        payload = body.encode('latin-1') if isinstance(body, str) else body
+        packet = b'$' + payload + b'#%02x' % (sum(payload) & 0xFF)
+        while True:
+            self.sock.sendall(packet)
+            if not self.ack:
+                return
+            while not self.buf:
+                self._fill()
+            c = self.buf[0]
+            if c not in b'+-':
+                return                                    # GDB moved on; treat as acked
+            del self.buf[0]
+            if c == ord('+'):
+                return
+
+
+class GdbServer:
+    """Serves one GDB connection at a time on a target (see module docstring)."""
+
+    def __init__(self, target, log=None):
+        self.target = target
+        self.log = log or (lambda text: print(text, file=sys.stderr))
+        self.breakpoints = set()
+        self.stop = f'S{SIGTRAP:02x}'
+        self.exited = False
+
+    def serve(self, port, host='127.0.0.1'):
+        """Waits for GDB on host:port and serves it; returns how the session ended."""
+        with socket.create_server((host, port)) as server:
+            self.log(f"gdb_server: waiting for GDB on {host}:{port}")
+            conn, peer = server.accept()
+        with conn:
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.log(f"gdb_server: connected to {peer[0]}:{peer[1]}")
+            try:
+                return self.session(RspConnection(conn))
+            except ConnectionError:
+                return 'disconnected'
+
+    def session(self, rsp):
+        while True:
+            packet = rsp.recv()
+            if packet == '\x03':
+                rsp.send(f'S{SIGINT:02x}')              # already halted
+                continue
+            if packet == 'k':
+                return 'killed'
+            if packet.startswith('D'):
+                rsp.send('OK')
+                return 'detached'
+            if packet == 'QStartNoAckMode':
+                rsp.send('OK')
+                rsp.ack = False
+                continue
+            try:
+                reply = self.handle(packet, rsp)
+            except (RspError, ValueError, IndexError):
+                reply = 'E01'
+            rsp.send(reply)
+
+    def handle(self, packet, rsp):
+        """Reply to one packet (other than k, D, QStartNoAckMode and ^C)."""
+        target = self.target
+        cmd, args = packet[:1], packet[1:]
+        if not cmd:
+            return ''
+        if cmd == '?':
+            return self.stop
+        if cmd == 'g':
+            return _hex_words(target.read_registers())
+        if cmd == 'G':
+            values = _parse_words(args)
+            if len(values) != 33:
+                raise RspError('G needs x0-x31 and pc')
+            target.write_registers(values)
+            return 'OK'
+        if cmd == 'p':
+            n = int(args, 16)
+            if n > 32:
+                raise RspError(f'no register {n}')
+            return _hex_words(target.read_registers()[n:n + 1])
+        if cmd == 'P':
+            n, value = args.split('=')
+            n = int(n, 16)
+            if n > 32:
+                raise RspError(f'no register {n}')
+            values = target.read_registers()
+            values[n] = _parse_words(value)[0]
+            target.write_registers(values)
+            return 'OK'
+        if cmd == 'm':
+            addr, length = (int(v, 16) for v in args.split(','))
+            data = target.read_memory(addr, min(length, PACKET_SIZE // 2))
+            return 'E14' if data is None else data.hex()
+        if cmd == 'M':
+            where, data = args.split(':')
+            addr, length = (int(v, 16) for v in where.split(','))
+            data = bytes.fromhex(data)
+            if len(data) != length:
+                raise RspError('M length mismatch')
+            return 'OK' if not data or target.write_memory(addr, data) is not False else 'E14'
+        if cmd in 'cs':
+            if self.exited:
+                return self.stop
+            if args:
+                values = target.read_registers()
+                values[32] = int(args, 16)
+                target.write_registers(values)
+            return self._run(rsp, cmd == 's')
+        if cmd in 'Zz':
+            kind, addr, _ = args.split(',')
+            if kind not in ('0', '1'):
+                return ''                                 # no watchpoints
+            if cmd == 'Z':
+                self.breakpoints.add(int(addr, 16))
+            else:
+                self.breakpoints.discard(int(addr, 16))
+            return 'OK'
+        if cmd == 'H':
+            return 'OK'
+        if cmd == 'q':
+            return self._query(args)
+        return ''
+
+    def _query(self, args):
+        if args.startswith('Supported'):
+            return f'PacketSize={PACKET_SIZE:x};qXfer:features:read+;QStartNoAckMode+'
+        if args.startswith('Xfer:features:read:target.xml:'):
+            offset, length = (int(v, 16) for v in args.rsplit(':', 1)[1].split(','))
+            chunk = TARGET_XML[offset:offset + length]
+            more = offset + length < len(TARGET_XML)
+            return ('m' if more else 'l') + _escape(chunk.encode()).decode('latin-1')
+        if args == 'Attached':
+            return '1'
+        if args == 'C':
+            return 'QC1'
+        if args == 'fThreadInfo':
+            return 'm1'
+        if args == 'sThreadInfo':
+            return 'l'
+        if args.startswith('Symbol'):
+            return 'OK'
+        return ''
+
+    def _run(self, rsp, single):
+        interrupts = []
+
+        def interrupted():
+            if rsp.interrupted():
+                interrupts.append(True)
+            return bool(interrupts)
+
+        if single:
+            code = self.target.step()
+        else:
+            code = self.target.resume(frozenset(self.breakpoints), interrupted)
+        if code is not None:
+            self.exited = True
+            self.stop = f'W{code & 0xFF:02x}'
+            self.log(f"gdb_server: program exited with code {code}")
+        else:
+            self.stop = f'S{SIGINT if interrupts else SIGTRAP:02x}'
+        return self.stop
+
+
+class IssTarget:
+    """Target on a scripts/iss.py instance."""
+
+    def __init__(self, iss):
+        self.iss = iss
+
+    def read_registers(self):
+        return list(self.iss.x) + [self.iss.pc]
+
+    def write_registers(self, values):
+        self.iss.x[1:32] = values[1:32]                  # in place: decoded closures hold x
+        self.iss.pc = values[32] & MASK
+
+    def _words(self, kind):
+        return self.iss.imem if kind == 'imem' else self.iss.words
+
+    def _read_words(self, span):
+        values = []
+        for w in span:
+            kind = region((w << 2) & MASK)
+            if kind is None:
+                return None
+            values.append(self._words(kind)[w & (MEM_WORDS - 1)])
+        return values
+
+    def read_memory(self, addr, length):
+        values = self._read_words(word_span(addr, length))
+        if values is None:
+            return None
+        off = addr & 3
+        return b''.join(v.to_bytes(4, 'little') for v in values)[off:off + length]
+
+    def write_memory(self, addr, data):
+        span = word_span(addr, len(data))
+        old = self._read_words(span)
+        if old is None:
+            return False
+        for w, value in zip(span, merge_bytes(addr, data, old)):
+            if region((w << 2) & MASK) == 'imem':
+                self.iss.load_words([value], base=w & (MEM_WORDS - 1))   # drops decoded closures
+            else:
+                self.iss.words[w & (MEM_WORDS - 1)] = value
+        return True
+
+    def _step(self):
+        iss = self.iss
+        pc = iss.pc
+        try:
+            iss.step()
+        except iss_model.Halt as h:
+            # Same bookkeeping as Iss.run for the store that raised it
+            iss.pc = (pc + 4) & MASK
+            iss.cycles += iss_model.CYCLES_ALU
+            iss.instret += 1
+            return h.value >> 1
+        return None
+
+    def step(self):
+        return self._step()
+
+    def resume(self, breakpoints, interrupted):
+        iss = self.iss
+        n = 0
+        while True:
+            code = self._step()
+            if code is not None:
+                return code
+            if iss.pc in breakpoints:
+                return None
+            n += 1
+            if n % POLL_STEPS == 0 and interrupted():
+                return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='GDB server running a program on the ISS.')
+    parser.add_argument('program', help='ELF, .mem, .bin or .state checkpoint')
+    parser.add_argument('--port', type=int, default=3333, help='TCP port (default: %(default)s)')
+    parser.add_argument('--console', action='store_true',
+                        help='tohost writes are raw console characters (sw/main.c)')
+    args = parser.parse_args()
+
+    iss = iss_model.Iss()
+    try:
+        iss.load(args.program)
+    except (OSError, ValueError, elf_loader.ElfError, checkpoint.CheckpointError) as e:
+        sys.exit(f"gdb_server: {e}")
+    if args.console:
+        def putc(value):
+            sys.stdout.write(chr(value & 0xFF))
+            sys.stdout.flush()
+            return False
+        iss.on_tohost = putc
+    else:
+        htif.HostProxy.for_iss(iss)
+    outcome = GdbServer(IssTarget(iss)).serve(args.port)
+    print(f"gdb_server: session {outcome}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
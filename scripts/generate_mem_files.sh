@@ -1,20 +1,13 @@
 #!/bin/bash
-# Converts all pre-compiled .bin test files to $readmemh-compatible .mem files.
+# Builds sparse memory images for all pre-compiled ISA test ELFs: <test>.mem
+# for instruction memory plus the data lane files <test>.b0.mem .. b3.mem,
+# each holding only the populated addresses (see scripts/elf_loader.py).
+# Runs in a single Python process; images that are already up to date are skipped.
 
 SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
 PROJECT_ROOT="$(cd "$SCRIPT_DIR/.." && pwd)"
 GEN_DIR="$PROJECT_ROOT/tests/isa/generated"
 MEM_DIR="$PROJECT_ROOT/tests/isa/mem"
-BIN_TO_MEM="$SCRIPT_DIR/bin_to_mem.py"
+ELF_LOADER="$SCRIPT_DIR/elf_loader.py"
 
-mkdir -p "$MEM_DIR"
-
-count=0
-for bin_file in "$GEN_DIR"/*.bin; do
-    [ -f "$bin_file" ] || continue
-    test_name=$(basename "$bin_file" .bin)
-    python3 "$BIN_TO_MEM" "$bin_file" "$MEM_DIR/${test_name}.mem"
-    count=$((count + 1))
-done
-
-echo "Generated $count .mem files in $MEM_DIR"
+python3 "$ELF_LOADER" --dir --jobs 0 "$@" "$GEN_DIR" "$MEM_DIR"
@@ -0,0 +1,139 @@
+"""Host side of the HTIF-style tohost/fromhost channel.
+
+Programs talk to the simulation host through two words next to each other
+in the instruction memory window (sw/htif.h is the program side):
+
+  tohost   0x80002000  write-only; every store is a host request
+  fromhost 0x80002004  mailbox register in riscv_core; the host writes 1
+                       here when a syscall has completed
+
+A tohost value is `device << 24 | command << 16 | payload`, a 32-bit
+version of spike's HTIF encoding:
+
+  device 0, odd value    exit(value >> 1); tohost = 1 is PASS, as before
+  device 0, even value   syscall: the value is the data memory address of
+                         `uint32_t magic[4] = {which, arg0, arg1, arg2}`.
+                         The host stores the result in magic[0] (high word
+                         of 64-bit results in magic[1]) and sets fromhost.
+  device 1, command 1    putchar(payload & 0xFF); no reply
+
+Syscalls: SYS_write (64: fd, buf, len) prints to the console for fd 1/2
+and returns len, SYS_exit (93: code), and SYS_cycle (2048), which returns
+the simulated cycle count (mcycle) without the program touching the CSRs.
+Anything else returns -ENOSYS.
+
+HostProxy implements the host on top of a few accessors, so the ISS
+(scripts/iss.py), the cocotb environment (tb/uvm) and any other harness
+share it; tb_isa_test.v implements the same protocol in Verilog.
+"""
+import sys
+
+MASK = 0xFFFFFFFF
+MEM_BYTES = 0x8000            # data_memory is aliased on address[14:0]
+
+DEV_SYSCALL = 0
+DEV_CONSOLE = 1
+CMD_PUTCHAR = 1
+
+SYS_WRITE = 64
+SYS_EXIT = 93
+SYS_CYCLE = 2048
+ENOSYS = 38
+
+
+def decode(value):
+    """(device, command, payload) of a tohost value."""
+    return value >> 24, (value >> 16) & 0xFF, value & 0xFFFF
+
+
+def exit_code(value):
+    """Exit code of an exit request (odd device-0 value), else None."""
+    if value >> 24 == DEV_SYSCALL and value & 1:
+        return value >> 1
+    return None
+
+
+class HostProxy:
+    """Services tohost requests of one program.
+
+    `read_bytes(addr, n)` and `write_word(addr, value)` access data memory,
+    `set_fromhost(value)` writes the mailbox and `cycles()` returns the
+    current cycle count. Console text goes to `write` (default stdout).
+    """
+
+    def __init__(self, read_bytes, write_word, set_fromhost, cycles, write=None):
+        self.read_bytes = read_bytes
+        self.write_word = write_word
+        self.set_fromhost = set_fromhost
+        self.cycles = cycles
+        self.write = write or _stdout
+        self.exit_value = None     # tohost value of the exit request, once exited
+        self.requests = 0
+
+    @classmethod
+    def for_iss(cls, iss, write=None):
+        """Proxy on an Iss instance; installs itself as iss.on_tohost."""
+        dmem = iss.dmem
+
+        def read_bytes(addr, n):
+            addr &= MEM_BYTES - 1
+            return bytes(dmem[addr:addr + n])
+
+        def write_word(addr, value):
+            iss.words[(addr & (MEM_BYTES - 1)) >> 2] = value & MASK
+
+        def set_fromhost(value):
+            iss.fromhost = value
+
+        proxy = cls(read_bytes, write_word, set_fromhost, lambda: iss.cycles, write)
+        iss.on_tohost = proxy.handle
+        return proxy
+
+    @property
+    def exited(self):
+        return self.exit_value is not None
+
+    def handle(self, value):
+        """Services one tohost write; returns True when the program exited."""
+        self.requests += 1
+        device, command, payload = decode(value)
+        if device == DEV_CONSOLE:
+            if command == CMD_PUTCHAR:
+                self.write(chr(payload & 0xFF))
+            return False
+        if device != DEV_SYSCALL or value == 0:
+            self.exit_value = value        # not a request this host knows: stop
+            return True
+        if value & 1:
+            self.exit_value = value
+            return True
+        return self._syscall(value)
+
+    def _syscall(self, addr):
+        which, a0, a1, a2 = (int.from_bytes(self.read_bytes(addr + 4 * i, 4), 'little')
+                             for i in range(4))
+        result = 0
+        if which == SYS_EXIT:
+            self.exit_value = ((a0 << 1) | 1) & MASK
+            return True
+        if which == SYS_WRITE:
+            if a0 in (1, 2):
+                self.write(self.read_bytes(a1, a2).decode('utf-8', errors='replace'))
+                result = a2
+            else:
+                result = -ENOSYS
+        elif which == SYS_CYCLE:
+            cycles = self.cycles()
+            result = cycles & MASK
+            self.write_word(addr + 4, cycles >> 32)
+        else:
+            result = -ENOSYS
+        self.write_word(addr, result & MASK)
+        self.set_fromhost(1)
+        return False
+
+
+def _stdout(text):
+    sys.stdout.write(text)
+    if '\n' in text:
+        sys.stdout.flush()
@@ -0,0 +1,1032 @@
+#!/usr/bin/env python3
+"""Python instruction set simulator (golden model) for riscv_core.
+
+Mirrors the RTL rather than the ISA manual where the two differ, so it can
+be used as a reference without spike or sail:
+
+  * reset PC 0x80000000; instructions are fetched from the 32 KB
+    instruction_memory window 0x80000000-0x80007FFF (NOP outside it);
+  * loads in that window read instruction_memory, stores to it are dropped
+    (except the tohost word 0x80002000, which raises a host write, and the
+    fromhost mailbox 0x80002004, a plain register; see scripts/htif.py);
+  * timer at 0xFFFF0000 (mtime/mtimecmp), GPIO at 0xFFFF0010, everything
+    else is the 32 KB data_memory aliased on address[14:0];
+  * csr_file.v: mstatus/mie/mtvec/mepc/mcause/mip, ECALL/EBREAK/MRET and
+    timer/external interrupts taken in S_FETCH;
+  * performance counters derived from the cycle model: mcycle, minstret,
+    mhpmcounter3 (load S_MEM_WB cycles) and mhpmcounter5 (traps).
+    mhpmcounter4 (taken branches) and mhpmcounter6 (debug stalls) read 0
+    and mcountinhibit is plain storage;
+  * RV32IM + Zicsr, M as implemented by muldiv.v;
+  * cycle counts follow the FSM: 2 cycles per instruction, 3 per load,
+    35 per division (muldiv.v holds S_EXEC), 1 for taking an interrupt.
+    mtime advances once per cycle.
+
+Every instruction is decoded once into a Python closure specialised for its
+operation and operands, and cached by PC. instruction_memory is not
+writable from the core, so the cache is only flushed when a program is
+loaded. Code that runs often (BLOCK_HOT visits) is compiled further into
+blocks: straight-line runs up to a branch or jump with every operation
+inlined, executed by Iss.run with one call as long as no interrupt or
+cycle limit falls inside them, so results stay cycle-exact. The loop keeps
+the cycle and instruction counts in locals, and the closures that can
+observe them (CSR accesses, traps, MMIO and tohost) write them back
+through Iss._sync first.
+
+Usage:
+    python3 scripts/iss.py <program.elf|.mem|.bin|.state>... [--max-cycles N]
+        [--console] [--quiet]
+
+A <prefix>.state program resumes from a checkpoint (scripts/checkpoint.py);
+--max-cycles then counts from the checkpoint's cycle.
+
+tohost writes are serviced as HTIF requests (putchar, write, exit, cycle
+query; see scripts/htif.py) unless --console selects the raw one
+character per write console of sw/main.c.
+"""
+import argparse
+import os
+import sys
+import time
+
+import checkpoint
+import elf_loader
+import htif
+
+MASK = 0xFFFFFFFF
+RESET_PC = 0x80000000
+NOP = 0x00000013
+IMEM_WINDOW = 0x10000         # address[31:15] of the instruction memory window
+MEM_BYTES = elf_loader.MEM_BYTES
+MEM_WORDS = elf_loader.MEM_WORDS
+TOHOST_ADDR = 0x80002000
+FROMHOST_ADDR = 0x80002004
+TIMER_BASE, TIMER_END = 0xFFFF0000, 0xFFFF000F
+GPIO_BASE, GPIO_END = 0xFFFF0010, 0xFFFF001F
+
+CSR_MSTATUS, CSR_MIE, CSR_MTVEC = 0x300, 0x304, 0x305
+CSR_MEPC, CSR_MCAUSE, CSR_MIP = 0x341, 0x342, 0x344
+CSR_MCOUNTINHIBIT = 0x320
+
+CAUSE_BREAKPOINT = 3
+CAUSE_ECALL_M = 11
+CAUSE_TIMER_INT = 0x80000007
+CAUSE_EXT_INT = 0x8000000B
+
+# FSM cycles per retired instruction (S_FETCH + S_EXEC [+ S_MEM_WB])
+CYCLES_ALU = 2
+CYCLES_LOAD = 3
+CYCLES_DIV = CYCLES_ALU + 33  # muldiv.v: 1 setup + 32 iteration cycles
+CYCLES_IRQ = 1
+
+NEVER = 1 << 64               # interrupt deadline when none can be taken
+
+
+def sext(value, bits):
+    sign = 1 << (bits - 1)
+    return (value & (sign - 1)) - (value & sign)
+
+
+class Halt(Exception):
+    """Raised from inside an instruction to stop the run loop."""
+
+    def __init__(self, reason, value=None):
+        super().__init__(reason)
+        self.reason = reason
+        self.value = value
+
+
+# ----------------------------------------------------------------------
+# Closure templates
+#
+# Each template is compiled once per operation into a factory; decoding an
+# instruction binds the factory to its operands, so the closure that runs
+# has the operation inlined instead of dispatching on it.
+# ----------------------------------------------------------------------
+
+_ALU_OPS = {
+    'add': '({a} + {b}) & 0xFFFFFFFF',
+    'sub': '({a} - {b}) & 0xFFFFFFFF',
+    'sll': '({a} << ({b} & 31)) & 0xFFFFFFFF',
+    'slt': 'int(({a} ^ 0x80000000) < ({b} ^ 0x80000000))',
+    'sltu': 'int({a} < {b})',
+    'xor': '{a} ^ {b}',
+    'srl': '{a} >> ({b} & 31)',
+    'sra': '((({a} ^ 0x80000000) - 0x80000000) >> ({b} & 31)) & 0xFFFFFFFF',
+    'or': '{a} | {b}',
+    'and': '{a} & {b}',
+}
+
+# RV32M by funct3; _div/_rem are bound in the factory namespace
+_MULDIV_OPS = {
+    0: '({a} * {b}) & 0xFFFFFFFF',
+    1: '(((({a} ^ 0x80000000) - 0x80000000) * (({b} ^ 0x80000000) - 0x80000000)) >> 32) & 0xFFFFFFFF',
+    2: '(((({a} ^ 0x80000000) - 0x80000000) * {b}) >> 32) & 0xFFFFFFFF',
+    3: '({a} * {b}) >> 32',
+    4: '_div({a}, {b})',
+    5: '({a} // {b} if {b} else 0xFFFFFFFF)',
+    6: '_rem({a}, {b})',
+    7: '({a} % {b} if {b} else {a})',
+}
+
+_BRANCH_CONDS = {
+    0: 'a == b',
+    1: 'a != b',
+    4: '(a ^ 0x80000000) < (b ^ 0x80000000)',
+    5: '(a ^ 0x80000000) >= (b ^ 0x80000000)',
+    6: 'a < b',
+    7: 'a >= b',
+}
+
+# data_memory fast paths; everything else goes through Iss.load_value/store
+_IS_DMEM = 'addr >> 15 != 0x10000 and addr < 0xFFFF0000'
+_HALF = '((words[(addr >> 2) & 0x1FFF] >> ((addr & 2) << 3)) & 0xFFFF)'
+_LOAD_VALUES = {
+    0: 'sext8[dmem[addr & 0x7FFF]]',                                  # LB
+    1: f'(({_HALF} ^ 0x8000) - 0x8000) & 0xFFFFFFFF',                 # LH
+    2: 'words[(addr >> 2) & 0x1FFF]',                                 # LW
+    4: 'dmem[addr & 0x7FFF]',                                         # LBU
+    5: _HALF,                                                         # LHU
+}
+_STORES = {
+    0: 'dmem[addr & 0x7FFF] = value & 0xFF',                          # SB
+    1: 'dmem[(addr & 0x7FFC) | (addr & 2)] = value & 0xFF; '
+       'dmem[(addr & 0x7FFC) | (addr & 2) | 1] = (value >> 8) & 0xFF',  # SH
+    2: 'words[(addr >> 2) & 0x1FFF] = value',                         # SW
+}
+
+_TEMPLATES = {
+    'alu_reg': '''
+def factory(x, rd, rs1, rs2):
+    def fn(pc):
+        x[rd] = {op}
+        return (pc + 4) & 0xFFFFFFFF
+    return fn
+''',
+    'alu_imm': '''
+def factory(x, rd, rs1, imm):
+    def fn(pc):
+        x[rd] = {op}
+        return (pc + 4) & 0xFFFFFFFF
+    return fn
+''',
+    'branch': '''
+def factory(x, rs1, rs2, imm):
+    def fn(pc):
+        a = x[rs1]
+        b = x[rs2]
+        if {cond}:
+            return (pc + imm) & 0xFFFFFFFF
+        return (pc + 4) & 0xFFFFFFFF
+    return fn
+''',
+    'load': '''
+def factory(x, rd, rs1, imm, dmem, words, load_value, sext8):
+    def fn(pc):
+        addr = (x[rs1] + imm) & 0xFFFFFFFF
+        if {is_dmem}:
+            value = {value}
+        else:
+            value = load_value(addr, {funct3})
+        if rd:
+            x[rd] = value
+        return (pc + 4) & 0xFFFFFFFF
+    return fn
+''',
+    'store': '''
+def factory(x, rs1, rs2, imm, dmem, words, store):
+    def fn(pc):
+        addr = (x[rs1] + imm) & 0xFFFFFFFF
+        value = x[rs2]
+        if {is_dmem}:
+            {store}
+        else:
+            store(addr, value, {funct3})
+        return (pc + 4) & 0xFFFFFFFF
+    return fn
+''',
+}
+
+def _div(a, b):
+    """DIV: rounds toward zero; /0 gives -1 and -2**31 / -1 overflows to -2**31."""
+    if b == 0:
+        return MASK
+    a, b = sext(a, 32), sext(b, 32)
+    q = abs(a) // abs(b)
+    return (-q if (a < 0) != (b < 0) else q) & MASK
+
+
+def _rem(a, b):
+    """REM: takes the dividend's sign; %0 gives the dividend."""
+    if b == 0:
+        return a
+    a, b = sext(a, 32), sext(b, 32)
+    r = abs(a) % abs(b)
+    return (-r if a < 0 else r) & MASK
+
+
+_factories = {}
+
+
+def _factory(kind, **fields):
+    key = (kind,) + tuple(sorted(fields.items()))
+    factory = _factories.get(key)
+    if factory is None:
+        namespace = {'_div': _div, '_rem': _rem}
+        exec(_TEMPLATES[kind].format(**fields), namespace)
+        factory = _factories[key] = namespace['factory']
+    return factory
+
+
+def _alu_name(funct3, bit30, r_type):
+    """ALU operation selected by alu_control_unit.v for OP / OP-IMM."""
+    if funct3 == 0:
+        return 'sub' if r_type and bit30 else 'add'
+    if funct3 == 5:
+        return 'sra' if bit30 else 'srl'
+    return ('add', 'sll', 'slt', 'sltu', 'xor', 'srl', 'or', 'and')[funct3]
+
+
+_SEXT8 = [sext(v, 8) & MASK for v in range(256)]
+
+
+def _no_sync():
+    pass
+
+
+# ----------------------------------------------------------------------
+# Blocks
+#
+# A straight-line run of instructions up to and including the first
+# branch or jump is compiled into one function with every operation
+# inlined, so the run loop dispatches once per block. SYSTEM instructions
+# end a block before them. A load or store whose address is not plain
+# data_memory returns BAIL | its PC before touching anything, and the run
+# loop executes it on its own through the per-instruction closures.
+# ----------------------------------------------------------------------
+
+BLOCK_MAX = 64                # instructions per block
+BLOCK_HOT = 50                 # single-step visits of a PC before compiling a block there
+BAIL = 1 << 32
+
+
+def _cycles(inst):
+    """FSM cycles of `inst` (as charged by Iss._decode)."""
+    opcode = inst & 0x7F
+    if opcode == 0x03:
+        return CYCLES_LOAD
+    if opcode == 0x33 and inst >> 25 == 1 and inst & 0x4000:
+        return CYCLES_DIV
+    return CYCLES_ALU
+
+
+def _block_lines(inst, pc):
+    """(statements, ends block) for `inst` at `pc` inside a block body."""
+    opcode = inst & 0x7F
+    rd = (inst >> 7) & 0x1F
+    funct3 = (inst >> 12) & 0x7
+    rs1 = (inst >> 15) & 0x1F
+    rs2 = (inst >> 20) & 0x1F
+    bit30 = (inst >> 30) & 1
+    imm_i = sext(inst >> 20, 12)
+    a, b = f'x[{rs1}]', f'x[{rs2}]'
+    nxt = (pc + 4) & MASK
+
+    if opcode == 0x33:                                    # R-type / RV32M
+        if not rd:
+            return [], False
+        if inst >> 25 == 1:
+            op = _MULDIV_OPS[funct3]
+        else:
+            op = _ALU_OPS[_alu_name(funct3, bit30, True)]
+        return [f'x[{rd}] = ' + op.format(a=a, b=b)], False
+    if opcode == 0x13:                                    # I-type arithmetic
+        if not rd:
+            return [], False
+        op = _ALU_OPS[_alu_name(funct3, bit30, False)]
+        return [f'x[{rd}] = ' + op.format(a=a, b=imm_i & MASK)], False
+    if opcode == 0x03:                                    # loads
+        lines = [f'addr = ({a} + {imm_i}) & 0xFFFFFFFF',
+                 f'if not ({_IS_DMEM}):',
+                 f'    return {BAIL | pc}']
+        if rd:
+            lines.append(f'x[{rd}] = ' + _LOAD_VALUES.get(funct3, '0'))
+        return lines, False
+    if opcode == 0x23:                                    # stores
+        imm_s = sext(((inst >> 25) << 5) | rd, 12)
+        return [f'addr = ({a} + {imm_s}) & 0xFFFFFFFF',
+                f'if not ({_IS_DMEM}):',
+                f'    return {BAIL | pc}',
+                f'value = {b}',
+                _STORES.get(funct3, 'pass')], False
+    if opcode == 0x63:                                    # branches
+        cond = _BRANCH_CONDS.get(funct3)
+        if cond is None:                                  # funct3 010/011: never taken
+            return [], False
+        imm_b = sext(((inst >> 31) << 12) | (((inst >> 7) & 1) << 11) |
+                     (((inst >> 25) & 0x3F) << 5) | (((inst >> 8) & 0xF) << 1), 13)
+        return [f'a = {a}', f'b = {b}', f'if {cond}:', f'    return {(pc + imm_b) & MASK}',
+                f'return {nxt}'], True
+    if opcode == 0x6F:                                    # JAL
+        imm_j = sext(((inst >> 31) << 20) | (((inst >> 12) & 0xFF) << 12) |
+                     (((inst >> 20) & 1) << 11) | (((inst >> 21) & 0x3FF) << 1), 21)
+        lines = [f'x[{rd}] = {nxt}'] if rd else []
+        return lines + [f'return {(pc + imm_j) & MASK}'], True
+    if opcode == 0x67:                                    # JALR
+        lines = [f'target = ({a} + {imm_i}) & 0xFFFFFFFE']
+        if rd:
+            lines.append(f'x[{rd}] = {nxt}')
+        return lines + ['return target'], True
+    if opcode == 0x37 or opcode == 0x17:                  # LUI / AUIPC
+        if not rd:
+            return [], False
+        imm_u = inst & 0xFFFFF000
+        return [f'x[{rd}] = {imm_u if opcode == 0x37 else (pc + imm_u) & MASK}'], False
+    return [], False                                      # FENCE and unknown: NOP
+
+
+class Iss:
+    """Architectural state and interpreter for one riscv_core hart."""
+
+    def __init__(self, ext_interrupt=False, gpio_input=0):
+        self._ext_interrupt = bool(ext_interrupt)
+        self.gpio_input = gpio_input
+        self.on_tohost = None       # callable(value) -> True to halt; default: halt
+        self.imem = [NOP] * MEM_WORDS
+        self.dmem = bytearray(MEM_BYTES)
+        # Word view of data_memory for LW/SW (the host is little-endian like the core)
+        self.words = memoryview(self.dmem).cast('I')
+        self._decoded = {}
+        self._blocks = {}           # entry PC -> compiled block, or False
+        self._heat = {}             # entry PC -> single-step visits before compiling
+        self._sync = _no_sync       # run() installs a write-back of its cycles/instret
+        self.reset()
+
+    # ------------------------------------------------------------------
+    # State
+    # ------------------------------------------------------------------
+
+    def reset(self):
+        """Resets the hart; memories keep their contents like the FPGA BRAMs."""
+        self.x = [0] * 32
+        self.pc = RESET_PC
+        self.cycles = 0
+        self.instret = 0
+        self.mstatus = 0
+        self.mie = 0
+        self.mtvec = 0
+        self.mepc = 0
+        self.mcause = 0
+        self.mtimecmp = 0
+        self.gpio_data = 0
+        self.gpio_dir = 0
+        self.traps = 0
+        self.exceptions = 0
+        self.mcountinhibit = 0
+        self.fromhost = 0
+        self._counter_offsets = {}  # counter index -> software-written offset
+        self._flush()               # closures capture self.x
+        self._update_irq()
+
+    @property
+    def mtime(self):
+        return self.cycles & 0xFFFFFFFFFFFFFFFF
+
+    @property
+    def mip(self):
+        timer = self.mtime >= self.mtimecmp
+        return (int(self._ext_interrupt) << 11) | (int(timer) << 7)
+
+    @property
+    def ext_interrupt(self):
+        return self._ext_interrupt
+
+    @ext_interrupt.setter
+    def ext_interrupt(self, level):
+        self._ext_interrupt = bool(level)
+        self._update_irq()
+
+    def _update_irq(self):
+        """Recomputes the first cycle at which an interrupt can be taken.
+
+        Called whenever mstatus, mie, mtimecmp or the external line change,
+        so the run loop only compares the cycle count against a deadline.
+        """
+        if not self.mstatus & 0x8:
+            self._irq_at = NEVER
+        elif self.mie & 0x800 and self._ext_interrupt:
+            self._irq_at = 0
+        elif self.mie & 0x80:
+            self._irq_at = self.mtimecmp
+        else:
+            self._irq_at = NEVER
+
+    def interrupt_cause(self):
+        """Pending interrupt cause as seen in S_FETCH, or None."""
+        if not self.mstatus & 0x8:
+            return None
+        if self.mie & 0x800 and self._ext_interrupt:
+            return CAUSE_EXT_INT
+        if self.mie & 0x80 and self.mtime >= self.mtimecmp:
+            return CAUSE_TIMER_INT
+        return None
+
+    # ------------------------------------------------------------------
+    # Program loading
+    # ------------------------------------------------------------------
+
+    def load_elf(self, path):
+        """Loads an ELF the way elf_loader lays it out for the testbench."""
+        elf = elf_loader.ElfFile.load(path)
+        buf, ranges = elf_loader.instruction_image(elf)
+        for lo, hi in ranges:
+            self.imem[lo >> 2:hi >> 2] = elf_loader.bytes_to_words(buf[lo:hi])
+        buf, ranges = elf_loader.data_image(elf)
+        for lo, hi in ranges:
+            self.dmem[lo:hi] = buf[lo:hi]
+        self._flush()
+        return elf
+
+    def load_words(self, words, base=0):
+        self.imem[base:base + len(words)] = words
+        self._flush()
+
+    def load_mem(self, path, copy_data_section=True):
+        """Loads a $readmemh word file (optionally @address tagged).
+
+        The data lane files <prefix>.b0-3.mem next to it, as written by
+        elf_loader.py, are loaded into data memory like tb_isa_test.v's
+        +DATAFILE. Without them, `copy_data_section` lays the image out as
+        a flat objcopy binary: instr_mem words 0x400..0x7FF become .data.
+        """
+        for addr, value in elf_loader.read_mem(path):
+            self.imem[addr] = value
+        self._flush()
+        prefix = elf_loader.data_prefix(path)
+        if prefix:
+            buf, ranges = elf_loader.read_data_lanes(prefix)
+            for lo, hi in ranges:
+                self.dmem[lo:hi] = buf[lo:hi]
+        elif copy_data_section:
+            self._copy_data_section()
+
+    def load_bin(self, path, copy_data_section=True):
+        with open(path, 'rb') as f:
+            words = elf_loader.bytes_to_words(f.read()[:MEM_BYTES])
+        self.load_words(words)
+        if copy_data_section:
+            self._copy_data_section()
+
+    def load(self, path):
+        if path.endswith('.state'):
+            checkpoint.Checkpoint.load(path).restore_iss(self)
+        elif path.endswith('.mem'):
+            self.load_mem(path)
+        elif path.endswith('.bin'):
+            self.load_bin(path)
+        else:
+            self.load_elf(path)
+
+    def _copy_data_section(self):
+        for i in range(0x400, 0x800):
+            self.words[i] = self.imem[i]
+
+    # ------------------------------------------------------------------
+    # Memory-mapped I/O (mirrors riscv_core.v address decode)
+    # ------------------------------------------------------------------
+
+    def _timer_read(self, addr):
+        if addr == 0xFFFF0000:
+            return self.mtime & MASK
+        if addr == 0xFFFF0004:
+            return self.mtime >> 32
+        if addr == 0xFFFF0008:
+            return self.mtimecmp & MASK
+        if addr == 0xFFFF000C:
+            return self.mtimecmp >> 32
+        return 0
+
+    def _gpio_pins(self):
+        return ((self.gpio_data & self.gpio_dir) | (self.gpio_input & ~self.gpio_dir)) & 0xFF
+
+    def load_value(self, addr, funct3):
+        """Value written back by a load from `addr` (RTL read mux semantics)."""
+        if TIMER_BASE <= addr <= TIMER_END:
+            return self._timer_read(addr)
+        if GPIO_BASE <= addr <= GPIO_END:
+            if addr == 0xFFFF0010:
+                return self._gpio_pins()
+            return self.gpio_dir if addr == 0xFFFF0014 else 0
+        if addr == FROMHOST_ADDR:
+            return self.fromhost
+        if addr >> 15 == IMEM_WINDOW:
+            raw = self.imem[(addr >> 2) & (MEM_WORDS - 1)]
+        else:
+            raw = self.words[(addr >> 2) & (MEM_WORDS - 1)]
+        off = addr & 3
+        if funct3 == 2:                                   # LW
+            return raw
+        if funct3 == 1:                                   # LH
+            return sext(raw >> 16 if off & 2 else raw, 16) & MASK
+        if funct3 == 0:                                   # LB
+            return sext(raw >> (8 * off), 8) & MASK
+        if funct3 == 5:                                   # LHU
+            return (raw >> 16 if off & 2 else raw) & 0xFFFF
+        if funct3 == 4:                                   # LBU
+            return (raw >> (8 * off)) & 0xFF
+        return 0
+
+    def store(self, addr, value, funct3):
+        """Performs a store as the RTL would; may raise Halt on tohost."""
+        if TIMER_BASE <= addr <= TIMER_END:
+            if addr == 0xFFFF0008:
+                self.mtimecmp = (self.mtimecmp & ~MASK) | value
+            elif addr == 0xFFFF000C:
+                self.mtimecmp = (self.mtimecmp & MASK) | (value << 32)
+            self._update_irq()
+            return
+        if GPIO_BASE <= addr <= GPIO_END:
+            if addr == 0xFFFF0010:
+                self.gpio_data = value
+            elif addr == 0xFFFF0014:
+                self.gpio_dir = value
+            return
+        if addr == TOHOST_ADDR:
+            if self.on_tohost is None or self.on_tohost(value):
+                raise Halt('tohost', value)
+            return
+        if addr == FROMHOST_ADDR:
+            self.fromhost = value
+            return
+        if addr >> 15 == IMEM_WINDOW:
+            return                                        # instruction memory is read-only
+        i = addr & (MEM_BYTES - 4)
+        off = addr & 3
+        if funct3 == 2:                                   # SW
+            self.words[i >> 2] = value
+        elif funct3 == 1:                                 # SH
+            h = i + (off & 2)
+            self.dmem[h] = value & 0xFF
+            self.dmem[h + 1] = (value >> 8) & 0xFF
+        elif funct3 == 0:                                 # SB
+            self.dmem[i + off] = value & 0xFF
+
+    # MMIO and tohost accesses may observe mtime or the counters (HTIF
+    # cycle queries), so they bring cycles/instret up to date first
+    def _load_slow(self, addr, funct3):
+        self._sync()
+        return self.load_value(addr, funct3)
+
+    def _store_slow(self, addr, value, funct3):
+        self._sync()
+        self.store(addr, value, funct3)
+
+    # ------------------------------------------------------------------
+    # CSRs (mirrors csr_file.v)
+    # ------------------------------------------------------------------
+
+    def counter(self, index):
+        """64-bit value of counter `index` (0 mcycle, 2 minstret, 3..6 mhpmcounterN).
+
+        Read from inside an instruction, so `cycles`/`instret` exclude it;
+        like the RTL, mcycle already includes its S_FETCH cycle.
+        """
+        if index == 0:
+            value = self.cycles + 1
+        elif index == 2:
+            value = self.instret - self.exceptions
+        elif index == 3:
+            value = (self.cycles - CYCLES_ALU * self.instret
+                     - CYCLES_IRQ * (self.traps - self.exceptions))
+        elif index == 5:
+            value = self.traps
+        else:
+            value = 0
+        return (value + self._counter_offsets.get(index, 0)) & 0xFFFFFFFFFFFFFFFF
+
+    @staticmethod
+    def _counter_csr(addr):
+        """(index, high) for a counter CSR address, else None."""
+        if addr >> 8 in (0xB, 0xC) and not addr & 0x78 and addr & 7 not in (1, 7):
+            return addr & 7, bool(addr & 0x80)
+        return None
+
+    def csr_read(self, addr):
+        if addr == CSR_MSTATUS:
+            return self.mstatus
+        if addr == CSR_MIE:
+            return self.mie
+        if addr == CSR_MTVEC:
+            return self.mtvec
+        if addr == CSR_MEPC:
+            return self.mepc
+        if addr == CSR_MCAUSE:
+            return self.mcause
+        if addr == CSR_MIP:
+            return self.mip
+        if addr == CSR_MCOUNTINHIBIT:
+            return self.mcountinhibit
+        counter = self._counter_csr(addr)
+        if counter:
+            value = self.counter(counter[0])
+            return value >> 32 if counter[1] else value & MASK
+        return 0
+
+    def csr_write(self, addr, value):
+        if addr == CSR_MSTATUS:
+            self.mstatus = value & 0x88
+            self._update_irq()
+        elif addr == CSR_MIE:
+            self.mie = value & 0x880
+            self._update_irq()
+        elif addr == CSR_MTVEC:
+            self.mtvec = value
+        elif addr == CSR_MEPC:
+            self.mepc = value
+        elif addr == CSR_MCAUSE:
+            self.mcause = value
+        elif addr == CSR_MCOUNTINHIBIT:
+            self.mcountinhibit = value & 0x7D
+        elif addr >> 8 == 0xB:
+            counter = self._counter_csr(addr)
+            if counter:
+                index, high = counter
+                old = self.counter(index)
+                new = (old & MASK) | (value << 32) if high else (old & ~MASK) | value
+                # The RTL write replaces this instruction's own increment of
+                # mcycle (its S_EXEC cycle) and minstret
+                if index in (0, 2):
+                    new -= 1
+                self._counter_offsets[index] = self._counter_offsets.get(index, 0) + new - old
+
+    def trap(self, pc, cause):
+        self.mepc = pc
+        self.mcause = cause
+        if not cause >> 31:
+            self.exceptions += 1                          # ECALL/EBREAK do not retire
+        mie = self.mstatus & 0x8
+        self.mstatus = (self.mstatus & ~0x88) | (mie << 4)   # MPIE = MIE, MIE = 0
+        self.traps += 1
+        self._update_irq()
+        return self.mtvec
+
+    def mret(self):
+        mpie = (self.mstatus >> 7) & 1
+        self.mstatus = (self.mstatus & ~0x8) | (mpie << 3) | 0x80
+        self._update_irq()
+        return self.mepc
+
+    # ------------------------------------------------------------------
+    # Decoder: returns (closure(pc) -> next_pc, cycles)
+    # ------------------------------------------------------------------
+
+    def fetch(self, pc):
+        """Instruction word the core fetches at `pc` (NOP outside instruction_memory)."""
+        return self.imem[(pc >> 2) & (MEM_WORDS - 1)] if pc >> 15 == IMEM_WINDOW else NOP
+
+    def decode(self, pc):
+        entry = self._decode(self.fetch(pc))
+        self._decoded[pc] = entry
+        return entry
+
+    def _flush(self):
+        """Drops every decoded closure and compiled block."""
+        self._decoded.clear()
+        self._blocks.clear()
+        self._heat.clear()
+
+    def _decode(self, inst):
+        x = self.x
+        opcode = inst & 0x7F
+        rd = (inst >> 7) & 0x1F
+        funct3 = (inst >> 12) & 0x7
+        rs1 = (inst >> 15) & 0x1F
+        rs2 = (inst >> 20) & 0x1F
+        bit30 = (inst >> 30) & 1
+        imm_i = sext(inst >> 20, 12)
+
+        def nop(pc):
+            return (pc + 4) & MASK
+
+        if opcode == 0x33 and inst >> 25 == 1:            # RV32M
+            cycles = CYCLES_DIV if funct3 & 4 else CYCLES_ALU
+            if rd == 0:
+                return nop, cycles
+            op = _MULDIV_OPS[funct3].format(a='x[rs1]', b='x[rs2]')
+            return _factory('alu_reg', op=op)(x, rd, rs1, rs2), cycles
+
+        if opcode == 0x33:                                # R-type
+            if rd == 0:
+                return nop, CYCLES_ALU
+            op = _ALU_OPS[_alu_name(funct3, bit30, True)].format(a='x[rs1]', b='x[rs2]')
+            return _factory('alu_reg', op=op)(x, rd, rs1, rs2), CYCLES_ALU
+
+        if opcode == 0x13:                                # I-type arithmetic
+            if rd == 0:
+                return nop, CYCLES_ALU
+            op = _ALU_OPS[_alu_name(funct3, bit30, False)].format(a='x[rs1]', b='imm')
+            return _factory('alu_imm', op=op)(x, rd, rs1, imm_i & MASK), CYCLES_ALU
+
+        if opcode == 0x03:                                # loads
+            make = _factory('load', is_dmem=_IS_DMEM, value=_LOAD_VALUES.get(funct3, '0'),
+                            funct3=funct3)
+            return make(x, rd, rs1, imm_i, self.dmem, self.words, self._load_slow,
+                        _SEXT8), CYCLES_LOAD
+
+        if opcode == 0x23:                                # stores
+            imm_s = sext(((inst >> 25) << 5) | rd, 12)
+            make = _factory('store', is_dmem=_IS_DMEM, store=_STORES.get(funct3, 'pass'),
+                            funct3=funct3)
+            return make(x, rs1, rs2, imm_s, self.dmem, self.words, self._store_slow), CYCLES_ALU
+
+        if opcode == 0x63:                                # branches
+            cond = _BRANCH_CONDS.get(funct3)
+            if cond is None:                              # funct3 010/011: never taken
+                return nop, CYCLES_ALU
+            imm_b = sext(((inst >> 31) << 12) | (((inst >> 7) & 1) << 11) |
+                         (((inst >> 25) & 0x3F) << 5) | (((inst >> 8) & 0xF) << 1), 13)
+            return _factory('branch', cond=cond)(x, rs1, rs2, imm_b), CYCLES_ALU
+
+        if opcode == 0x6F:                                # JAL
+            imm_j = sext(((inst >> 31) << 20) | (((inst >> 12) & 0xFF) << 12) |
+                         (((inst >> 20) & 1) << 11) | (((inst >> 21) & 0x3FF) << 1), 21)
+            def fn(pc):
+                if rd:
+                    x[rd] = (pc + 4) & MASK
+                return (pc + imm_j) & MASK
+            return fn, CYCLES_ALU
+
+        if opcode == 0x67:                                # JALR
+            def fn(pc):
+                target = (x[rs1] + imm_i) & 0xFFFFFFFE
+                if rd:
+                    x[rd] = (pc + 4) & MASK
+                return target
+            return fn, CYCLES_ALU
+
+        if opcode == 0x37 or opcode == 0x17:              # LUI / AUIPC
+            if rd == 0:
+                return nop, CYCLES_ALU
+            imm_u = inst & 0xFFFFF000
+            if opcode == 0x37:
+                def fn(pc):
+                    x[rd] = imm_u
+                    return (pc + 4) & MASK
+            else:
+                def fn(pc):
+                    x[rd] = (pc + imm_u) & MASK
+                    return (pc + 4) & MASK
+            return fn, CYCLES_ALU
+
+        if opcode == 0x73:                                # SYSTEM
+            return self._decode_system(inst, rd, funct3, rs1, rs2), CYCLES_ALU
+
+        # FENCE and anything the control unit does not know retire as NOPs
+        return nop, CYCLES_ALU
+
+    def _decode_system(self, inst, rd, funct3, rs1, rs2):
+        x = self.x
+        csr = inst >> 20
+        if funct3 == 0:
+            if csr == 0x000 or csr == 0x001:              # ECALL / EBREAK
+                cause = CAUSE_ECALL_M if csr == 0x000 else CAUSE_BREAKPOINT
+                def fn(pc):
+                    self._sync()
+                    return self.trap(pc, cause)
+                return fn
+            if csr == 0x302:                              # MRET
+                def fn(pc):
+                    return self.mret()
+                return fn
+            # Other funct3=000 SYSTEM encodings (WFI, ...) write the ALU sum
+            def fn(pc):
+                if rd:
+                    x[rd] = (x[rs1] + x[rs2]) & MASK
+                return (pc + 4) & MASK
+            return fn
+
+        csr_read, csr_write = self.csr_read, self.csr_write
+        use_imm = funct3 & 0x4
+        kind = funct3 & 0x3
+        writes = kind == 1 or rs1 != 0                    # CSRRS/CSRRC with x0 only read
+
+        def fn(pc):
+            self._sync()
+            old = csr_read(csr)
+            if writes:
+                src = rs1 if use_imm else x[rs1]
+                if kind == 1:
+                    new = src
+                elif kind == 2:
+                    new = old | src
+                else:
+                    new = old & ~src & MASK
+                csr_write(csr, new)
+            if rd:
+                x[rd] = old
+            return (pc + 4) & MASK
+        return fn
+
+    def compile_block(self, pc):
+        """(fn, count, cycles, span, last_pc, bails) of the block at `pc`, or
+        False if it starts with a SYSTEM instruction.
+
+        fn() runs the whole block and returns the next PC, or BAIL | pc of
+        a load/store that needs the slow path; bails maps that pc to the
+        (instructions, cycles) completed before it. span is the cycle
+        offset of the last instruction's start (for the interrupt and
+        limit checks), last_pc its address (for self-loop detection).
+        """
+        body = []
+        bails = {}
+        count = cycles = span = 0
+        start = pc
+        while count < BLOCK_MAX:
+            inst = self.fetch(pc)
+            if inst & 0x7F == 0x73:                       # SYSTEM: CSRs, traps, mret
+                break
+            lines, ends = _block_lines(inst, pc)
+            if inst & 0x7F in (0x03, 0x23):
+                bails[pc] = (count, cycles)
+            body.extend(lines)
+            span = cycles
+            count += 1
+            cycles += _cycles(inst)
+            last_pc = pc
+            pc = (pc + 4) & MASK
+            if ends:
+                break
+        else:
+            ends = False
+        if not count:
+            return False
+        if not ends:
+            body.append(f'return {pc}')
+        source = ('def factory(x, dmem, words, sext8):\n'
+                  '    def fn():\n' + ''.join(f'        {line}\n' for line in body) +
+                  '    return fn\n')
+        namespace = {'_div': _div, '_rem': _rem}
+        exec(compile(source, f'<block 0x{start:08x}>', 'exec'), namespace)
+        fn = namespace['factory'](self.x, self.dmem, self.words, _SEXT8)
+        return fn, count, cycles, span, last_pc, bails
+
+    # ------------------------------------------------------------------
+    # Execution
+    # ------------------------------------------------------------------
+
+    def step(self):
+        """Executes one FSM instruction slot; returns the retired PC or None for an interrupt."""
+        pc = self.pc
+        cause = self.interrupt_cause()
+        if cause is not None:
+            self.cycles += CYCLES_IRQ
+            self.pc = self.trap(pc, cause)
+            return None
+        fn, cycles = self._decoded.get(pc) or self.decode(pc)
+        self.pc = fn(pc)
+        self.cycles += cycles
+        self.instret += 1
+        return pc
+
+    def run(self, max_cycles=None, stop_on_self_loop=True):
+        """Runs until a halt condition; returns a Halt describing why.
+
+        Halt reasons: 'tohost' (value = stored word), 'self_loop' (PC did not
+        change, like the testbench's stall detector) or 'limit'.
+        """
+        decoded = self._decoded
+        decode = self.decode
+        blocks = self._blocks
+        heat = self._heat
+        limit = NEVER if max_cycles is None else max_cycles
+        pc = self.pc
+        cycles = self.cycles
+        instret = self.instret
+        single = False                                    # next instruction bailed out of a block
+
+        # The counts stay in locals; closures that can observe them (CSRs,
+        # traps, MMIO, tohost) call self._sync() to write them back first
+        def sync():
+            self.cycles = cycles
+            self.instret = instret
+        self._sync = sync
+        try:
+            while cycles < limit:
+                irq_at = self._irq_at
+                if cycles >= irq_at:
+                    self.cycles = cycles
+                    cause = self.interrupt_cause()
+                    if cause is not None:
+                        cycles += CYCLES_IRQ
+                        pc = self.trap(pc, cause)
+                        continue
+                block = blocks.get(pc)
+                if block and not single:
+                    fn, count, cost, span, last_pc, bails = block
+                    # Only blocks that no interrupt or the limit can cut short;
+                    # nothing inside one can move the deadline (see BAIL)
+                    if cycles + span < irq_at and cycles + span < limit:
+                        next_pc = fn()
+                        if next_pc >= BAIL:
+                            pc = next_pc - BAIL
+                            done, spent = bails[pc]
+                            cycles += spent
+                            instret += done
+                            single = True
+                            continue
+                        cycles += cost
+                        instret += count
+                        if next_pc == last_pc and stop_on_self_loop:
+                            pc = next_pc
+                            return Halt('self_loop', pc)
+                        pc = next_pc
+                        continue
+                elif block is None:
+                    visits = heat.get(pc, 0) + 1
+                    heat[pc] = visits
+                    if visits >= BLOCK_HOT:
+                        blocks[pc] = self.compile_block(pc)
+                single = False
+                entry = decoded.get(pc)
+                if entry is None:
+                    entry = decode(pc)
+                fn, cost = entry
+                next_pc = fn(pc)
+                cycles += cost
+                instret += 1
+                if next_pc == pc and stop_on_self_loop:
+                    return Halt('self_loop', pc)
+                pc = next_pc
+            return Halt('limit')
+        except Halt as h:
+            cycles += CYCLES_ALU
+            instret += 1
+            pc = (pc + 4) & MASK
+            return h
+        finally:
+            self._sync = _no_sync
+            self.pc = pc
+            self.cycles = cycles
+            self.instret = instret
+
+    def verdict(self, halt):
+        """PASS/FAIL line in the same format as tb_isa_test.v."""
+        if halt.reason == 'tohost':
+            if halt.value == 1:                           # HTIF exit(0)
+                return 'PASS'
+            return f"FAIL: tohost=0x{halt.value:08x} (test case {halt.value >> 1})"
+        if halt.reason == 'self_loop':
+            if self.x[26] == 1 and self.x[27] == 1:
+                return 'PASS'
+            return f"FAIL: PC stalled at 0x{self.pc:08x}, x26={self.x[26]}, x27={self.x[27]}"
+        return f"FAIL: Timeout after {self.cycles} cycles"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='riscv_core instruction set simulator.')
+    parser.add_argument('programs', nargs='+', help='ELF, $readmemh .mem, raw .bin images or .state checkpoints')
+    parser.add_argument('--max-cycles', type=int, default=100000,
+                        help='cycle limit per program (default: %(default)s, like MAX_CYCLES)')
+    parser.add_argument('--console', action='store_true',
+                        help='treat tohost writes as raw console characters instead of '
+                             'HTIF requests (scripts/htif.py)')
+    parser.add_argument('--quiet', action='store_true', help='only print the verdicts')
+    args = parser.parse_args()
+
+    failed = 0
+    for path in args.programs:
+        name = os.path.basename(path)
+        iss = Iss()
+        try:
+            iss.load(path)
+        except (OSError, ValueError, elf_loader.ElfError, checkpoint.CheckpointError) as e:
+            print(f"{name:<35} ERROR: {e}")
+            failed += 1
+            continue
+        if args.console:
+            def putc(value):
+                sys.stdout.write(chr(value & 0xFF))
+                sys.stdout.flush()
+                return False
+            iss.on_tohost = putc
+            proxy = None
+        else:
+            proxy = htif.HostProxy.for_iss(iss)
+        start, start_instret = time.perf_counter(), iss.instret
+        halt = iss.run(max_cycles=iss.cycles + args.max_cycles)
+        elapsed = time.perf_counter() - start
+        if proxy is not None and proxy.exited:
+            halt.value = proxy.exit_value
+        verdict = iss.verdict(halt)
+        failed += not verdict.startswith('PASS')
+        if args.quiet:
+            print(f"{name:<35} {verdict}")
+        else:
+            mips = (iss.instret - start_instret) / elapsed / 1e6 if elapsed else 0.0
+            print(f"{name:<35} {verdict}  [{iss.instret} instr, {iss.cycles} cycles, "
+                  f"{mips:.2f} MIPS]")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""Symbol-aware PC profiler for programs running on riscv_core.
+
+Post-processes the PC profile written by tb_isa_test.v (+PROFILE=<path>)
+or collects one from the ISS (--iss), resolves every PC against the ELF
+symbol table (or an objdump listing such as sw/main.dump) and reports:
+
+  * a flat profile: cycles and retired instructions per function, with
+    inclusive cycles when call stacks are available;
+  * a call graph: callers and callees of each hot function with call
+    counts;
+  * a folded-stack file (--folded) for flamegraph.pl / speedscope.
+
+Profiles come in two modes. Retired mode logs every instruction with the
+cycles it took, which lets the profiler rebuild call stacks from the
+JAL/JALR call and return conventions (rd/rs1 = ra or t0). Traps push the
+handler on top of the interrupted stack; MRET resumes the stack that was
+suspended at the return address, so FreeRTOS context switches land on the
+right task's stack. Sample mode (+PROFILE_PERIOD=N) only logs the PC every
+N cycles and gives a flat profile.
+
+Usage:
+    vvp build/tb_isa_test.vvp +TESTFILE=build/main.mem +DATAFILE=build/main \\
+        +CONSOLE +MAX_CYCLES=2000000 +PROFILE=build/main.prof
+    python3 scripts/pc_profile.py build/main.prof --elf sw/main.elf --folded main.folded
+    python3 scripts/pc_profile.py --iss sw/main.elf --max-cycles 2000000
+"""
+import argparse
+import bisect
+import collections
+import itertools
+import re
+import sys
+
+import elf_loader
+
+UNKNOWN = '[unknown]'
+MAX_DEPTH = 128
+LINK_REGS = (1, 5)            # ra, t0: the ABI's call/return link registers
+INSN_MRET = 0x30200073
+
+_DUMP_SYMBOL_RE = re.compile(r'^([0-9a-fA-F]+) <([^>]+)>:')
+_DUMP_INSN_RE = re.compile(r'^\s*([0-9a-fA-F]+):\s+([0-9a-fA-F]{8})\s')
+
+
+class Symbols:
+    """Maps PCs to function names and instruction words."""
+
+    def __init__(self, starts, names, words):
+        order = sorted(range(len(starts)), key=starts.__getitem__)
+        self.starts = [starts[i] for i in order]
+        self.names = [names[i] for i in order]
+        self.words = words          # {pc: instruction word}
+        self._cache = {}
+
+    @classmethod
+    def from_elf(cls, path):
+        elf = elf_loader.ElfFile.load(path)
+        best = {}
+        for sym in elf.code_symbols():
+            # Prefer typed functions, then global symbols, at a shared address
+            rank = (sym.type == elf_loader.STT_FUNC, sym.bind != 0)
+            if sym.value not in best or rank > best[sym.value][0]:
+                best[sym.value] = (rank, sym.name)
+        words = {}
+        for seg in elf.segments:
+            if seg.executable:
+                data = seg.data
+                for off in range(0, len(data) - 3, 4):
+                    words[seg.vaddr + off] = int.from_bytes(data[off:off + 4], 'little')
+        return cls(list(best), [name for _, name in best.values()], words)
+
+    @classmethod
+    def from_dump(cls, path):
+        starts, names, words = [], [], {}
+        with open(path, errors='replace') as f:
+            for line in f:
+                m = _DUMP_SYMBOL_RE.match(line)
+                if m:
+                    starts.append(int(m.group(1), 16))
+                    names.append(m.group(2))
+                    continue
+                m = _DUMP_INSN_RE.match(line)
+                if m:
+                    words[int(m.group(1), 16)] = int(m.group(2), 16)
+        return cls(starts, names, words)
+
+    def function(self, pc):
+        name = self._cache.get(pc)
+        if name is None:
+            i = bisect.bisect_right(self.starts, pc) - 1
+            name = self.names[i] if i >= 0 else UNKNOWN
+            self._cache[pc] = name
+        return name
+
+
+def read_profile(lines):
+    """Parses a testbench profile; returns (period, records).
+
+    `period` is 0 for retired mode. Records are ('pc', pc, cycles) or
+    ('trap', cause, epc) tuples, produced lazily.
+    """
+    lines = iter(lines)
+    first = next(lines, '')
+    period = 0
+    if first.startswith('# profile sample'):
+        period = int(first.split()[3])
+    elif not first.startswith('#'):
+        lines = itertools.chain([first], lines)
+
+    def records():
+        for line in lines:
+            parts = line.split()
+            if len(parts) == 2:
+                yield 'pc', int(parts[0], 16), int(parts[1])
+            elif len(parts) == 3 and parts[0] == 'T':
+                yield 'trap', int(parts[1], 16), int(parts[2], 16)
+    return period, records()
+
+
+def iss_profile(program, max_cycles, period=0):
+    """Runs `program` on scripts/iss.py and yields profile records."""
+    import iss as iss_model
+    sim = iss_model.Iss()
+    sim.load(program)
+    sim.on_tohost = lambda value: False
+    last = 0
+    next_sample = period
+    while sim.cycles < max_cycles:
+        pc = sim.pc
+        traps = sim.traps
+        try:
+            retired = sim.step()
+        except iss_model.Halt:
+            return
+        if period:
+            while sim.cycles >= next_sample:
+                yield 'pc', pc, period
+                next_sample += period
+            continue
+        if retired is not None:
+            yield 'pc', pc, sim.cycles - last
+            last = sim.cycles
+        if sim.traps != traps:
+            yield 'trap', sim.mcause, sim.mepc
+        if retired is not None and sim.pc == pc:
+            return                                        # end-of-program self loop
+
+
+class Profile:
+    def __init__(self, symbols):
+        self.symbols = symbols
+        self.cycles = collections.Counter()       # self cycles per function
+        self.instret = collections.Counter()
+        self.folded = collections.Counter()       # stack tuple -> cycles
+        self.calls = collections.Counter()        # (caller, callee) -> count
+        self.total_cycles = 0
+        self.total_instret = 0
+        self.traps = 0
+        self.has_stacks = False
+
+    def add_samples(self, records):
+        function = self.symbols.function
+        for kind, pc, cycles in records:
+            if kind != 'pc':
+                continue
+            f = function(pc)
+            self.cycles[f] += cycles
+            self.folded[(f,)] += cycles
+            self.total_cycles += cycles
+
+    def add_retired(self, records):
+        """Accumulates a retired-mode record stream, rebuilding call stacks."""
+        self.has_stacks = True
+        function = self.symbols.function
+        words = self.symbols.words
+        stack = []
+        suspended = {}          # resume PC -> stack interrupted by a trap
+        pending = None          # 'call', 'ret' or 'mret' from the previous instruction
+        caller = None
+        for kind, a, b in records:
+            if kind == 'trap':
+                cause, epc = a, b
+                self.traps += 1
+                # Interrupts resume at epc; ECALL/EBREAK handlers return to epc + 4
+                resume = epc if cause >> 31 else (epc + 4) & 0xFFFFFFFF
+                suspended[resume] = list(stack)
+                caller = stack[-1] if stack else None
+                pending = 'call'
+                continue
+
+            pc, cycles = a, b
+            f = function(pc)
+            if pending == 'call':
+                if stack and len(stack) < MAX_DEPTH:
+                    stack.append(f)
+                else:
+                    stack = stack[:-1] + [f] if stack else [f]
+                self.calls[(caller, f)] += 1
+            elif pending == 'ret':
+                if len(stack) > 1:
+                    stack.pop()
+            elif pending == 'mret':
+                stack = suspended.pop(pc, None) or [f]
+            if not stack:
+                stack = [f]
+            elif stack[-1] != f:
+                stack[-1] = f                             # tail call or fall-through
+            pending = None
+
+            self.cycles[f] += cycles
+            self.instret[f] += 1
+            self.folded[tuple(stack)] += cycles
+            self.total_cycles += cycles
+            self.total_instret += 1
+
+            inst = words.get(pc, 0)
+            opcode = inst & 0x7F
+            rd = (inst >> 7) & 0x1F
+            if opcode == 0x6F or opcode == 0x67:          # JAL / JALR
+                if rd in LINK_REGS:
+                    pending = 'call'
+                    caller = f
+                elif opcode == 0x67 and rd == 0 and (inst >> 15) & 0x1F in LINK_REGS:
+                    pending = 'ret'
+            elif inst == INSN_MRET:
+                pending = 'mret'
+
+    def inclusive(self):
+        """Cycles per function including its callees (counted once per stack)."""
+        out = collections.Counter()
+        for stack, cycles in self.folded.items():
+            for f in set(stack):
+                out[f] += cycles
+        return out
+
+    def write_folded(self, f):
+        for stack, cycles in sorted(self.folded.items()):
+            f.write(';'.join(stack) + f' {cycles}\n')
+
+    def report(self, top):
+        total = self.total_cycles or 1
+        inclusive = self.inclusive() if self.has_stacks else {}
+        lines = [f"Total: {self.total_cycles} cycles"
+                 + (f", {self.total_instret} instructions, {self.traps} traps" if self.has_stacks else '')]
+        lines.append('')
+        lines.append('Flat profile:')
+        header = f"  {'self%':>6} {'self cycles':>12}"
+        if self.has_stacks:
+            header += f" {'incl%':>6} {'instr':>10} {'CPI':>5}"
+        lines.append(header + '  function')
+        for f, cycles in self.cycles.most_common(top):
+            row = f"  {100.0 * cycles / total:6.2f} {cycles:12}"
+            if self.has_stacks:
+                n = self.instret[f]
+                cpi = f"{cycles / n:5.2f}" if n else '    -'
+                row += f" {100.0 * inclusive[f] / total:6.2f} {n:10} {cpi}"
+            lines.append(f"{row}  {f}")
+
+        if self.has_stacks:
+            callers = collections.defaultdict(collections.Counter)
+            callees = collections.defaultdict(collections.Counter)
+            for (caller, callee), n in self.calls.items():
+                callers[callee][caller or '<trap>'] += n
+                if caller:
+                    callees[caller][callee] += n
+            lines.append('')
+            lines.append('Call graph (by inclusive cycles):')
+            for f, cycles in inclusive.most_common(top):
+                lines.append(f"  {f}  [{100.0 * cycles / total:.2f}% incl, {self.cycles[f]} self]")
+                for c, n in callers[f].most_common(5):
+                    lines.append(f"      <- {c} ({n} calls)")
+                for c, n in callees[f].most_common(5):
+                    lines.append(f"      -> {c} ({n} calls, {inclusive[c]} cycles incl)")
+        return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Profile a program from its PC trace.')
+    parser.add_argument('profile', nargs='?', help='+PROFILE output of tb_isa_test.v')
+    parser.add_argument('--elf', help='ELF with a symbol table')
+    parser.add_argument('--dump', help='objdump -d listing (e.g. sw/main.dump) if there is no ELF')
+    parser.add_argument('--iss', metavar='PROGRAM', help='profile PROGRAM on scripts/iss.py instead')
+    parser.add_argument('--max-cycles', type=int, default=1000000,
+                        help='ISS cycle limit (default: %(default)s)')
+    parser.add_argument('--period', type=int, default=0,
+                        help='ISS sampling period in cycles (default: every instruction)')
+    parser.add_argument('--top', type=int, default=25, help='functions to list')
+    parser.add_argument('--folded', help='write folded stacks (flamegraph.pl input) here')
+    args = parser.parse_args()
+    if not args.profile and not args.iss:
+        parser.error('give a profile file or --iss PROGRAM')
+
+    elf = args.elf or (args.iss if args.iss and not args.iss.endswith(('.mem', '.bin')) else None)
+    try:
+        if elf:
+            symbols = Symbols.from_elf(elf)
+        elif args.dump:
+            symbols = Symbols.from_dump(args.dump)
+        else:
+            parser.error('symbols needed: pass --elf or --dump')
+    except (OSError, elf_loader.ElfError) as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+
+    profile = Profile(symbols)
+    if args.iss:
+        records = iss_profile(args.iss, args.max_cycles, args.period)
+        period = args.period
+        src = None
+    else:
+        src = open(args.profile, errors='replace')
+        period, records = read_profile(src)
+    try:
+        if period:
+            profile.add_samples(records)
+        else:
+            profile.add_retired(records)
+    finally:
+        if src:
+            src.close()
+
+    print(profile.report(args.top))
+    if args.folded:
+        with open(args.folded, 'w') as f:
+            profile.write_folded(f)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""Per-run performance reports from the csr_file.v counters.
+
+Counter values are collected from `PERF <name> <value>` lines, which come
+from either side of a run:
+
+  * the testbench: tb_isa_test.v with +PERF prints the counters from the
+    csr_file hierarchy when the test ends;
+  * the program itself: sw/perf_counters.h's perf_report() prints the same
+    lines over the tohost console as `PERF <name> <hi> <lo>`.
+
+A single value (the testbench) is decimal or 0x-prefixed hex; two values
+(perf_report(), printed with %x) are the hex high and low halves of the
+64-bit counter, with or without 0x. A log may hold several runs: a counter name
+that repeats starts a new run. With --iss the counters are taken from
+scripts/iss.py at the end of a run instead.
+
+Counters (see csr_file.v):
+    mcycle        clock cycles          mhpmcounter3  load S_MEM_WB cycles
+    minstret      retired instructions  mhpmcounter4  taken branches/jumps
+                                        mhpmcounter5  traps taken
+                                        mhpmcounter6  debug stall cycles
+On the PIPELINE=1 core mhpmcounter3 counts load-use interlock cycles.
+
+Usage:
+    vvp build/tb_isa_test.vvp +TESTFILE=... +PERF | python3 scripts/perf_report.py -
+    python3 scripts/perf_report.py run1.log run2.log [--json perf.json]
+    python3 scripts/perf_report.py --iss sw/main.elf --max-cycles 5000000
+    python3 -m doctest scripts/perf_report.py             # parser self-test
+"""
+import argparse
+import json
+import re
+import sys
+
+COUNTERS = ('mcycle', 'minstret', 'mhpmcounter3', 'mhpmcounter4', 'mhpmcounter5', 'mhpmcounter6')
+
+_PERF_RE = re.compile(r'PERF\s+(\w+)\s+((?:0x)?[0-9a-fA-F]+)(?:\s+((?:0x)?[0-9a-fA-F]+))?')
+
+
+def _number(text):
+    return int(text, 16) if text.lower().startswith('0x') else int(text)
+
+
+def parse_runs(lines):
+    """Returns a list of {counter: value} dicts, one per run found in `lines`.
+
+    >>> parse_runs(['PERF mcycle 1234', 'PERF minstret 0x10'])
+    [{'mcycle': 1234, 'minstret': 16}]
+    >>> parse_runs(['PERF mcycle 0 1a2b', 'PERF minstret 1 10', 'PERF mcycle 0x0 0x99'])
+    [{'mcycle': 6699, 'minstret': 4294967312}, {'mcycle': 153}]
+    """
+    runs = []
+    current = {}
+    for line in lines:
+        m = _PERF_RE.search(line)
+        if not m:
+            continue
+        name = m.group(1)
+        if m.group(3) is None:
+            value = _number(m.group(2))
+        else:
+            value = (int(m.group(2), 16) << 32) | int(m.group(3), 16)
+        if name in current:
+            runs.append(current)
+            current = {}
+        current[name] = value
+    if current:
+        runs.append(current)
+    return runs
+
+
+def iss_counters(program, max_cycles):
+    """Counters of scripts/iss.py after running `program` (console on tohost)."""
+    import iss as iss_model
+    sim = iss_model.Iss()
+    sim.load(program)
+    sim.on_tohost = lambda value: False
+    sim.run(max_cycles=max_cycles)
+    # Read between instructions: undo the in-flight S_FETCH cycle of counter()
+    counters = {'mcycle': sim.counter(0) - 1, 'minstret': sim.counter(2)}
+    for n in range(3, 7):
+        counters[f'mhpmcounter{n}'] = sim.counter(n)
+    return counters
+
+
+def derive(counters):
+    """Adds ratios to a run's raw counters."""
+    cycles = counters.get('mcycle', 0)
+    instret = counters.get('minstret', 0)
+    stalls = counters.get('mhpmcounter6', 0)
+    report = dict(counters)
+    report['cpi'] = (cycles - stalls) / instret if instret else None
+    report['load_cycle_pct'] = 100.0 * counters.get('mhpmcounter3', 0) / cycles if cycles else None
+    report['taken_per_kinstr'] = 1000.0 * counters.get('mhpmcounter4', 0) / instret if instret else None
+    report['stall_pct'] = 100.0 * stalls / cycles if cycles else None
+    return report
+
+
+def _fmt(value, spec):
+    return '-' if value is None else format(value, spec)
+
+
+def print_report(named_runs):
+    print(f"{'run':<28} {'cycles':>12} {'instret':>12} {'CPI':>6} {'load%':>6} "
+          f"{'br/ki':>7} {'traps':>8} {'stall%':>6}")
+    for name, r in named_runs:
+        print(f"{name:<28} {r.get('mcycle', 0):12} {r.get('minstret', 0):12} "
+              f"{_fmt(r['cpi'], '6.3f')} {_fmt(r['load_cycle_pct'], '6.1f')} "
+              f"{_fmt(r['taken_per_kinstr'], '7.1f')} {r.get('mhpmcounter5', 0):8} "
+              f"{_fmt(r['stall_pct'], '6.1f')}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Report csr_file performance counters.')
+    parser.add_argument('logs', nargs='*', help="logs with PERF lines ('-' for stdin)")
+    parser.add_argument('--iss', metavar='PROGRAM', action='append', default=[],
+                        help='run scripts/iss.py on PROGRAM and report its counters')
+    parser.add_argument('--max-cycles', type=int, default=1000000,
+                        help='ISS cycle limit (default: %(default)s)')
+    parser.add_argument('--json', help='also write the reports to this JSON file')
+    args = parser.parse_args()
+    if not args.logs and not args.iss:
+        parser.error('no logs or --iss programs given')
+
+    named_runs = []
+    for path in args.logs:
+        if path == '-':
+            runs = parse_runs(sys.stdin)
+        else:
+            with open(path, errors='replace') as f:
+                runs = parse_runs(f)
+        if not runs:
+            print(f"WARNING: no PERF lines in {path}", file=sys.stderr)
+        for i, counters in enumerate(runs):
+            name = path if len(runs) == 1 else f"{path}#{i + 1}"
+            named_runs.append((name, derive(counters)))
+    for program in args.iss:
+        named_runs.append((f"iss:{program}", derive(iss_counters(program, args.max_cycles))))
+
+    if not named_runs:
+        sys.exit(1)
+    print_report(named_runs)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump([{'run': name, **r} for name, r in named_runs], f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""Result cache that lets riscof skip tests whose inputs did not change.
+
+Entries are directories named by a SHA-256 key and hold the artifacts a
+plugin would otherwise regenerate (ELF, disassembly, signature). Keys are
+built from everything that influences those artifacts:
+
+  * the test source (its content plus `commit_id` from database.yaml),
+    the compile macros and the ISA string;
+  * the plugin environment (link.ld, model_test.h, arch_test.h, ...);
+  * for DUT results, the simulation image key from sim_cache, so an edit
+    to rtl/alu.v only invalidates DUT signatures. Reference signatures
+    never depend on the RTL and are only recomputed when the test changes.
+
+Compiled tests are shared between plugins: the `compile` namespace is
+keyed by the compile inputs only (test, macros, ISA, compiler version and
+the *contents* of the include/linker environment, not its path). Plugins
+with the same environment (spike and sail) therefore compile each test
+once per ISA/macro set across plugins and runs, and copy the entry's ELF
+and disassembly under their own names (my.elf, ref.elf, ref.disass).
+
+The cache lives in $RISCOF_CACHE_DIR (default
+~/.cache/simple_riscv_cpu/riscof); setting RISCOF_CACHE=0 disables it.
+
+Usage:
+    python3 scripts/riscof_cache.py stats
+    python3 scripts/riscof_cache.py clear
+"""
+import argparse
+import functools
+import hashlib
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'simple_riscv_cpu', 'riscof')
+ENV_SUFFIXES = ('.h', '.ld', '.S', '.s', '.inc')
+
+# gcc options every plugin compiles the arch tests with; the -T/-I paths
+# are covered by the environment digest instead
+GCC_OPTIONS = '-static -mcmodel=medany -fvisibility=hidden -nostdlib -nostartfiles'
+
+
+def cache_dir():
+    return os.environ.get('RISCOF_CACHE_DIR', DEFAULT_CACHE_DIR)
+
+
+def enabled():
+    return os.environ.get('RISCOF_CACHE', '1') not in ('0', '', 'no', 'off')
+
+
+@functools.lru_cache(maxsize=None)
+def file_digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def tree_digest(*directories):
+    """Digest of every header/linker/assembly file below `directories`."""
+    h = hashlib.sha256()
+    for directory in directories:
+        for root, dirs, files in os.walk(directory):
+            dirs.sort()
+            for name in sorted(files):
+                if name.endswith(ENV_SUFFIXES):
+                    path = os.path.join(root, name)
+                    h.update(os.path.relpath(path, directory).encode() + b'\0')
+                    h.update(file_digest(path).encode())
+    return h.hexdigest()
+
+
+def make_key(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(str(part).encode() + b'\0')
+    return h.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def compiler_version(tool):
+    """First line of `<tool> --version`, or '' if the tool is not installed."""
+    try:
+        res = subprocess.run([tool, '--version'], capture_output=True, text=True)
+    except OSError:
+        return ''
+    lines = res.stdout.splitlines()
+    return lines[0].strip() if lines else ''
+
+
+def compile_key(testentry, xlen, env_digest):
+    """Key for one test compiled with GCC_OPTIONS against an environment.
+
+    Independent of the plugin, so plugins with identical environments
+    share entries in the `compile` namespace.
+    """
+    return make_key('compile', file_digest(testentry['test_path']), testentry.get('commit_id', ''),
+                    ' '.join(sorted(testentry.get('macros', []))), testentry.get('isa', '').lower(),
+                    xlen, env_digest, GCC_OPTIONS,
+                    compiler_version(f'riscv{xlen}-unknown-elf-gcc'))
+
+
+def _pairs(names):
+    """(cached name, local name) pairs; `names` is a list or a {cached: local} dict."""
+    return list(names.items()) if isinstance(names, dict) else [(n, n) for n in names]
+
+
+class ResultCache:
+    """Key -> {file name: contents} store shared by all work dirs."""
+
+    def __init__(self, namespace, directory=None):
+        self.root = os.path.join(directory or cache_dir(), namespace)
+        self.hits = 0
+        self.misses = 0
+
+    def _entry(self, key):
+        return os.path.join(self.root, key[:2], key)
+
+    def available(self, key):
+        """Names of the files cached under `key`."""
+        entry = self._entry(key)
+        if not enabled() or not os.path.isdir(entry):
+            return set()
+        return {f.name for f in os.scandir(entry) if f.is_file()}
+
+    def fetch(self, key, dest_dir, names):
+        """Copies every cached file in `names` to `dest_dir`; False on a miss."""
+        entry = self._entry(key)
+        pairs = _pairs(names)
+        if not enabled() or not all(os.path.isfile(os.path.join(entry, c)) for c, _ in pairs):
+            self.misses += 1
+            return False
+        os.makedirs(dest_dir, exist_ok=True)
+        for cached, local in pairs:
+            shutil.copyfile(os.path.join(entry, cached), os.path.join(dest_dir, local))
+        self.hits += 1
+        return True
+
+    def store(self, key, src_dir, names, merge=False):
+        """Caches `names` from `src_dir`; returns False if any is missing.
+
+        With `merge`, files already cached under `key` are kept and the
+        new ones are added to the entry.
+        """
+        pairs = _pairs(names)
+        if not enabled() or not all(os.path.isfile(os.path.join(src_dir, l)) for _, l in pairs):
+            return False
+        entry = self._entry(key)
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        if merge and os.path.isdir(entry):
+            try:
+                for cached, local in pairs:
+                    fd, tmp = tempfile.mkstemp(dir=entry)
+                    os.close(fd)
+                    shutil.copyfile(os.path.join(src_dir, local), tmp)
+                    os.replace(tmp, os.path.join(entry, cached))
+            except OSError:
+                return False
+            return True
+        tmp = tempfile.mkdtemp(dir=os.path.dirname(entry))
+        try:
+            for cached, local in pairs:
+                shutil.copyfile(os.path.join(src_dir, local), os.path.join(tmp, cached))
+            if os.path.isdir(entry):
+                shutil.rmtree(entry, ignore_errors=True)
+            os.replace(tmp, entry)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            return False
+        return True
+
+    def summary(self):
+        return f"{self.hits} reused, {self.misses} rerun"
+
+
+class CompileCache(ResultCache):
+    """ELF and disassembly of each test, shared by every plugin.
+
+    Entries are keyed by compile_key() and hold ELF and, once a plugin
+    needed it, DISASS.
+    """
+
+    ELF = 'test.elf'
+    DISASS = 'test.disass'
+
+    def __init__(self, directory=None):
+        super().__init__('compile', directory)
+
+
+def stats(directory=None):
+    """{namespace: (entries, bytes)} for the whole cache."""
+    root = directory or cache_dir()
+    out = {}
+    if not os.path.isdir(root):
+        return out
+    for namespace in sorted(os.listdir(root)):
+        count = size = 0
+        for shard in os.scandir(os.path.join(root, namespace)):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.is_dir():
+                    count += 1
+                    size += sum(f.stat().st_size for f in os.scandir(entry.path))
+        out[namespace] = (count, size)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description='riscof result cache.')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    sub.add_parser('stats', help='print entries per plugin')
+    sub.add_parser('clear', help='delete every cached result')
+    args = parser.parse_args()
+
+    if args.cmd == 'clear':
+        shutil.rmtree(cache_dir(), ignore_errors=True)
+        print(f"Cleared {cache_dir()}")
+        return
+    entries = stats()
+    print(f"Cache dir: {cache_dir()}")
+    if not entries:
+        print("  (empty)")
+    for namespace, (count, size) in entries.items():
+        print(f"  {namespace:<20} {count:6} entries  {size / 1024 / 1024:8.1f} MB")
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
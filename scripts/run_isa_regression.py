@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""Runs the ISA regression tests in parallel and prints a summary.
+
+Each test is one `vvp build/tb_isa_test.vvp +TESTFILE=<mem> +DATAFILE=<prefix>`
+invocation, loading the sparse images written by `make gen-mem`; the
+invocations are spread over a pool sized to the machine. With --batch the
+tests are instead split into one shard per job, and each shard runs inside
+a single `vvp build/tb_isa_batch.vvp +MANIFEST=<file>` process, so the
+simulator start-up is paid once per shard rather than once per test.
+With --sim verilator the Verilator binaries build/tb_isa_test.bin and
+build/tb_isa_batch.bin are executed directly instead.
+Results can be written as JSON and/or JUnit XML for CI.
+
+Usage:
+    python3 scripts/run_isa_regression.py [-j N] [--timeout S] [--batch]
+        [--sim icarus|verilator] [--filter 'rv32ui-p-*'] [--json out.json]
+        [--junit out.xml]
+"""
+import argparse
+import fnmatch
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, asdict
+from typing import Optional
+
+import elf_loader
+import sim_cache
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+DEFAULT_VVP = os.path.join(PROJECT_ROOT, 'build', 'tb_isa_test.vvp')
+DEFAULT_BATCH_VVP = os.path.join(PROJECT_ROOT, 'build', 'tb_isa_batch.vvp')
+DEFAULT_SIM = os.environ.get('SIM', 'icarus')
+DEFAULT_MEM_DIR = os.path.join(PROJECT_ROOT, 'tests', 'isa', 'mem')
+DEFAULT_FILTERS = ['rv32ui-p-*', 'rv32um-p-*']
+
+_PASS_RE = re.compile(r'^PASS\b', re.MULTILINE)
+_FAIL_RE = re.compile(r'^FAIL\b.*$', re.MULTILINE)
+_RESULT_RE = re.compile(r'^RESULT (\S+) (PASS|FAIL) (\d+) ?(.*)$', re.MULTILINE)
+_LANE_RE = re.compile(r'\.b[0-3]\.mem$')
+
+
+@dataclass
+class TestResult:
+    name: str
+    status: str        # 'pass', 'fail', 'timeout' or 'error'
+    message: str
+    seconds: float
+    output: str = ''
+    cycles: Optional[int] = None
+
+    @property
+    def passed(self):
+        return self.status == 'pass'
+
+
+def parse_output(output):
+    """Returns (status, message) from the testbench's PASS/FAIL lines."""
+    fail = _FAIL_RE.search(output)
+    if fail:
+        return 'fail', fail.group(0)
+    if _PASS_RE.search(output):
+        return 'pass', ''
+    return 'error', 'no PASS/FAIL line in simulator output'
+
+
+def find_tests(mem_dir, filters):
+    """Returns {test_name: mem_path} for every .mem matching any glob filter.
+
+    The data lane files (<test>.b0.mem .. b3.mem) belong to their test's
+    image and are not tests themselves.
+    """
+    tests = {}
+    for entry in sorted(os.listdir(mem_dir)):
+        if not entry.endswith('.mem') or _LANE_RE.search(entry):
+            continue
+        name = entry[:-len('.mem')]
+        if any(fnmatch.fnmatch(name, f) for f in filters):
+            tests[name] = os.path.join(mem_dir, entry)
+    return tests
+
+
+def _command(vvp, vvp_file):
+    """`vvp vvp_file`, or just the image when `vvp` is empty (Verilator binaries)."""
+    return ([vvp] if vvp else []) + [vvp_file]
+
+
+def image_args(mem_file):
+    """Plusargs loading `mem_file` and, when present, its data lane files."""
+    args = [f'+TESTFILE={mem_file}']
+    prefix = elf_loader.data_prefix(mem_file)
+    if prefix:
+        args.append(f'+DATAFILE={prefix}')
+    return args
+
+
+def run_test(name, mem_file, vvp_file, timeout, vvp='vvp', extra_args=()):
+    """Runs a single test in its own simulator process."""
+    cmd = _command(vvp, vvp_file) + image_args(mem_file) + list(extra_args)
+    start = time.monotonic()
+    try:
+        proc = subprocess.run(cmd, cwd=PROJECT_ROOT, capture_output=True,
+                              text=True, timeout=timeout)
+    except subprocess.TimeoutExpired as e:
+        out = e.stdout.decode(errors='replace') if isinstance(e.stdout, bytes) else (e.stdout or '')
+        return TestResult(name, 'timeout', f'timed out after {timeout}s',
+                          time.monotonic() - start, out)
+    except OSError as e:
+        return TestResult(name, 'error', str(e), time.monotonic() - start)
+    output = proc.stdout + proc.stderr
+    status, message = parse_output(output)
+    return TestResult(name, status, message, time.monotonic() - start, output)
+
+
+def run_all(tests, vvp_file, jobs, timeout, vvp='vvp', extra_args=(), progress=None):
+    """Runs all tests on a pool of `jobs` workers; returns results sorted by name."""
+    results = []
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(run_test, name, mem, vvp_file, timeout, vvp, extra_args)
+                   for name, mem in tests.items()]
+        for fut in as_completed(futures):
+            result = fut.result()
+            results.append(result)
+            if progress:
+                progress(result)
+    results.sort(key=lambda r: r.name)
+    return results
+
+
+def write_manifest(tests, path):
+    """Writes a tb_isa_batch.v manifest: one `<name> <mem> [<data prefix>]` line per test."""
+    with open(path, 'w') as f:
+        for name, mem in tests.items():
+            prefix = elf_loader.data_prefix(mem)
+            data = f" {os.path.abspath(prefix)}" if prefix else ''
+            f.write(f"{name} {os.path.abspath(mem)}{data}\n")
+
+
+def shard_tests(tests, shards):
+    """Splits {name: mem} round-robin into at most `shards` non-empty dicts."""
+    parts = [{} for _ in range(max(1, min(shards, len(tests))))]
+    for i, (name, mem) in enumerate(tests.items()):
+        parts[i % len(parts)][name] = mem
+    return parts
+
+
+def parse_batch_output(output, names):
+    """Maps tb_isa_batch.v RESULT lines onto {name: (status, message, cycles)}."""
+    found = {}
+    for name, verdict, cycles, message in _RESULT_RE.findall(output):
+        if name in names:
+            found[name] = (verdict.lower(), message.strip(), int(cycles))
+    return found
+
+
+def run_batch(tests, vvp_file, timeout, vvp='vvp', extra_args=()):
+    """Runs every test of `tests` in one simulator process.
+
+    `timeout` applies per test, so the shard gets timeout * len(tests).
+    Tests without a RESULT line (simulator crash or timeout) are reported
+    as errors/timeouts. Wall time is apportioned by simulated cycles.
+    """
+    fd, manifest = tempfile.mkstemp(prefix='isa_batch_', suffix='.txt')
+    os.close(fd)
+    write_manifest(tests, manifest)
+    cmd = _command(vvp, vvp_file) + [f'+MANIFEST={manifest}'] + list(extra_args)
+    start = time.monotonic()
+    status = None
+    try:
+        proc = subprocess.run(cmd, cwd=PROJECT_ROOT, capture_output=True,
+                              text=True, timeout=timeout * len(tests))
+        output = proc.stdout + proc.stderr
+    except subprocess.TimeoutExpired as e:
+        output = e.stdout.decode(errors='replace') if isinstance(e.stdout, bytes) else (e.stdout or '')
+        status = 'timeout', f'batch timed out after {timeout * len(tests):.0f}s'
+    except OSError as e:
+        output = ''
+        status = 'error', str(e)
+    finally:
+        os.remove(manifest)
+    elapsed = time.monotonic() - start
+
+    found = parse_batch_output(output, tests)
+    total_cycles = sum(c for _, _, c in found.values()) or 1
+    results = []
+    for name in tests:
+        if name in found:
+            verdict, message, cycles = found[name]
+            results.append(TestResult(name, verdict, message if verdict == 'fail' else '',
+                                      elapsed * cycles / total_cycles, '', cycles))
+        else:
+            verdict, message = status or ('error', 'no RESULT line in batch output')
+            results.append(TestResult(name, verdict, message, 0.0, output))
+    return results
+
+
+def run_all_batched(tests, vvp_file, jobs, timeout, vvp='vvp', extra_args=(), progress=None):
+    """Runs `tests` as `jobs` batch shards in parallel; returns results sorted by name."""
+    results = []
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(run_batch, shard, vvp_file, timeout, vvp, extra_args)
+                   for shard in shard_tests(tests, jobs)]
+        for fut in as_completed(futures):
+            for result in fut.result():
+                results.append(result)
+                if progress:
+                    progress(result)
+    results.sort(key=lambda r: r.name)
+    return results
+
+
+def write_json(results, path, wall_time):
+    data = {
+        'total': len(results),
+        'passed': sum(r.passed for r in results),
+        'failed': sum(not r.passed for r in results),
+        'wall_time': round(wall_time, 3),
+        'tests': [dict({k: v for k, v in asdict(r).items() if k != 'output'},
+                       seconds=round(r.seconds, 3)) for r in results],
+    }
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+
+
+def write_junit(results, path, wall_time, suite_name='isa-regression'):
+    suite = ET.Element('testsuite', {
+        'name': suite_name,
+        'tests': str(len(results)),
+        'failures': str(sum(r.status == 'fail' for r in results)),
+        'errors': str(sum(r.status in ('timeout', 'error') for r in results)),
+        'time': f'{wall_time:.3f}',
+    })
+    for r in results:
+        case = ET.SubElement(suite, 'testcase', {
+            'classname': suite_name, 'name': r.name, 'time': f'{r.seconds:.3f}'})
+        if r.status == 'fail':
+            ET.SubElement(case, 'failure', {'message': r.message}).text = r.output
+        elif not r.passed:
+            ET.SubElement(case, 'error', {'message': r.message}).text = r.output
+    ET.ElementTree(suite).write(path, encoding='utf-8', xml_declaration=True)
+
+
+def print_result(result):
+    cycles = f"{result.cycles:>8} cyc" if result.cycles is not None else ' ' * 12
+    print(f"  {result.name:<35} {result.status.upper():<7} {result.seconds:6.2f}s {cycles}  {result.message}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parallel ISA regression runner.')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help='number of parallel simulator processes (default: all cores)')
+    parser.add_argument('--timeout', type=float, default=60.0,
+                        help='per-test timeout in seconds')
+    parser.add_argument('--filter', action='append', dest='filters', metavar='GLOB',
+                        help="test name glob, may be repeated (default: 'rv32ui-p-*' and 'rv32um-p-*')")
+    parser.add_argument('--batch', action='store_true',
+                        help='run each shard of tests inside one tb_isa_batch.vvp process')
+    parser.add_argument('--sim', default=DEFAULT_SIM, choices=sorted(sim_cache.SIMULATORS),
+                        help='simulator the testbench image was built for (default: $SIM or icarus)')
+    parser.add_argument('--vvp-file', help='compiled testbench image (default: '
+                        'build/tb_isa_test.vvp, or build/tb_isa_batch.vvp with --batch; '
+                        '.bin for Verilator)')
+    parser.add_argument('--mem-dir', default=DEFAULT_MEM_DIR, help='directory of .mem test images')
+    parser.add_argument('--json', help='write results as JSON to this path')
+    parser.add_argument('--junit', help='write results as JUnit XML to this path')
+    args = parser.parse_args()
+
+    sim = sim_cache.simulator(args.sim)
+    if args.vvp_file is None:
+        default = DEFAULT_BATCH_VVP if args.batch else DEFAULT_VVP
+        args.vvp_file = os.path.splitext(default)[0] + sim.suffix
+    if not os.path.isfile(args.vvp_file):
+        print(f"ERROR: {args.vvp_file} not found. Run 'make {os.path.relpath(args.vvp_file, PROJECT_ROOT)}' first.")
+        sys.exit(1)
+    if not os.path.isdir(args.mem_dir):
+        print(f"ERROR: No .mem files in {args.mem_dir}. Run 'make gen-mem' first.")
+        sys.exit(1)
+
+    filters = args.filters or DEFAULT_FILTERS
+    tests = find_tests(args.mem_dir, filters)
+    if not tests:
+        print(f"ERROR: No tests in {args.mem_dir} match {' '.join(filters)}.")
+        sys.exit(1)
+
+    print("=================================================")
+    mode = 'batch shards' if args.batch else 'jobs'
+    print(f"ISA Regression — {' '.join(filters)} ({len(tests)} tests, {args.jobs} {mode}, {args.sim})")
+    print("=================================================")
+
+    start = time.monotonic()
+    runner = run_all_batched if args.batch else run_all
+    results = runner(tests, args.vvp_file, args.jobs, args.timeout,
+                     vvp=' '.join(sim.runner), progress=print_result)
+    wall_time = time.monotonic() - start
+
+    if args.json:
+        write_json(results, args.json, wall_time)
+    if args.junit:
+        write_junit(results, args.junit, wall_time)
+
+    failed = [r for r in results if not r.passed]
+    print("")
+    print("=================================================")
+    print(f"Total: {len(results)}   Passed: {len(results) - len(failed)}   Failed: {len(failed)}")
+    for r in failed:
+        print(f"  {r.name}: {r.status.upper()} {r.message}")
+    print(f"Wall time: {wall_time:.2f}s")
+    print(f"OVERALL STATUS: {'PASS' if not failed else 'FAIL'}")
+    print("=================================================")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""RISCOF signature files: normalisation and fast bulk comparison.
+
+Signatures are read through mmap and split in one pass, so comparing a full
+riscof_work tree of thousands of tests takes seconds. Identical files are
+detected by a byte comparison before any parsing; only differing files are
+decoded into 32-bit words to locate the mismatching offsets.
+
+Lines may hold 8 hex digits (spike, granularity 4) or 16 (sail,
+granularity 8); wider lines are split into little-endian 32-bit words, so
+signatures of either granularity compare word for word. `@address` and
+`//` lines written by $writememh are ignored.
+
+Usage:
+    python3 scripts/signature.py compare <dut.signature> <ref.signature>
+    python3 scripts/signature.py compare-dir <riscof_work> [-j N]
+    python3 scripts/signature.py normalize <in.memh> <out.signature>
+"""
+import argparse
+import mmap
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from bin_to_mem import format_words
+
+
+def _read_bytes(path):
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return mm[:]
+
+
+def parse_words(data):
+    """32-bit words of signature text `data` (bytes)."""
+    if b'//' in data:
+        data = b'\n'.join(line.split(b'//', 1)[0] for line in data.splitlines())
+    words = []
+    for token in data.split():
+        if token.startswith(b'@'):
+            continue
+        if token.startswith(b'0x'):
+            token = token[2:]
+        if len(token) <= 8:
+            words.append(int(token, 16))
+        else:
+            value = int(token, 16)
+            for _ in range((len(token) + 7) // 8):
+                words.append(value & 0xFFFFFFFF)
+                value >>= 32
+    return words
+
+
+def read_words(path):
+    return parse_words(_read_bytes(path))
+
+
+def write_signature(words, path):
+    """Writes `words` in RISCOF's format: one 8-digit lower-case hex word per line."""
+    with open(path, 'w') as f:
+        f.write(format_words(words))
+
+
+def normalize(src, dst):
+    """Rewrites a $writememh dump (or any signature) as a RISCOF signature."""
+    words = read_words(src)
+    write_signature(words, dst)
+    return len(words)
+
+
+def compare_files(dut, ref):
+    """Returns [(word_offset, dut_word, ref_word), ...]; empty if they match.
+
+    A missing word on either side is reported as None.
+    """
+    a, b = _read_bytes(dut), _read_bytes(ref)
+    if a == b:
+        return []
+    wa, wb = parse_words(a), parse_words(b)
+    if wa == wb:
+        return []
+    mismatches = [(i, x, y) for i, (x, y) in enumerate(zip(wa, wb)) if x != y]
+    for i in range(min(len(wa), len(wb)), max(len(wa), len(wb))):
+        mismatches.append((i, wa[i] if i < len(wa) else None, wb[i] if i < len(wb) else None))
+    return mismatches
+
+
+def _signature_in(directory, prefix):
+    try:
+        names = sorted(n for n in os.listdir(directory)
+                       if n.startswith(prefix) and n.endswith('.signature'))
+    except OSError:
+        return None
+    return os.path.join(directory, names[0]) if names else None
+
+
+def find_pairs(work_dir):
+    """Yields (test, dut_signature, ref_signature) for every test work dir.
+
+    RISCOF lays tests out as <work_dir>/src/<test>/{dut,ref}/; either
+    signature may be None if that side did not produce one.
+    """
+    for root, dirs, _ in os.walk(work_dir):
+        if 'dut' in dirs and 'ref' in dirs:
+            dirs[:] = []
+            yield (os.path.relpath(root, work_dir),
+                   _signature_in(os.path.join(root, 'dut'), 'DUT-'),
+                   _signature_in(os.path.join(root, 'ref'), 'Reference-'))
+
+
+def _compare_pair(pair):
+    test, dut, ref = pair
+    if dut is None or ref is None:
+        return test, 'missing ' + ('DUT' if dut is None else 'reference') + ' signature'
+    try:
+        return test, compare_files(dut, ref)
+    except (OSError, ValueError) as e:
+        return test, str(e)
+
+
+def compare_dir(work_dir, jobs=1):
+    """Compares every test under `work_dir`; returns {test: mismatches or error}."""
+    pairs = sorted(find_pairs(work_dir))
+    if jobs > 1:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            return dict(pool.map(_compare_pair, pairs))
+    return dict(map(_compare_pair, pairs))
+
+
+def _fmt(word):
+    return '--------' if word is None else f'{word:08x}'
+
+
+def print_mismatches(name, mismatches, limit):
+    print(f"FAIL {name}: {len(mismatches)} word(s) differ")
+    for offset, dut, ref in mismatches[:limit]:
+        print(f"    +0x{offset * 4:04x}  dut {_fmt(dut)}  ref {_fmt(ref)}")
+    if len(mismatches) > limit:
+        print(f"    ... {len(mismatches) - limit} more")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare and normalise RISCOF signatures.')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    cmp_ = sub.add_parser('compare', help='compare two signature files')
+    cmp_.add_argument('dut')
+    cmp_.add_argument('ref')
+    cmp_.add_argument('--limit', type=int, default=10, help='mismatches to print')
+    cdir = sub.add_parser('compare-dir', help='compare every test in a riscof work dir')
+    cdir.add_argument('work_dir')
+    cdir.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1)
+    cdir.add_argument('--limit', type=int, default=10, help='mismatches to print per test')
+    norm = sub.add_parser('normalize', help='rewrite a memory dump as a signature')
+    norm.add_argument('src')
+    norm.add_argument('dst')
+    args = parser.parse_args()
+
+    if args.cmd == 'normalize':
+        print(f"{normalize(args.src, args.dst)} words written to {args.dst}")
+        return
+
+    if args.cmd == 'compare':
+        mismatches = compare_files(args.dut, args.ref)
+        if mismatches:
+            print_mismatches(args.dut, mismatches, args.limit)
+            sys.exit(1)
+        print("MATCH")
+        return
+
+    results = compare_dir(args.work_dir, args.jobs)
+    failed = 0
+    for test, outcome in results.items():
+        if isinstance(outcome, str):
+            print(f"ERROR {test}: {outcome}")
+            failed += 1
+        elif outcome:
+            print_mismatches(test, outcome, args.limit)
+            failed += 1
+    print(f"Total: {len(results)}   Passed: {len(results) - failed}   Failed: {failed}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
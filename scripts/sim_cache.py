@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""Content-addressed cache for compiled simulation images.
+
+The key is a SHA-256 over the compiler version, flags, defines and the
+contents of every source file, so an unchanged RTL + testbench set is
+compiled once and reused by every build directory and riscof work dir.
+Images live in a shared cache directory ($SIM_CACHE_DIR, default
+~/.cache/simple_riscv_cpu/vvp) that is trimmed to $SIM_CACHE_MAX_MB
+(default 512) by evicting the least recently used entries.
+
+Two simulators are supported (see SIMULATORS): Icarus (`iverilog`, a .vvp
+image run with `vvp`, the reference) and Verilator 5 (`verilator
+--binary --timing`, a multithreaded native executable taking the same
+plusargs). The top module for Verilator is named after the first source.
+
+Usage:
+    python3 scripts/sim_cache.py compile -o build/tb.vvp [-D NAME[=VAL]] src.v...
+    python3 scripts/sim_cache.py compile --tool verilator -o build/tb.bin tb/isa/tb_isa_test.v rtl/*.v
+    python3 scripts/sim_cache.py stats
+    python3 scripts/sim_cache.py clear
+"""
+import argparse
+import collections
+import fcntl
+import functools
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'simple_riscv_cpu', 'vvp')
+DEFAULT_MAX_MB = 512
+DEFAULT_FLAGS = ('-g2012',)
+IMAGE_SUFFIX = '.vvp'
+STATS_FILE = 'stats.json'
+STATS_LOCK = 'stats.lock'
+
+VERILATOR_THREADS = int(os.environ.get('VERILATOR_THREADS', 4))
+VERILATOR_FLAGS = ('--binary', '--timing', '--trace', '-O3', '-j', '0',
+                   '--threads', str(VERILATOR_THREADS),
+                   '-Wno-fatal', '-Wno-lint', '-Wno-style', '-Wno-MULTIDRIVEN')
+
+Simulator = collections.namedtuple('Simulator', 'tool flags suffix runner')
+
+# name -> (compiler, default flags, image suffix, run command prefix)
+SIMULATORS = {
+    'icarus': Simulator('iverilog', DEFAULT_FLAGS, '.vvp', ('vvp',)),
+    'verilator': Simulator('verilator', VERILATOR_FLAGS, '.bin', ()),
+}
+
+
+def simulator(name):
+    """Looks up a SIMULATORS entry; raises ValueError for unknown names."""
+    try:
+        return SIMULATORS[name]
+    except KeyError:
+        raise ValueError(f"unknown simulator '{name}' (choose from {', '.join(SIMULATORS)})")
+
+
+def run_command(image, name='icarus'):
+    """Command prefix that runs a compiled `image` (plusargs follow)."""
+    return list(simulator(name).runner) + [image]
+
+
+def _suffix(tool):
+    return next((sim.suffix for sim in SIMULATORS.values() if sim.tool == tool), IMAGE_SUFFIX)
+
+
+def cache_dir():
+    return os.environ.get('SIM_CACHE_DIR', DEFAULT_CACHE_DIR)
+
+
+def max_bytes():
+    return int(float(os.environ.get('SIM_CACHE_MAX_MB', DEFAULT_MAX_MB)) * 1024 * 1024)
+
+
+@functools.lru_cache(maxsize=None)
+def tool_version(tool='iverilog'):
+    """First line of `<tool> -V`, or '' if the tool is not installed."""
+    try:
+        res = subprocess.run([tool, '-V'], capture_output=True, text=True)
+    except OSError:
+        return ''
+    lines = (res.stdout or res.stderr).splitlines()
+    return lines[0].strip() if lines else ''
+
+
+def cache_key(sources, defines=(), flags=DEFAULT_FLAGS, tool='iverilog'):
+    """Hashes everything that influences the compiled image."""
+    h = hashlib.sha256()
+    h.update(tool_version(tool).encode())
+    for item in list(flags) + sorted(defines):
+        h.update(b'\0' + item.encode())
+    for src in sources:
+        h.update(b'\0' + os.path.basename(src).encode() + b'\0')
+        with open(src, 'rb') as f:
+            h.update(hashlib.sha256(f.read()).digest())
+    return h.hexdigest()
+
+
+def _update_stats(directory, **delta):
+    # Parallel compiles share the stats file; hold an exclusive lock across
+    # the read-modify-write so no process's counts are lost.
+    path = os.path.join(directory, STATS_FILE)
+    with open(os.path.join(directory, STATS_LOCK), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            with open(path) as f:
+                stats = json.load(f)
+        except (OSError, ValueError):
+            stats = {}
+        for k, v in delta.items():
+            stats[k] = stats.get(k, 0) + v
+        tmp = f'{path}.{os.getpid()}'
+        with open(tmp, 'w') as f:
+            json.dump(stats, f, indent=2)
+        os.replace(tmp, path)
+    return stats
+
+
+def read_stats(directory=None):
+    try:
+        with open(os.path.join(directory or cache_dir(), STATS_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _entries(directory):
+    suffixes = tuple(sim.suffix for sim in SIMULATORS.values())
+    for entry in os.scandir(directory):
+        if entry.name.endswith(suffixes) and entry.is_file():
+            yield entry
+
+
+def evict(directory=None, limit=None):
+    """Deletes least recently used images until the cache fits in `limit` bytes."""
+    directory = directory or cache_dir()
+    limit = max_bytes() if limit is None else limit
+    entries = sorted(_entries(directory), key=lambda e: e.stat().st_mtime)
+    total = sum(e.stat().st_size for e in entries)
+    evicted = 0
+    for e in entries:
+        if total <= limit:
+            break
+        try:
+            size = e.stat().st_size
+            os.remove(e.path)
+        except OSError:
+            continue
+        total -= size
+        evicted += 1
+    if evicted:
+        _update_stats(directory, evictions=evicted)
+    return evicted
+
+
+def compile_cached(sources, output, defines=(), flags=DEFAULT_FLAGS,
+                   tool='iverilog', directory=None):
+    """Produces `output` from `sources`, compiling only on a cache miss.
+
+    Returns (hit, seconds) where seconds is the compile time on a miss and
+    the copy time on a hit. Raises subprocess.CalledProcessError if the
+    compiler fails.
+    """
+    directory = directory or cache_dir()
+    os.makedirs(directory, exist_ok=True)
+    key = cache_key(sources, defines, flags, tool)
+    suffix = _suffix(tool)
+    image = os.path.join(directory, key + suffix)
+    start = time.monotonic()
+
+    if os.path.isfile(image):
+        os.utime(image)  # mark as most recently used
+        shutil.copy(image, output)
+        elapsed = time.monotonic() - start
+        _update_stats(directory, hits=1)
+        return True, elapsed
+
+    fd, tmp = tempfile.mkstemp(suffix=suffix + '.tmp', dir=directory)
+    os.close(fd)
+    build_dir = None
+    if tool == 'verilator':
+        # C++ is generated and built in a scratch dir; only the binary is kept
+        build_dir = tempfile.mkdtemp(prefix='verilator-', dir=directory)
+        top = os.path.splitext(os.path.basename(sources[0]))[0]
+        cmd = ([tool] + list(flags) + [f'+define+{d}' for d in defines] +
+               ['--top-module', top, '-Mdir', build_dir, '-o', os.path.abspath(tmp)] + list(sources))
+    else:
+        cmd = [tool] + list(flags) + [f'-D{d}' for d in defines] + ['-o', tmp] + list(sources)
+    try:
+        subprocess.run(cmd, check=True, capture_output=True, text=True)
+        os.replace(tmp, image)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        if build_dir:
+            shutil.rmtree(build_dir, ignore_errors=True)
+    elapsed = time.monotonic() - start
+    shutil.copy(image, output)
+    _update_stats(directory, misses=1, compile_seconds=round(elapsed, 3))
+    evict(directory)
+    return False, elapsed
+
+
+def build_image(name, path, pipeline=0):
+    """Compiles tb_isa_test.v + the RTL through the cache; returns the image path.
+
+    An existing `path` is used as is (a prebuilt image, e.g. from the Makefile).
+    `pipeline` selects riscv_core's PIPELINE mode, defined like the Makefile does.
+    """
+    if path and os.path.isfile(path):
+        return path
+    rtl_dir = os.path.join(PROJECT_ROOT, 'rtl')
+    sources = [os.path.join(PROJECT_ROOT, 'tb', 'isa', 'tb_isa_test.v')] + sorted(
+        os.path.join(rtl_dir, f) for f in os.listdir(rtl_dir)
+        if f.endswith('.v') and f not in ('basys3_top.v', 'uart_tx.v'))
+    sim = simulator(name)
+    tag = '_pipeline' if pipeline else ''
+    path = path or os.path.join(PROJECT_ROOT, 'build', 'tb_isa_test' + tag + sim.suffix)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    compile_cached(sources, path, defines=[f'PIPELINE={pipeline}'], flags=sim.flags, tool=sim.tool)
+    return path
+
+
+def format_stats(stats, directory=None):
+    directory = directory or cache_dir()
+    hits, misses = stats.get('hits', 0), stats.get('misses', 0)
+    lookups = hits + misses
+    size = sum(e.stat().st_size for e in _entries(directory)) if os.path.isdir(directory) else 0
+    count = len(list(_entries(directory))) if os.path.isdir(directory) else 0
+    avg = stats.get('compile_seconds', 0) / misses if misses else 0.0
+    lines = [
+        f"Cache dir:     {directory}",
+        f"Entries:       {count} ({size / 1024 / 1024:.1f} MB of {max_bytes() / 1024 / 1024:.0f} MB)",
+        f"Hits/misses:   {hits}/{misses} ({100.0 * hits / lookups if lookups else 0:.1f}% hit rate)",
+        f"Compile time:  {stats.get('compile_seconds', 0):.2f}s total, {avg:.2f}s per miss",
+        f"Evictions:     {stats.get('evictions', 0)}",
+    ]
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cached simulator compilation.')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    comp = sub.add_parser('compile', help='compile sources through the cache')
+    comp.add_argument('-o', '--output', required=True, help='output image path')
+    comp.add_argument('-D', dest='defines', action='append', default=[], metavar='NAME[=VAL]')
+    comp.add_argument('--flags', help="compiler flags (default: the tool's SIMULATORS flags)")
+    comp.add_argument('--tool', default='iverilog', choices=[s.tool for s in SIMULATORS.values()])
+    comp.add_argument('sources', nargs='+')
+    sub.add_parser('stats', help='print hit/miss and compile-time statistics')
+    sub.add_parser('clear', help='delete every cached image and the statistics')
+    args = parser.parse_args()
+
+    if args.cmd == 'stats':
+        print(format_stats(read_stats()))
+    elif args.cmd == 'clear':
+        shutil.rmtree(cache_dir(), ignore_errors=True)
+        print(f"Cleared {cache_dir()}")
+    else:
+        try:
+            flags = args.flags.split() if args.flags is not None else next(
+                sim.flags for sim in SIMULATORS.values() if sim.tool == args.tool)
+            hit, seconds = compile_cached(args.sources, args.output, args.defines,
+                                          flags, args.tool)
+        except subprocess.CalledProcessError as e:
+            sys.stderr.write(e.stdout + e.stderr)
+            sys.exit(e.returncode or 1)
+        print(f"sim_cache: {'hit' if hit else 'miss'} {args.output} ({seconds:.2f}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""Single-pass CPI and stall statistics from a riscv_core VCD dump.
+
+Only a handful of core signals are tracked (clk, rst, cpu_state, arch_pc or
+pc_current, instruction, cpu_stall, trap_trigger, irq_take, muldiv_wait and
+commit_valid/commit_insn); value changes of every
+other signal are skipped after a dictionary lookup, so memory use stays
+constant and multi-GB dumps (.vcd or .vcd.gz) are processed in one
+streaming pass.
+
+Signals are sampled at every rising clock edge using their values from the
+end of the previous timestep, i.e. what the core's flip-flops see. Per
+cycle the analyzer records the FSM state (S_FETCH/S_EXEC/S_MEM_WB), debug
+stalls and trap entries; the cycles since the previous retirement are
+charged to the retiring instruction's mnemonic. Retirement is taken from
+commit_valid/commit_insn, which both core modes drive; dumps without them
+(from before the PIPELINE=1 core) fall back to the FSM states, where a
+division retires at the end of its S_EXEC cycles, once muldiv_wait drops.
+On the pipelined core cpu_state stays in S_FETCH, so the FSM state table
+does not apply.
+
+Usage:
+    vvp build/tb_isa_test.vvp +TESTFILE=... +WAVES=core
+    python3 scripts/vcd_stats.py waves.vcd [--top 10] [--json stats.json]
+"""
+import argparse
+import collections
+import gzip
+import json
+import sys
+
+S_FETCH, S_EXEC, S_MEM_WB = 0, 1, 2
+STATE_NAMES = {S_FETCH: 'S_FETCH', S_EXEC: 'S_EXEC', S_MEM_WB: 'S_MEM_WB'}
+OPCODE_LOAD = 0x03
+
+# Core signals, by name relative to the riscv_core scope; the first
+# existing alternative is used.
+SIGNALS = {
+    'clk': ('clk',),
+    'rst': ('rst',),
+    'state': ('cpu_state',),
+    'pc': ('arch_pc', 'pc_current', 'pc_reg.pc_out'),
+    'instruction': ('instruction',),
+    'stall': ('cpu_stall',),
+    'trap': ('trap_trigger',),
+    'busy': ('muldiv_wait',),
+    'commit': ('commit_valid',),
+    'commit_inst': ('commit_insn',),
+    'irq': ('irq_take',),
+}
+REQUIRED = ('clk', 'state', 'instruction')
+
+_ALU = {0: 'add', 1: 'sll', 2: 'slt', 3: 'sltu', 4: 'xor', 5: 'srl', 6: 'or', 7: 'and'}
+_BRANCH = {0: 'beq', 1: 'bne', 4: 'blt', 5: 'bge', 6: 'bltu', 7: 'bgeu'}
+_LOAD = {0: 'lb', 1: 'lh', 2: 'lw', 4: 'lbu', 5: 'lhu'}
+_STORE = {0: 'sb', 1: 'sh', 2: 'sw'}
+_CSR = {1: 'csrrw', 2: 'csrrs', 3: 'csrrc', 5: 'csrrwi', 6: 'csrrsi', 7: 'csrrci'}
+_SYSTEM = {0x00000073: 'ecall', 0x00100073: 'ebreak', 0x30200073: 'mret', 0x10500073: 'wfi'}
+
+
+def mnemonic(inst):
+    """RV32IM/Zicsr mnemonic of `inst`, or 'unknown'."""
+    opcode = inst & 0x7F
+    funct3 = (inst >> 12) & 0x7
+    bit30 = (inst >> 30) & 1
+    if opcode == 0x33:
+        if (inst >> 25) == 1:
+            return ('mul', 'mulh', 'mulhsu', 'mulhu', 'div', 'divu', 'rem', 'remu')[funct3]
+        name = _ALU[funct3]
+        if bit30 and funct3 == 0:
+            return 'sub'
+        if bit30 and funct3 == 5:
+            return 'sra'
+        return name
+    if opcode == 0x13:
+        if funct3 == 5 and bit30:
+            return 'srai'
+        return _ALU[funct3] + 'i'
+    if opcode == 0x03:
+        return _LOAD.get(funct3, 'unknown')
+    if opcode == 0x23:
+        return _STORE.get(funct3, 'unknown')
+    if opcode == 0x63:
+        return _BRANCH.get(funct3, 'unknown')
+    if opcode == 0x73:
+        if funct3 == 0:
+            return _SYSTEM.get(inst, 'unknown')
+        return _CSR.get(funct3, 'unknown')
+    return {0x37: 'lui', 0x17: 'auipc', 0x6F: 'jal', 0x67: 'jalr',
+            0x0F: 'fence'}.get(opcode, 'unknown')
+
+
+class Stats:
+    """Counters accumulated over the sampled clock cycles."""
+
+    def __init__(self):
+        self.cycles = 0
+        self.reset_cycles = 0
+        self.stall_cycles = 0
+        self.retired = 0
+        self.traps = 0
+        self.interrupts = 0
+        self.state_cycles = collections.Counter()
+        self.op_cycles = collections.Counter()
+        self.op_count = collections.Counter()
+        self.trap_causes = collections.Counter()
+        self.pc_cycles = collections.Counter()
+        self._pending = 0
+
+    def cycle(self, rst, state, pc, inst, stall, trap, busy=0,
+              commit=None, commit_inst=None, irq=None):
+        """Records one clock cycle. With `commit` (commit_valid) given,
+        retirement and the retired instruction come from the commit
+        interface; otherwise from the FSM state."""
+        if rst:
+            self.reset_cycles += 1
+            self._pending = 0
+            return
+        self.cycles += 1
+        if stall:
+            self.stall_cycles += 1
+            if commit:                                    # PIPELINE: W drains into the halt
+                self._retire(commit_inst if commit_inst is not None else inst)
+            return
+        self.state_cycles[state] += 1
+        if pc is not None:
+            self.pc_cycles[pc] += 1
+        self._pending += 1
+        if commit is not None:
+            if commit:
+                self._retire(commit_inst if commit_inst is not None else inst)
+            if trap:
+                self._trap(inst, irq if irq is not None else state == S_FETCH)
+        elif trap:
+            self._trap(inst, state == S_FETCH)
+        elif state == S_MEM_WB or (state == S_EXEC and inst & 0x7F != OPCODE_LOAD and not busy):
+            self._retire(inst)
+
+    def _retire(self, inst):
+        name = mnemonic(inst)
+        self.op_cycles[name] += self._pending
+        self.op_count[name] += 1
+        self.retired += 1
+        self._pending = 0
+
+    def _trap(self, inst, interrupt):
+        self.traps += 1
+        if interrupt:
+            self.interrupts += 1
+            self.trap_causes['interrupt'] += 1
+        else:
+            self.trap_causes[mnemonic(inst)] += 1
+        self.op_cycles['<trap>'] += self._pending
+        self._pending = 0
+
+    @property
+    def active_cycles(self):
+        return self.cycles - self.stall_cycles
+
+    @property
+    def cpi(self):
+        return self.active_cycles / self.retired if self.retired else float('nan')
+
+    def as_dict(self, top=10):
+        return {
+            'cycles': self.cycles,
+            'reset_cycles': self.reset_cycles,
+            'stall_cycles': self.stall_cycles,
+            'retired': self.retired,
+            'cpi': self.cpi if self.retired else None,
+            'states': {STATE_NAMES.get(s, str(s)): n for s, n in sorted(self.state_cycles.items())},
+            'opcodes': {op: {'count': self.op_count[op], 'cycles': n}
+                        for op, n in self.op_cycles.most_common()},
+            'traps': self.traps,
+            'interrupts': self.interrupts,
+            'trap_causes': dict(self.trap_causes.most_common()),
+            'hot_pcs': {f'0x{pc:08x}': n for pc, n in self.pc_cycles.most_common(top)},
+        }
+
+
+def open_vcd(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb', buffering=1 << 20)
+
+
+def _parse_value(text):
+    try:
+        return int(text, 2)
+    except ValueError:
+        return None                                       # x/z bits
+
+
+def read_header(f):
+    """Reads declarations up to $enddefinitions; returns {full name: id}."""
+    names = {}
+    scope = []
+    tokens = []
+    for line in f:
+        tokens.extend(line.split())
+        while b'$end' in tokens:
+            end = tokens.index(b'$end')
+            decl, tokens = tokens[:end], tokens[end + 1:]
+            if not decl:
+                continue
+            kind = decl[0]
+            if kind == b'$scope' and len(decl) >= 3:
+                scope.append(decl[2].decode())
+            elif kind == b'$upscope' and scope:
+                scope.pop()
+            elif kind == b'$var' and len(decl) >= 5:
+                names['.'.join(scope + [decl[4].decode()])] = decl[3]
+            elif kind == b'$enddefinitions':
+                return names
+    raise ValueError('no $enddefinitions in VCD header')
+
+
+def find_core(names, scope=None):
+    """Returns the riscv_core scope: `scope`, or the one declaring cpu_state."""
+    if scope:
+        return scope
+    candidates = sorted(n[:-len('.cpu_state')] for n in names if n.endswith('.cpu_state'))
+    if not candidates:
+        raise ValueError('no cpu_state signal in the VCD; dump the core with +WAVES=core')
+    return min(candidates, key=len)
+
+
+def resolve_signals(names, core):
+    """{signal key: VCD id} for the tracked core signals."""
+    ids = {}
+    for key, alternatives in SIGNALS.items():
+        for alt in alternatives:
+            ident = names.get(f'{core}.{alt}')
+            if ident is not None:
+                ids[key] = ident
+                break
+    missing = [k for k in REQUIRED if k not in ids]
+    if missing:
+        raise ValueError(f"signals not found under {core}: {', '.join(missing)}")
+    return ids
+
+
+def analyze(f, scope=None, stats=None):
+    """Streams the VCD in `f` (binary) and returns (Stats, core scope)."""
+    names = read_header(f)
+    core = find_core(names, scope)
+    ids = resolve_signals(names, core)
+    stats = stats or Stats()
+
+    keys = ('clk', 'rst', 'state', 'pc', 'instruction', 'stall', 'trap', 'busy',
+            'commit', 'commit_inst', 'irq')
+    # One VCD id may carry several signals (e.g. aliased nets)
+    slots = collections.defaultdict(list)
+    for i, key in enumerate(keys):
+        if key in ids:
+            slots[ids[key]].append(i)
+    slots = dict(slots)
+    clk_id = ids['clk']
+
+    # Optional signals default to inactive; without commit_valid the
+    # retirement is taken from the FSM state
+    has_commit = 'commit' in ids
+    cur = [None, 0, None, None, None, 0, 0, 0, None, None, None]
+    prev = None                                           # values at the end of the last timestep
+    rose = False
+    record = stats.cycle
+
+    def end_timestep():
+        nonlocal prev, rose
+        if rose and prev is not None:
+            _, rst, state, pc, inst, stall, trap, busy, commit, commit_inst, irq = prev
+            record(rst, state, pc, inst if inst is not None else 0x13, stall, trap, busy,
+                   (commit or 0) if has_commit else None, commit_inst, irq)
+        rose = False
+        prev = cur.copy()
+
+    for line in f:
+        c = line[:1]
+        if c == b'#':
+            end_timestep()
+            continue
+        if c == b'b' or c == b'B':
+            value, _, ident = line[1:].partition(b' ')
+            ident = ident.strip()
+            targets = slots.get(ident)
+            if targets:
+                v = _parse_value(value)
+                for i in targets:
+                    cur[i] = v
+            continue
+        if c and c in b'01xzXZ':
+            ident = line[1:].strip()
+            targets = slots.get(ident)
+            if targets:
+                v = 1 if c == b'1' else 0 if c == b'0' else None
+                if ident == clk_id and v == 1 and cur[0] == 0:
+                    rose = True
+                for i in targets:
+                    cur[i] = v
+    end_timestep()
+    if not has_commit and stats.active_cycles and set(stats.state_cycles) == {S_FETCH}:
+        raise ValueError('cpu_state never left S_FETCH (a PIPELINE=1 core?) and the dump has '
+                         'no commit_valid to count retirements from')
+    return stats, core
+
+
+def print_report(stats, core, top):
+    print(f"Core scope: {core}")
+    print(f"Cycles:   {stats.cycles} (+{stats.reset_cycles} in reset)")
+    print(f"Stalled:  {stats.stall_cycles}")
+    print(f"Retired:  {stats.retired}")
+    print(f"CPI:      {stats.cpi:.3f}")
+    active = stats.active_cycles or 1
+    if set(stats.state_cycles) == {S_FETCH} and stats.retired:
+        print("\nFSM state cycles: n/a (pipelined core)")
+    else:
+        print("\nFSM state cycles:")
+        for state, n in sorted(stats.state_cycles.items()):
+            print(f"  {STATE_NAMES.get(state, str(state)):<10} {n:12}  {100.0 * n / active:5.1f}%")
+    print(f"\nTraps: {stats.traps} ({stats.interrupts} interrupts)")
+    for cause, n in stats.trap_causes.most_common():
+        print(f"  {cause:<10} {n:12}")
+    print("\nPer-opcode cycles:")
+    print(f"  {'opcode':<10} {'count':>12} {'cycles':>12} {'CPI':>6} {'share':>6}")
+    for op, n in stats.op_cycles.most_common():
+        count = stats.op_count[op]
+        cpi = f"{n / count:6.2f}" if count else '     -'
+        print(f"  {op:<10} {count:12} {n:12} {cpi} {100.0 * n / active:5.1f}%")
+    if top and stats.pc_cycles:
+        print(f"\nTop {top} PCs by cycles:")
+        for pc, n in stats.pc_cycles.most_common(top):
+            print(f"  0x{pc:08x} {n:12}  {100.0 * n / active:5.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='CPI and stall statistics from a riscv_core VCD.')
+    parser.add_argument('vcd', help='VCD file (may be gzip-compressed)')
+    parser.add_argument('--scope', help='hierarchical name of riscv_core (default: auto-detect)')
+    parser.add_argument('--top', type=int, default=10, help='hottest PCs to list (0: none)')
+    parser.add_argument('--json', help='also write the statistics to this JSON file')
+    args = parser.parse_args()
+
+    try:
+        with open_vcd(args.vcd) as f:
+            stats, core = analyze(f, args.scope)
+    except (OSError, ValueError) as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+
+    print_report(stats, core, args.top)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(stats.as_dict(args.top), f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,25 +1,18 @@
-
+import os
 import sys
-import struct
+
+# The conversion itself lives in scripts/bin_to_mem.py; this wrapper keeps the
+# plugin-local entry point working.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'scripts')))
+
+from bin_to_mem import convert_bin_to_mem  # noqa: E402
+
 
 def bin_to_mem(input_file, output_file):
     """
     Converts a binary file to a hexadecimal memory file for Verilog's $readmemh.
     """
-    try:
-        with open(input_file, 'rb') as f_in, open(output_file, 'w') as f_out:
-            while True:
-                word = f_in.read(4)
-                if not word:
-                    break
-                # Ensure the word is 4 bytes long, padding with zeros if necessary
-                if len(word) < 4:
-                    word = word.ljust(4, b'\x00')
-                
-                val = struct.unpack('<I', word)[0]
-                f_out.write(f'{val:08x}\n')
-    except IOError as e:
-        print(f"Error: {e}", file=sys.stderr)
+    if not convert_bin_to_mem(input_file, output_file):
         sys.exit(1)
 
 if __name__ == '__main__':
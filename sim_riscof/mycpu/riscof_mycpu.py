@@ -2,12 +2,23 @@
 import os
 import shutil
 import subprocess
+import sys
 import logging
 import riscof.utils as utils
 from riscof.pluginTemplate import pluginTemplate
 
+# Shared host-side tooling lives in <repo>/scripts
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'scripts')))
+import sim_cache  # noqa: E402
+import elf_loader  # noqa: E402
+import signature  # noqa: E402
+import riscof_cache  # noqa: E402
+
 logger = logging.getLogger()
 
+# FPGA-only top level and peripherals that are not part of the simulated core
+NON_SIM_RTL = ('basys3_top.v', 'uart_tx.v')
+
 class mycpu(pluginTemplate):
     __model__ = "mycpu"
     __version__ = "1.0"
@@ -24,86 +35,155 @@ class mycpu(pluginTemplate):
         # Get absolute paths to project directories
         self.root_dir = os.path.abspath(os.path.join(self.pluginpath, '..', '..'))
         self.rtl_dir = os.path.join(self.root_dir, 'rtl')
-        self.sim_dir = os.path.join(self.root_dir, 'sim')
-        self.tb_file = os.path.join(self.sim_dir, 'tb_riscv_core_new.v')
+        self.tb_file = os.path.join(self.root_dir, 'tb', 'isa', 'tb_isa_test.v')
+
+        # Simulator backend: 'icarus' (default, reference) or 'verilator',
+        # from the plugin's `simulator` config key or the SIM environment variable
+        self.simulator = str(config.get('simulator', os.environ.get('SIM', 'icarus'))).lower()
+        try:
+            self.sim = sim_cache.simulator(self.simulator)
+        except ValueError as e:
+            logger.error(str(e))
+            raise SystemExit(1)
 
     def initialise(self, suite, work_dir, archtest_env):
         self.work_dir = work_dir
         self.suite_dir = suite
         
-        # Path to the compiled VVP file, which will be in the root of the work_dir
-        self.vvp_file = os.path.join(self.work_dir, "dut.vvp")
+        # Path to the compiled simulation image (dut.vvp or the Verilator
+        # binary dut.bin), which will be in the root of the work_dir
+        self.vvp_file = os.path.join(self.work_dir, "dut" + self.sim.suffix)
+
+        # Tests are linked with the mycpu environment: code in instruction
+        # memory, writable data (and the signature) in data memory.
+        self.compile_cmd = 'riscv{1}-unknown-elf-gcc -march={0} \
+         '+riscof_cache.GCC_OPTIONS+'\
+         -T '+self.pluginpath+'/env/link.ld\
+         -I '+self.pluginpath+'/env/\
+         -I ' + archtest_env + ' {2} -o {3} {4}'
 
         # Determine XLEN from ISA spec to configure toolchain
         ispec = utils.load_yaml(self.isa_spec)['hart0']
         self.xlen = ('64' if 64 in ispec['supported_xlen'] else '32')
+        self.compile_cmd = self.compile_cmd+' -mabi='+('lp64 ' if self.xlen == '64' else 'ilp32 ')
 
-        # Toolchain paths
-        self.objcopy_cmd = f"riscv{self.xlen}-unknown-elf-objcopy"
-        self.python_cmd = "python3"
-        self.bin_to_mem_script = os.path.join(self.pluginpath, "bin_to_mem.py")
+        # Incremental runs: ELFs depend on the test and the environment and
+        # live in the compile cache shared with the other plugins,
+        # signatures additionally depend on the simulation image (set in build).
+        self.env_digest = riscof_cache.tree_digest(os.path.join(self.pluginpath, 'env'), archtest_env)
+        self.elf_cache = riscof_cache.CompileCache()
+        self.sig_cache = riscof_cache.ResultCache('mycpu-signature')
 
     def build(self, isa_yaml, platform_yaml):
         # The build is now ISA-agnostic and happens once.
         # We determine xlen in initialise, which is called before build.
         
         # Check if tools are available
-        if shutil.which("iverilog") is None:
-            logger.error("iverilog not found. Please check environment setup.")
-            raise SystemExit(1)
-        if shutil.which(self.objcopy_cmd) is None:
-            logger.error(f"{self.objcopy_cmd} not found. Please check environment setup.")
-            raise SystemExit(1)
-        if shutil.which("vvp") is None:
-            logger.error("vvp not found. Please check environment setup.")
+        for tool in (self.sim.tool,) + self.sim.runner:
+            if shutil.which(tool) is None:
+                logger.error(tool+" not found. Please check environment setup.")
+                raise SystemExit(1)
+        compiler = "riscv{0}-unknown-elf-gcc".format(self.xlen)
+        if shutil.which(compiler) is None:
+            logger.error(compiler+": executable not found. Please check environment setup.")
             raise SystemExit(1)
 
-        # One-time compilation of the DUT's RTL and testbench
-        rtl_files = [os.path.join(self.rtl_dir, f) for f in os.listdir(self.rtl_dir) if f.endswith('.v')]
-        
-        compile_cmd = [
-            "iverilog",
-            "-g2012",
-            "-o", self.vvp_file,
-            self.tb_file
-        ] + rtl_files
-        
-        logger.info(f"Compiling DUT with command: {' '.join(compile_cmd)}")
-        
+        # One-time compilation of the DUT's RTL and testbench. The image is
+        # shared with other work dirs and the Makefile flow through sim_cache.
+        rtl_files = sorted(os.path.join(self.rtl_dir, f) for f in os.listdir(self.rtl_dir)
+                           if f.endswith('.v') and f not in NON_SIM_RTL)
+        sources = [self.tb_file] + rtl_files
+
+        logger.info(f"Compiling DUT: {self.sim.tool} {' '.join(self.sim.flags)} "
+                    f"-o {self.vvp_file} {' '.join(sources)}")
+
+        self.image_key = sim_cache.cache_key(sources, flags=self.sim.flags, tool=self.sim.tool)
         try:
-            res = subprocess.run(compile_cmd, check=True, capture_output=True, text=True)
-            logger.info("DUT compilation successful.")
-            logger.debug(res.stdout)
+            hit, seconds = sim_cache.compile_cached(sources, self.vvp_file, flags=self.sim.flags,
+                                                    tool=self.sim.tool)
+            logger.info(f"DUT compilation successful (cache {'hit' if hit else 'miss'}, {seconds:.2f}s).")
+            logger.debug(sim_cache.format_stats(sim_cache.read_stats()))
         except subprocess.CalledProcessError as e:
             logger.error("DUT compilation failed.")
             logger.error(e.stderr)
             raise SystemExit(1)
 
     def runTests(self, testList):
-        make = utils.makeUtil(makefilePath=os.path.join(self.work_dir, "Makefile." + self.name))
-        make.makeCommand = 'make -k -j' + self.num_jobs
+        name = self.name[:-1]
+        sig_name = name + ".signature"
+        elf_keys = {}
 
+        # 1. Compile the tests whose ELF is not cached, in parallel.
+        compile_make = utils.makeUtil(makefilePath=os.path.join(self.work_dir, "Makefile." + name + "-compile"))
+        compile_make.makeCommand = 'make -k -j' + self.num_jobs
+        compiled = []
         for testname in testList:
             testentry = testList[testname]
             test_dir = testentry['work_dir']
-            
-            # The framework compiles the test to an ELF file.
-            elf_file = os.path.join(test_dir, testname + ".elf")
-            bin_file = os.path.join(test_dir, "inst.bin")
-            mem_file = os.path.join(test_dir, "inst.mem")
-
-            # Command to convert ELF to a format our testbench can load
-            elf_to_mem_cmd = f"{self.objcopy_cmd} -O binary {elf_file} {bin_file} && " \
-                             f"{self.python_cmd} {self.bin_to_mem_script} {bin_file} {mem_file}"
-
-            # Command to run the simulation
-            # The VVP file is in work_dir, and we run it from the specific test_dir
-            sim_cmd = f"vvp {self.vvp_file}"
-
-            # Concatenate all commands that need to be executed within a make-target.
-            # We must execute from the test's working directory so vvp can find inst.mem
-            execute_cmds = f"cd {test_dir} && {elf_to_mem_cmd} && {sim_cmd}"
+            elf_keys[testname] = riscof_cache.compile_key(testentry, self.xlen, self.env_digest)
+            if self.elf_cache.fetch(elf_keys[testname], test_dir, {self.elf_cache.ELF: 'my.elf'}):
+                continue
+            compile_macros = ' -D' + " -D".join(testentry['macros'])
+            cmd = self.compile_cmd.format(testentry['isa'].lower(), self.xlen,
+                                          testentry['test_path'], 'my.elf', compile_macros)
+            compile_make.add_target('@cd {0}; {1};'.format(test_dir, cmd))
+            compiled.append(testname)
+        if compiled:
+            compile_make.execute_all(self.work_dir)
+            for testname in compiled:
+                self.elf_cache.store(elf_keys[testname], testList[testname]['work_dir'],
+                                     {self.elf_cache.ELF: 'my.elf'}, merge=True)
+        logger.info(f"mycpu ELFs: {self.elf_cache.summary()}")
+
+        # 2. Build the memory images in-process and simulate the tests whose
+        #    signature is not cached for this simulation image.
+        make = utils.makeUtil(makefilePath=os.path.join(self.work_dir, "Makefile." + name))
+        make.makeCommand = 'make -k -j' + self.num_jobs
+        dumps = {}
+        for testname in testList:
+            testentry = testList[testname]
+            test_dir = testentry['work_dir']
+            sig_key = riscof_cache.make_key(elf_keys[testname], self.image_key)
+            if self.sig_cache.fetch(sig_key, test_dir, [sig_name]):
+                continue
+
+            elf_file = os.path.join(test_dir, "my.elf")
+            mem_prefix = os.path.join(test_dir, "inst")
+
+            # inst.mem + inst.b0..b3.mem, no objcopy or extra interpreter per test
+            try:
+                elf = elf_loader.load_elf_images(elf_file, mem_prefix)
+            except (OSError, elf_loader.ElfError) as e:
+                logger.error(f"Could not load {elf_file}: {e}")
+                continue
+
+            sim_cmd = ' '.join(sim_cache.run_command(self.vvp_file, self.simulator))
+            sim_cmd += " +TESTFILE=inst.mem +DATAFILE=inst"
+
+            # The testbench dumps begin_signature..end_signature from data
+            # memory with one $writememh at the end of the test.
+            sig_range = elf.signature_range
+            if sig_range is None:
+                logger.error(f"{elf_file} has no begin_signature/end_signature symbols")
+            else:
+                begin, end = ((a & (elf_loader.MEM_BYTES - 1)) >> 2 for a in sig_range)
+                dumps[test_dir] = sig_key
+                sim_cmd += f" +SIGNATURE=signature.memh +SIG_BEGIN={begin:x} +SIG_END={end:x}"
+
+            execute_cmds = f"cd {test_dir} && {sim_cmd}"
             
             make.add_target(execute_cmds, testname)
 
-        make.execute_all(self.work_dir)
+        if make.targets:
+            make.execute_all(self.work_dir)
+        logger.info(f"mycpu signatures: {self.sig_cache.summary()}")
+
+        # 3. Convert the dumps into DUT-<name>.signature files for RISCOF.
+        for test_dir, sig_key in dumps.items():
+            try:
+                signature.normalize(os.path.join(test_dir, "signature.memh"),
+                                    os.path.join(test_dir, sig_name))
+            except OSError as e:
+                logger.error(f"No signature dump for {test_dir}: {e}")
+                continue
+            self.sig_cache.store(sig_key, test_dir, [sig_name])
@@ -6,6 +6,7 @@ import shlex
 import logging
 import random
 import string
+import sys
 from string import Template
 
 import riscof.utils as utils
@@ -13,6 +14,10 @@ from riscof.pluginTemplate import pluginTemplate
 import riscof.constants as constants
 from riscv_isac.isac import isac
 
+# Shared host-side tooling lives in <repo>/scripts
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'scripts')))
+import riscof_cache  # noqa: E402
+
 logger = logging.getLogger()
 
 class sail_cSim(pluginTemplate):
@@ -33,6 +38,9 @@ class sail_cSim(pluginTemplate):
         self.isa_spec = os.path.abspath(config['ispec']) if 'ispec' in config else ''
         self.platform_spec = os.path.abspath(config['pspec']) if 'ispec' in config else ''
         self.make = config['make'] if 'make' in config else 'make'
+        # trace=1 keeps the full per-test sail trace (<test>.log) outside
+        # coverage runs; by default only coverage runs trace, through a pipe
+        self.trace = str(config.get('trace', '0')).lower() in ('1', 'true', 'yes')
         logger.debug("SAIL CSim plugin initialised using the following configuration.")
         for entry in config:
             logger.debug(entry+' : '+config[entry])
@@ -43,10 +51,14 @@ class sail_cSim(pluginTemplate):
         self.work_dir = work_dir
         self.objdump_cmd = 'riscv{1}-unknown-elf-objdump -D {0} > {2};'
         self.compile_cmd = 'riscv{1}-unknown-elf-gcc -march={0} \
-         -static -mcmodel=medany -fvisibility=hidden -nostdlib -nostartfiles\
+         '+riscof_cache.GCC_OPTIONS+'\
          -T '+self.pluginpath+'/env/link.ld\
          -I '+self.pluginpath+'/env/\
          -I ' + archtest_env
+        # Reference results only depend on the test and this environment
+        self.env_digest = riscof_cache.tree_digest(os.path.join(self.pluginpath, 'env'), archtest_env)
+        self.cache = riscof_cache.ResultCache('sail')
+        self.compiled = riscof_cache.CompileCache()
 
     def build(self, isa_yaml, platform_yaml):
         ispec = utils.load_yaml(isa_yaml)['hart0']
@@ -64,6 +76,7 @@ class sail_cSim(pluginTemplate):
             self.isa += 'f'
         if "D" in ispec["ISA"]:
             self.isa += 'd'
+        self.pmp_flags = self._pmp_flags(ispec)
         objdump = "riscv{0}-unknown-elf-objdump".format(self.xlen)
         if shutil.which(objdump) is None:
             logger.error(objdump+": executable not found. Please check environment setup.")
@@ -75,16 +88,37 @@ class sail_cSim(pluginTemplate):
         if shutil.which(self.sail_exe[self.xlen]) is None:
             logger.error(self.sail_exe[self.xlen]+ ": executable not found. Please check environment setup.")
             raise SystemExit(1)
+        # Cached signatures are keyed on the sail binary's contents, so an upgrade invalidates them
+        self.sail_digest = riscof_cache.file_digest(shutil.which(self.sail_exe[self.xlen]))
         if shutil.which(self.make) is None:
             logger.error(self.make+": executable not found. Please check environment setup.")
             raise SystemExit(1)
 
 
+    @staticmethod
+    def _pmp_flags(ispec):
+        pmp = ispec.get("PMP", {})
+        if not pmp.get("implemented"):
+            return ""
+        if "pmp-grain" not in pmp:
+            logger.error("PMP grain not defined")
+            return ""
+        if "pmp-count" not in pmp:
+            logger.error("PMP count not defined")
+            return ""
+        return " --pmp-grain={0} --pmp-count={1}".format(pmp["pmp-grain"], pmp["pmp-count"])
+
     def runTests(self, testList, cgf_file=None, header_file= None):
         if os.path.exists(self.work_dir+ "/Makefile." + self.name[:-1]):
             os.remove(self.work_dir+ "/Makefile." + self.name[:-1])
         make = utils.makeUtil(makefilePath=os.path.join(self.work_dir, "Makefile." + self.name[:-1]))
         make.makeCommand = self.make + ' -j' + self.num_jobs
+        sig_name = self.name[:-1] + ".signature"
+        cached_files = ['ref.elf', 'ref.disass', sig_name]
+        compiled_files = {self.compiled.ELF: 'ref.elf', self.compiled.DISASS: 'ref.disass'}
+        to_store = {}
+        to_compile = {}
+        coverage_reports = []
         for file in testList:
             testentry = testList[file]
             test = testentry['test_path']
@@ -93,33 +127,36 @@ class sail_cSim(pluginTemplate):
 
             elf = 'ref.elf'
 
-            execute = "@cd "+testentry['work_dir']+";"
+            # Reuse the ELF, disassembly and signature of an unchanged test.
+            # Coverage runs need the full sail log, so they always execute.
+            compile_key = riscof_cache.compile_key(testentry, self.xlen, self.env_digest)
+            key = riscof_cache.make_key(compile_key, self.sail_digest, self.isa, self.pmp_flags)
+            if cgf_file is None:
+                if self.cache.fetch(key, test_dir, cached_files):
+                    continue
+                to_store[test_dir] = key
 
-            cmd = self.compile_cmd.format(testentry['isa'].lower(), self.xlen) + ' ' + test + ' -o ' + elf
-            compile_cmd = cmd + ' -D' + " -D".join(testentry['macros'])
-            execute+=compile_cmd+";"
-
-            execute += self.objdump_cmd.format(elf, self.xlen, 'ref.disass')
-            sig_file = os.path.join(test_dir, self.name[:-1] + ".signature")
+            execute = "@cd "+testentry['work_dir']+";"
 
-            isa_yaml = utils.load_yaml(self.isa_yaml_path)
-            # Verify the availability of PMP:
-            if "PMP" in isa_yaml['hart0']:
-                if isa_yaml['hart0']["PMP"]["implemented"] == True:
-                    if "pmp-grain" in isa_yaml['hart0']["PMP"]:
-                        pmp_flags = " --pmp-grain=" + str(isa_yaml['hart0']["PMP"]["pmp-grain"])
-                    else:
-                        logger.error("PMP grain not defined")
-                        pmp_flags = ""
-                    if "pmp-count" in isa_yaml['hart0']["PMP"]:
-                        pmp_flags = pmp_flags + " --pmp-count=" + str(isa_yaml['hart0']["PMP"]["pmp-count"])
-                    else:
-                        logger.error("PMP count not defined")
-                        pmp_flags = ""
+            # The ELF (and its disassembly) may already have been built by
+            # the DUT plugin or an earlier run with the same environment.
+            available = self.compiled.available(compile_key)
+            if available >= set(compiled_files):
+                self.compiled.fetch(compile_key, test_dir, compiled_files)
             else:
-                pmp_flags = ""
+                if self.compiled.ELF in available:
+                    self.compiled.fetch(compile_key, test_dir, {self.compiled.ELF: elf})
+                else:
+                    self.compiled.misses += 1
+                    cmd = self.compile_cmd.format(testentry['isa'].lower(), self.xlen) + ' ' + test + ' -o ' + elf
+                    compile_cmd = cmd + ' -D' + " -D".join(testentry['macros'])
+                    execute+=compile_cmd+";"
+                execute += self.objdump_cmd.format(elf, self.xlen, 'ref.disass')
+                to_compile[test_dir] = compile_key
+            sig_file = os.path.join(test_dir, self.name[:-1] + ".signature")
 
-            execute += self.sail_exe[self.xlen] + '  -i -v --trace=step {0} --ram-size=8796093022208 --signature-granularity=8  --test-signature={1} {2} > {3}.log 2>&1;'.format(pmp_flags, sig_file, elf, test_name)
+            sail_cmd = self.sail_exe[self.xlen] + ' -i{0} --ram-size=8796093022208 --signature-granularity=8  --test-signature={1} {2}'.format(self.pmp_flags, sig_file, elf)
+            trace_cmd = sail_cmd.replace(' -i', ' -i -v --trace=step', 1)
 
             cov_str = ' '
             for label in testentry['coverage_labels']:
@@ -134,17 +171,49 @@ class sail_cSim(pluginTemplate):
                     cgf_mac+=' -cm '+macro
 
             if cgf_file is not None:
+                # Stream the trace through a FIFO into riscv_isac; the text
+                # trace is never written to disk.
+                fifo = test_name + '.trace'
                 coverage_cmd = 'riscv_isac --verbose info coverage -d \
-                        -t {0}.log --parser-name c_sail -o coverage.rpt  \
+                        -t {0} --parser-name c_sail -o coverage.rpt  \
                         --sig-label begin_signature  end_signature \
                         --test-label rvtest_code_begin rvtest_code_end \
-                        -e ref.elf -c {1} -x{2} {3} {4} {5};'.format(\
-                        test_name, ' -c '.join(cgf_file), self.xlen, cov_str, header_file_flag, cgf_mac)
+                        -e ref.elf -c {1} -x{2} {3} {4} {5}'.format(\
+                        fifo, ' -c '.join(cgf_file), self.xlen, cov_str, header_file_flag, cgf_mac)
+                execute += 'rm -f {0}; mkfifo {0};'.format(fifo)
+                execute += '{0} > {1} 2>&1 & sail_pid=$$!;'.format(trace_cmd, fifo)
+                execute += coverage_cmd + '; status=$$?;'
+                # riscv_isac failing before it opens the FIFO leaves sail blocked
+                execute += 'kill $$sail_pid 2>/dev/null; wait $$sail_pid; rm -f {0}; exit $$status;'.format(fifo)
+                coverage_reports.append(os.path.join(test_dir, 'coverage.rpt'))
+            elif self.trace:
+                execute += '{0} > {1}.log 2>&1;'.format(trace_cmd, test_name)
             else:
-                coverage_cmd = ''
-
-
-            execute+=coverage_cmd
+                execute += '{0} > {1}.log 2>&1;'.format(sail_cmd, test_name)
 
             make.add_target(execute)
-        make.execute_all(self.work_dir)
+        if make.targets:
+            make.execute_all(self.work_dir)
+        if coverage_reports:
+            self._merge_coverage(coverage_reports, cgf_file)
+        for test_dir, key in to_compile.items():
+            self.compiled.store(key, test_dir, compiled_files, merge=True)
+        for test_dir, key in to_store.items():
+            self.cache.store(key, test_dir, cached_files)
+        logger.info(f"sail reference results: {self.cache.summary()}, "
+                    f"compiled tests: {self.compiled.summary()}")
+
+    def _merge_coverage(self, reports, cgf_file):
+        """Merges the per-test reports into <work_dir>/merged_coverage.rpt with num_jobs processes."""
+        reports = [r for r in reports if os.path.isfile(r)]
+        if not reports:
+            logger.error("No per-test coverage reports to merge")
+            return
+        merged = os.path.join(self.work_dir, 'merged_coverage.rpt')
+        cmd = ['riscv_isac', '--verbose', 'info', 'merge', '-d', '-p', self.num_jobs,
+               '-x', self.xlen, '-o', merged]
+        for cgf in cgf_file:
+            cmd += ['-c', cgf]
+        logger.info(f"Merging {len(reports)} coverage reports into {merged}")
+        if subprocess.run(cmd + reports).returncode != 0:
+            logger.error("riscv_isac merge failed")
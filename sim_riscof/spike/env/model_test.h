@@ -1,10 +1,5 @@
 #ifndef _COMPLIANCE_MODEL_H
 #define _COMPLIANCE_MODEL_H
-#if XLEN == 64
-  #define ALIGNMENT 3
-#else
-  #define ALIGNMENT 2
-#endif
 
 #define RVMODEL_DATA_SECTION \
         .pushsection .tohost,"aw",@progbits;                            \
@@ -17,24 +12,23 @@
         .word 4;
 
 //RV_COMPLIANCE_HALT
-#define RVMODEL_HALT    ;\
-li x1, 1                ;\
-1:                      ;\
-    sw x1, tohost, t2   ;\
-    j 1b                ;\
+#define RVMODEL_HALT                                              \
+  li x1, 1;                                                                   \
+  write_tohost:                                                               \
+    sw x1, tohost, t5;                                                        \
+    j write_tohost;
 
 #define RVMODEL_BOOT
 
 //RV_COMPLIANCE_DATA_BEGIN
 #define RVMODEL_DATA_BEGIN                                              \
   RVMODEL_DATA_SECTION                                                        \
-  .align ALIGNMENT;\
+  .align 4;\
   .global begin_signature; begin_signature:
 
 //RV_COMPLIANCE_DATA_END
 #define RVMODEL_DATA_END                                                      \
-.align ALIGNMENT;\
-  .global end_signature; end_signature:  
+  .align 4; .global end_signature; end_signature:
 
 //RVTEST_IO_INIT
 #define RVMODEL_IO_INIT
@@ -57,5 +51,7 @@ li x1, 1                ;\
 
 #define RVMODEL_CLEAR_MEXT_INT
 
+#define RVMODEL_PMP_GRAIN 0
+#define RVMODEL_NUM_PMPS 16
 
-#endif // _COMPLIANCE_MODEL_H
\ No newline at end of file
+#endif // _COMPLIANCE_MODEL_H
@@ -13,6 +13,11 @@ import riscof.utils as utils
 import riscof.constants as constants
 from riscof.pluginTemplate import pluginTemplate
 
+# Shared host-side tooling lives in <repo>/scripts
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'scripts')))
+import riscof_cache  # noqa: E402
+import commit_trace  # noqa: E402
+
 logger = logging.getLogger()
 
 class spike(pluginTemplate):
@@ -62,6 +67,20 @@ class spike(pluginTemplate):
         # Set the timeout for the make execution
         self.timeout = str(config['timeout'] if 'timeout' in config else 300)
 
+        # Commit logs (--log-commits) are opt-in: commit_log = plain, gzip or zstd
+        # writes DUT-spike.log[.gz|.zst] from the same spike run as the signature.
+        # Compressed logs are streamed through the compressor and read back
+        # with scripts/commit_trace.py.
+        self.commit_log = str(config.get('commit_log', 'off')).lower()
+        if self.commit_log in ('off', '0', 'no', 'none', ''):
+            self.commit_log = None
+        else:
+            try:
+                commit_trace.compressor(self.commit_log)
+            except ValueError as e:
+                print(e)
+                raise SystemExit(1)
+
     def initialise(self, suite, work_dir, archtest_env):
 
        # capture the working directory. Any artifacts that the DUT creates should be placed in this
@@ -76,11 +95,16 @@ class spike(pluginTemplate):
        # test. Similarly the output elf name and compile macros will be assigned later in the
        # runTests function
        self.compile_cmd = 'riscv{1}-unknown-elf-gcc -march={0} \
-         -static -mcmodel=medany -fvisibility=hidden -nostdlib -nostartfiles -g\
+         '+riscof_cache.GCC_OPTIONS+'\
          -T '+self.pluginpath+'/env/link.ld\
          -I '+self.pluginpath+'/env/\
          -I ' + archtest_env + ' {2} -o {3} {4}'
 
+       # Compiled tests are shared with the reference plugin through the
+       # compile cache; env/ matches sail_cSim/env, so both get the same key.
+       self.env_digest = riscof_cache.tree_digest(os.path.join(self.pluginpath, 'env'), archtest_env)
+       self.compiled = riscof_cache.CompileCache()
+
        # add more utility snippets here
 
     def build(self, isa_yaml, platform_yaml):
@@ -126,6 +150,7 @@ class spike(pluginTemplate):
       # make.makeCommand = 'make -k -j' + self.num_jobs
       # 这是修改后的代码
       make.makeCommand = 'make -k -j' + self.num_jobs + ' -f ' + make.makefilePath
+      compiled = {}
       # we will iterate over each entry in the testList. Each entry node will be refered to by the
       # variable testname.
       for testname in testList:
@@ -158,13 +183,34 @@ class spike(pluginTemplate):
           # function
           cmd = self.compile_cmd.format(testentry['isa'].lower(), self.xlen, test, elf, compile_macros)
 
+          # skip the compile when this test was already built with the same environment
+          compile_key = riscof_cache.compile_key(testentry, self.xlen, self.env_digest)
+          if self.compiled.fetch(compile_key, test_dir, {self.compiled.ELF: elf}):
+            cmd = 'true'
+          else:
+            compiled[test_dir] = compile_key
+
 	  # if the user wants to disable running the tests and only compile the tests, then
 	  # the "else" clause is executed below assigning the sim command to simple no action
 	  # echo statement.
           if self.target_run:
             # set up the simulation command. Template is for spike. Please change.
-            simcmd = self.dut_exe + ' --misaligned --isa={0} +signature={1} +signature-granularity=4 {2}'.format(self.isa, sig_file, elf)
-            simcmd = simcmd + ';' + self.dut_exe + ' --isa={0} --log-commits -l my.elf 2> {1}'.format(self.isa, log_file)
+            # a single spike run writes the signature and, if enabled, the commit log
+            simcmd = self.dut_exe + ' --misaligned --isa={0} +signature={1} +signature-granularity=4'.format(self.isa, sig_file)
+            if self.commit_log is None:
+              simcmd = simcmd + ' ' + elf
+            else:
+              suffix, compress = commit_trace.compressor(self.commit_log)
+              simcmd = simcmd + ' --log-commits -l ' + elf
+              if compress is None:
+                simcmd = simcmd + ' 2> ' + log_file
+              else:
+                # stderr (the log) goes through the compressor, stdout stays on the console;
+                # pipefail makes the pipeline fail with spike rather than the compressor
+                simcmd = "bash -o pipefail -c '{{ {0} 2>&1 1>&3 | {1} > {2}{3}; }} 3>&1'".format(
+                    simcmd, compress, log_file, suffix)
+            # a failing spike run leaves no signature, so RISCOF fails the test
+            simcmd = '{0} || {{ rm -f {1}; false; }}'.format(simcmd, sig_file)
           else:
             simcmd = 'echo "NO RUN"'
 
@@ -190,6 +236,13 @@ class spike(pluginTemplate):
           logger.error('Process timed out. Please increase the timeout in config.ini')
           sys.exit(1)
 
+      for test_dir, compile_key in compiled.items():
+          # only tests that ran cleanly are cached
+          if self.target_run and not os.path.exists(os.path.join(test_dir, self.name[:-1] + ".signature")):
+              continue
+          self.compiled.store(compile_key, test_dir, {self.compiled.ELF: 'my.elf'}, merge=True)
+      logger.info(f"spike compiled tests: {self.compiled.summary()}")
+
       # if target runs are not required then we simply exit as this point after running all
       # the makefile targets.
       if not self.target_run:
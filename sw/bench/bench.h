@@ -0,0 +1,63 @@
+#ifndef BENCH_H
+#define BENCH_H
+
+#include <stdint.h>
+#include <stddef.h>
+#include "../perf_counters.h"
+
+// Benchmark results, read back by scripts/bench.py: from the +SIGNATURE
+// dump of the `bench_result` symbol on the RTL, from memory on the ISS.
+// Only the measured kernel is counted, between bench_start() and bench_stop().
+#define BENCH_MAGIC 0xBE9C0001u
+
+struct bench_result {
+    uint32_t magic;                 // BENCH_MAGIC once bench_stop() ran
+    uint32_t cycles_lo, cycles_hi;
+    uint32_t instret_lo, instret_hi;
+    uint32_t iterations;
+    uint32_t checksum;              // kernel output, must match between RTL and ISS
+    uint32_t reserved;
+};
+
+extern volatile struct bench_result bench_result;
+
+static uint64_t bench_cycles0, bench_instret0;
+
+static inline void bench_start(void) {
+    bench_instret0 = perf_instret();
+    bench_cycles0 = perf_cycles();
+}
+
+static inline void bench_stop(uint32_t iterations, uint32_t checksum) {
+    uint64_t cycles = perf_cycles() - bench_cycles0;
+    uint64_t instret = perf_instret() - bench_instret0;
+    bench_result.cycles_lo = (uint32_t)cycles;
+    bench_result.cycles_hi = (uint32_t)(cycles >> 32);
+    bench_result.instret_lo = (uint32_t)instret;
+    bench_result.instret_hi = (uint32_t)(instret >> 32);
+    bench_result.iterations = iterations;
+    bench_result.checksum = checksum;
+    bench_result.magic = BENCH_MAGIC;
+}
+
+// Prints the result over HTIF and exits: 0 is PASS, anything else FAIL. Does not return.
+void bench_exit(int code) __attribute__((noreturn));
+
+// Defeats constant folding of benchmark inputs
+#define BENCH_OPAQUE(x) ({ __typeof__(x) __v = (x); __asm__ volatile ("" : "+r"(__v)); __v; })
+
+// Cheap checksum step (CRC-16/CCITT of one byte)
+static inline uint32_t bench_crc16(uint32_t crc, uint8_t byte) {
+    crc ^= (uint32_t)byte << 8;
+    for (int i = 0; i < 8; i++)
+        crc = (crc & 0x8000) ? ((crc << 1) ^ 0x1021) & 0xFFFF : (crc << 1) & 0xFFFF;
+    return crc;
+}
+
+static inline uint32_t bench_crc16_word(uint32_t crc, uint32_t word) {
+    for (int i = 0; i < 4; i++)
+        crc = bench_crc16(crc, (uint8_t)(word >> (8 * i)));
+    return crc;
+}
+
+#endif // BENCH_H
@@ -0,0 +1,28 @@
+#include "bench.h"
+#include "../htif.h"
+
+volatile struct bench_result bench_result;
+
+void bench_exit(int code) {
+    if (bench_result.magic == BENCH_MAGIC)
+        htif_printf("cycles %u instret %u iterations %u checksum %x\n",
+                    bench_result.cycles_lo, bench_result.instret_lo,
+                    bench_result.iterations, bench_result.checksum);
+    htif_exit(code);
+}
+
+// GCC may emit calls to these for struct copies and array initialisers
+void *memset(void *s, int c, size_t n) {
+    unsigned char *p = s;
+    while (n--)
+        *p++ = (unsigned char)c;
+    return s;
+}
+
+void *memcpy(void *dest, const void *src, size_t n) {
+    unsigned char *d = dest;
+    const unsigned char *s = src;
+    while (n--)
+        *d++ = *s++;
+    return dest;
+}
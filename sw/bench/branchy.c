@@ -0,0 +1,71 @@
+// Branch-heavy kernel: data-dependent branches on LFSR values, a binary
+// search and a dense switch, so taken and not-taken branches interleave
+// without a pattern.
+#include "bench.h"
+
+#ifndef ITERATIONS
+#define ITERATIONS 2000
+#endif
+
+#define TABLE 64
+
+static uint16_t table[TABLE];
+
+static uint32_t lfsr_next(uint32_t x) {
+    // Galois LFSR, taps 32,22,2,1
+    return (x >> 1) ^ (-(x & 1u) & 0x80200003u);
+}
+
+static int bsearch_u16(const uint16_t *t, int n, uint16_t key) {
+    int lo = 0, hi = n - 1;
+    while (lo <= hi) {
+        int mid = (lo + hi) >> 1;
+        if (t[mid] == key)
+            return mid;
+        if (t[mid] < key)
+            lo = mid + 1;
+        else
+            hi = mid - 1;
+    }
+    return -1;
+}
+
+static uint32_t classify(uint32_t x) {
+    switch (x & 15) {
+    case 0:  return x >> 3;
+    case 1:  return x ^ 0x55;
+    case 2:  return x + 7;
+    case 3:  return x << 1;
+    case 5:  return ~x;
+    case 8:  return x & 0xFF00;
+    case 9:  return x | 1;
+    case 13: return x - 3;
+    default: return x;
+    }
+}
+
+int main(void) {
+    const int iterations = BENCH_OPAQUE(ITERATIONS);
+    uint32_t x = 0xACE1u, acc = 0, hits = 0;
+
+    for (int i = 0; i < TABLE; i++)
+        table[i] = (uint16_t)(i * 1021 + 17);
+
+    bench_start();
+    for (int i = 0; i < iterations; i++) {
+        x = lfsr_next(x);
+        if (x & 1)
+            acc += x >> 7;
+        else if (x & 2)
+            acc ^= x;
+        else
+            acc -= x >> 3;
+        if ((int32_t)x < 0 && (x & 0x100))
+            acc = (acc << 1) | (acc >> 31);
+        if (bsearch_u16(table, TABLE, (uint16_t)((x & 63) * 1021 + ((x & 64) ? 17 : 18))) >= 0)
+            hits++;
+        acc += classify(x);
+    }
+    bench_stop(iterations, bench_crc16_word(bench_crc16_word(0, acc), hits));
+    return 0;
+}
@@ -0,0 +1,197 @@
+// CoreMark-style integer kernel: linked-list search and sort, a small
+// matrix multiply-accumulate and a string-scanning state machine, folded
+// into a CRC like CoreMark's (not the reference source; no CoreMark score).
+#include "bench.h"
+
+#ifndef ITERATIONS
+#define ITERATIONS 4
+#endif
+
+#define LIST_NODES 48
+#define MATRIX_N 8
+
+// ---------------------------------------------------------------------
+// Linked list
+// ---------------------------------------------------------------------
+
+typedef struct node {
+    struct node *next;
+    int16_t data;
+    int16_t index;
+} node;
+
+static node nodes[LIST_NODES];
+
+static node *list_init(uint32_t seed) {
+    node *head = NULL;
+    for (int i = LIST_NODES - 1; i >= 0; i--) {
+        seed = seed * 1103515245u + 12345u;
+        nodes[i].data = (int16_t)((seed >> 16) & 0x7FFF);
+        nodes[i].index = (int16_t)i;
+        nodes[i].next = head;
+        head = &nodes[i];
+    }
+    return head;
+}
+
+static node *list_reverse(node *list) {
+    node *prev = NULL;
+    while (list) {
+        node *next = list->next;
+        list->next = prev;
+        prev = list;
+        list = next;
+    }
+    return prev;
+}
+
+static node *list_find(node *list, int16_t index) {
+    while (list && list->index != index)
+        list = list->next;
+    return list;
+}
+
+// Bottom-up merge sort by data (CoreMark's core_list_mergesort scheme)
+static node *list_sort(node *list) {
+    int insize = 1;
+    for (;;) {
+        node *p = list, *tail = NULL;
+        int merges = 0;
+        list = NULL;
+        while (p) {
+            node *q = p;
+            int psize = 0, qsize = insize;
+            merges++;
+            for (int i = 0; i < insize && q; i++) {
+                psize++;
+                q = q->next;
+            }
+            while (psize > 0 || (qsize > 0 && q)) {
+                node *e;
+                if (psize == 0) {
+                    e = q; q = q->next; qsize--;
+                } else if (qsize == 0 || !q || p->data <= q->data) {
+                    e = p; p = p->next; psize--;
+                } else {
+                    e = q; q = q->next; qsize--;
+                }
+                if (tail)
+                    tail->next = e;
+                else
+                    list = e;
+                tail = e;
+            }
+            p = q;
+        }
+        tail->next = NULL;
+        if (merges <= 1)
+            return list;
+        insize *= 2;
+    }
+}
+
+static uint32_t list_bench(uint32_t crc, uint32_t seed) {
+    node *list = list_init(seed);
+    list = list_reverse(list);
+    for (int16_t i = 0; i < LIST_NODES; i += 5) {
+        node *n = list_find(list, i);
+        crc = bench_crc16(crc, n ? (uint8_t)n->data : 0xFF);
+    }
+    list = list_sort(list);
+    for (node *n = list; n; n = n->next)
+        crc = bench_crc16(crc, (uint8_t)(n->data >> 4));
+    return crc;
+}
+
+// ---------------------------------------------------------------------
+// Matrix
+// ---------------------------------------------------------------------
+
+static int16_t mat_a[MATRIX_N][MATRIX_N], mat_b[MATRIX_N][MATRIX_N];
+static int32_t mat_c[MATRIX_N][MATRIX_N];
+
+static uint32_t matrix_bench(uint32_t crc, int16_t seed) {
+    for (int i = 0; i < MATRIX_N; i++)
+        for (int j = 0; j < MATRIX_N; j++) {
+            mat_a[i][j] = (int16_t)(seed + i - j);
+            mat_b[i][j] = (int16_t)((seed ^ (i * 3 + j)) & 0xFF);
+        }
+    for (int i = 0; i < MATRIX_N; i++)
+        for (int j = 0; j < MATRIX_N; j++) {
+            int32_t sum = 0;
+            for (int k = 0; k < MATRIX_N; k++)
+                sum += (int32_t)mat_a[i][k] * mat_b[k][j];
+            mat_c[i][j] = sum;
+        }
+    for (int i = 0; i < MATRIX_N; i++)
+        for (int j = 0; j < MATRIX_N; j++)
+            crc = bench_crc16(crc, (uint8_t)(mat_c[i][j] ^ (mat_c[i][j] >> 8)));
+    return crc;
+}
+
+// ---------------------------------------------------------------------
+// State machine: classifies comma-separated tokens
+// ---------------------------------------------------------------------
+
+enum state { S_START, S_INT, S_FLOAT, S_EXPONENT, S_SCIENTIFIC, S_INVALID, NUM_STATES };
+
+static const char *const tokens =
+    "5012,1234,-874,+122,35.54,.1234,-110.700,+0.64,5.500e+3,-.123e-2,"
+    "-87e+832,+0.6e-12,T0.3e-1F,-T.T++Tq,1T3.4e4z,34.0e-T^,7,-0.5,1e5,";
+
+static enum state next_state(enum state s, char c) {
+    int digit = c >= '0' && c <= '9';
+    switch (s) {
+    case S_START:
+        if (digit) return S_INT;
+        if (c == '+' || c == '-') return S_INT;
+        if (c == '.') return S_FLOAT;
+        return S_INVALID;
+    case S_INT:
+        if (digit) return S_INT;
+        if (c == '.') return S_FLOAT;
+        return S_INVALID;
+    case S_FLOAT:
+        if (digit) return S_FLOAT;
+        if (c == 'e' || c == 'E') return S_EXPONENT;
+        return S_INVALID;
+    case S_EXPONENT:
+        if (c == '+' || c == '-' || digit) return S_SCIENTIFIC;
+        return S_INVALID;
+    case S_SCIENTIFIC:
+        if (digit) return S_SCIENTIFIC;
+        return S_INVALID;
+    default:
+        return S_INVALID;
+    }
+}
+
+static uint32_t state_bench(uint32_t crc) {
+    uint32_t counts[NUM_STATES] = {0};
+    enum state s = S_START;
+    for (const char *p = tokens; *p; p++) {
+        if (*p == ',') {
+            counts[s]++;
+            s = S_START;
+        } else {
+            s = next_state(s, *p);
+        }
+    }
+    for (int i = 0; i < NUM_STATES; i++)
+        crc = bench_crc16(crc, (uint8_t)counts[i]);
+    return crc;
+}
+
+int main(void) {
+    const int iterations = BENCH_OPAQUE(ITERATIONS);
+    uint32_t crc = 0;
+
+    bench_start();
+    for (int i = 0; i < iterations; i++) {
+        crc = list_bench(crc, 0x3415u + i);
+        crc = matrix_bench(crc, (int16_t)(i + 1));
+        crc = state_bench(crc);
+    }
+    bench_stop(iterations, crc);
+    return 0;
+}
@@ -0,0 +1,192 @@
+// Dhrystone-style integer kernel: record copies through pointers, string
+// copy/compare, enum switches and small procedure calls, in the proportions
+// of the classic benchmark (not the reference source; results are not DMIPS).
+#include "bench.h"
+
+#ifndef ITERATIONS
+#define ITERATIONS 400
+#endif
+
+typedef enum { IDENT_1, IDENT_2, IDENT_3, IDENT_4, IDENT_5 } enumeration;
+
+typedef struct record {
+    struct record *ptr_comp;
+    enumeration discr;
+    enumeration enum_comp;
+    int int_comp;
+    char str_comp[31];
+} record;
+
+static record rec_glob, next_rec_glob;
+static int int_glob;
+static int bool_glob;
+static char ch_1_glob, ch_2_glob;
+static int arr_1_glob[50];
+static int arr_2_glob[50][50];
+
+static void str_copy(char *dst, const char *src) {
+    while ((*dst++ = *src++))
+        ;
+}
+
+static int str_compare(const char *a, const char *b) {
+    while (*a && *a == *b) {
+        a++;
+        b++;
+    }
+    return (unsigned char)*a - (unsigned char)*b;
+}
+
+static int func_3(enumeration enum_par) {
+    return enum_par == IDENT_3;
+}
+
+static enumeration func_1(char ch_1, char ch_2) {
+    if (ch_1 != ch_2)
+        return IDENT_1;
+    ch_1_glob = ch_1;
+    return IDENT_2;
+}
+
+static int func_2(const char *str_1, const char *str_2) {
+    int int_loc = 2;
+    char ch_loc = 'A';
+    while (int_loc <= 2) {
+        if (func_1(str_1[int_loc], str_2[int_loc + 1]) == IDENT_1) {
+            ch_loc = 'A';
+            int_loc += 1;
+        }
+    }
+    if (ch_loc >= 'W' && ch_loc < 'Z')
+        int_loc = 7;
+    if (ch_loc == 'R')
+        return 1;
+    if (str_compare(str_1, str_2) > 0) {
+        int_glob = int_loc + 7;
+        return 1;
+    }
+    return 0;
+}
+
+static void proc_7(int a, int b, int *out) {
+    *out = b + a + 2;
+}
+
+static void proc_6(enumeration enum_val, enumeration *enum_ref) {
+    *enum_ref = enum_val;
+    if (!func_3(enum_val))
+        *enum_ref = IDENT_4;
+    switch (enum_val) {
+    case IDENT_1: *enum_ref = IDENT_1; break;
+    case IDENT_2: *enum_ref = int_glob > 100 ? IDENT_1 : IDENT_4; break;
+    case IDENT_3: *enum_ref = IDENT_2; break;
+    case IDENT_4: break;
+    case IDENT_5: *enum_ref = IDENT_3; break;
+    }
+}
+
+static void proc_8(int *arr_1, int (*arr_2)[50], int int_1, int int_2) {
+    int int_loc = int_1 + 5;
+    arr_1[int_loc] = int_2;
+    arr_1[int_loc + 1] = arr_1[int_loc];
+    arr_1[int_loc + 30] = int_loc;
+    for (int i = int_loc; i <= int_loc + 1; i++)
+        arr_2[int_loc][i] = int_loc;
+    arr_2[int_loc][int_loc - 1] += 1;
+    arr_2[int_loc + 20][int_loc] = arr_1[int_loc];
+    int_glob = 5;
+}
+
+static void proc_3(record **ptr_ref) {
+    if (rec_glob.ptr_comp)
+        *ptr_ref = rec_glob.ptr_comp;
+    proc_7(10, int_glob, &rec_glob.int_comp);
+}
+
+static void proc_1(record *ptr_val) {
+    record *next = ptr_val->ptr_comp;
+    *ptr_val->ptr_comp = rec_glob;
+    ptr_val->int_comp = 5;
+    next->int_comp = ptr_val->int_comp;
+    next->ptr_comp = ptr_val->ptr_comp;
+    proc_3(&next->ptr_comp);
+    if (next->discr == IDENT_1) {
+        next->int_comp = 6;
+        proc_6(ptr_val->enum_comp, &next->enum_comp);
+        next->ptr_comp = rec_glob.ptr_comp;
+        proc_7(next->int_comp, 10, &next->int_comp);
+    } else {
+        *ptr_val = *ptr_val->ptr_comp;
+    }
+}
+
+static void proc_2(int *int_ref) {
+    int int_loc = *int_ref + 10;
+    for (;;) {
+        if (ch_1_glob == 'A') {
+            int_loc -= 1;
+            *int_ref = int_loc - int_glob;
+            break;
+        }
+    }
+}
+
+static void proc_4(void) {
+    bool_glob = (ch_1_glob == 'A') | bool_glob;
+    ch_2_glob = 'B';
+}
+
+static void proc_5(void) {
+    ch_1_glob = 'A';
+    bool_glob = 0;
+}
+
+int main(void) {
+    static char str_1_loc[31], str_2_loc[31];
+    int int_1_loc, int_2_loc, int_3_loc = 0;
+    enumeration enum_loc = IDENT_2;
+    uint32_t crc = 0xFFFF;
+    const int iterations = BENCH_OPAQUE(ITERATIONS);
+
+    rec_glob.ptr_comp = &next_rec_glob;
+    rec_glob.discr = IDENT_1;
+    rec_glob.enum_comp = IDENT_3;
+    rec_glob.int_comp = 40;
+    str_copy(rec_glob.str_comp, "DHRYSTONE PROGRAM, SOME STRING");
+    str_copy(str_1_loc, "DHRYSTONE PROGRAM, 1'ST STRING");
+    arr_2_glob[8][7] = 10;
+
+    bench_start();
+    for (int run = 1; run <= iterations; run++) {
+        proc_5();
+        proc_4();
+        int_1_loc = 2;
+        int_2_loc = 3;
+        str_copy(str_2_loc, "DHRYSTONE PROGRAM, 2'ND STRING");
+        enum_loc = IDENT_2;
+        bool_glob = !func_2(str_1_loc, str_2_loc);
+        while (int_1_loc < int_2_loc) {
+            int_3_loc = 5 * int_1_loc - int_2_loc;
+            proc_7(int_1_loc, int_2_loc, &int_3_loc);
+            int_1_loc += 1;
+        }
+        proc_8(arr_1_glob, arr_2_glob, int_1_loc, int_3_loc);
+        proc_1(&rec_glob);
+        for (char ch_index = 'A'; ch_index <= ch_2_glob; ++ch_index) {
+            if (enum_loc == func_1(ch_index, 'C')) {
+                proc_6(IDENT_1, &enum_loc);
+                str_copy(str_2_loc, "DHRYSTONE PROGRAM, 3'RD STRING");
+                int_2_loc = run;
+                int_glob = run;
+            }
+        }
+        int_2_loc = int_2_loc * int_1_loc;
+        int_1_loc = int_2_loc / int_3_loc;
+        int_2_loc = 7 * (int_2_loc - int_3_loc) - int_1_loc;
+        proc_2(&int_1_loc);
+        crc = bench_crc16_word(crc, (uint32_t)(int_1_loc + int_2_loc + int_3_loc + enum_loc));
+    }
+    crc = bench_crc16_word(crc, (uint32_t)(int_glob + bool_glob + arr_2_glob[8][7]));
+    bench_stop(iterations, crc);
+    return 0;
+}
@@ -0,0 +1,45 @@
+// memcpy kernel: word-wise (4x unrolled) copies of aligned buffers and
+// byte-wise copies at an odd offset, as a libc memcpy would mix them.
+#include "bench.h"
+
+#ifndef ITERATIONS
+#define ITERATIONS 16
+#endif
+
+#define BUF_BYTES 2048
+
+static uint32_t src[BUF_BYTES / 4], dst[BUF_BYTES / 4];
+
+static void copy_words(uint32_t *d, const uint32_t *s, size_t words) {
+    while (words >= 4) {
+        uint32_t a = s[0], b = s[1], c = s[2], e = s[3];
+        d[0] = a; d[1] = b; d[2] = c; d[3] = e;
+        d += 4; s += 4; words -= 4;
+    }
+    while (words--)
+        *d++ = *s++;
+}
+
+static void copy_bytes(uint8_t *d, const uint8_t *s, size_t n) {
+    while (n--)
+        *d++ = *s++;
+}
+
+int main(void) {
+    const int iterations = BENCH_OPAQUE(ITERATIONS);
+    uint32_t crc = 0xFFFF;
+
+    for (int i = 0; i < BUF_BYTES / 4; i++)
+        src[i] = 0x9E3779B9u * (uint32_t)(i + 1);
+
+    bench_start();
+    for (int i = 0; i < iterations; i++) {
+        copy_words(dst, src, BUF_BYTES / 4);
+        copy_bytes((uint8_t *)dst + 1, (const uint8_t *)src + 2, BUF_BYTES / 2 - 3);
+        src[i] ^= dst[BUF_BYTES / 4 - 1 - i];
+    }
+    for (int i = 0; i < BUF_BYTES / 4; i += 7)
+        crc = bench_crc16_word(crc, dst[i]);
+    bench_stop(iterations, crc);
+    return 0;
+}
@@ -0,0 +1,41 @@
+// memset kernel: word-wise (4x unrolled) fills of an aligned buffer and
+// byte-wise fills of an unaligned head and tail.
+#include "bench.h"
+
+#ifndef ITERATIONS
+#define ITERATIONS 24
+#endif
+
+#define BUF_BYTES 2048
+
+static uint32_t buf[BUF_BYTES / 4];
+
+static void fill_words(uint32_t *d, uint32_t value, size_t words) {
+    while (words >= 4) {
+        d[0] = value; d[1] = value; d[2] = value; d[3] = value;
+        d += 4; words -= 4;
+    }
+    while (words--)
+        *d++ = value;
+}
+
+static void fill_bytes(uint8_t *d, uint8_t value, size_t n) {
+    while (n--)
+        *d++ = value;
+}
+
+int main(void) {
+    const int iterations = BENCH_OPAQUE(ITERATIONS);
+    uint32_t crc = 0xFFFF;
+
+    bench_start();
+    for (int i = 0; i < iterations; i++) {
+        uint8_t v = (uint8_t)(0x5A + i);
+        fill_words(buf, v * 0x01010101u, BUF_BYTES / 4);
+        fill_bytes((uint8_t *)buf + 3, (uint8_t)~v, 509);
+        fill_bytes((uint8_t *)buf + BUF_BYTES - 257, (uint8_t)(v >> 1), 257);
+        crc = bench_crc16_word(crc, buf[i * 5] ^ buf[BUF_BYTES / 4 - 1]);
+    }
+    bench_stop(iterations, crc);
+    return 0;
+}
@@ -0,0 +1,46 @@
+// FreeRTOS context-switch loop: two equal-priority tasks hand the CPU to
+// each other with taskYIELD() (ECALL into the port's trap handler).
+// Measures the cost of one yield including the scheduler.
+#include "bench.h"
+#include "FreeRTOS.h"
+#include "task.h"
+
+#ifndef ITERATIONS
+#define ITERATIONS 200
+#endif
+
+static volatile uint32_t switches;
+static volatile uint32_t ping_count, pong_count;
+
+void vApplicationSetupTimerInterrupt(void) {
+}
+
+static void ping(void *arg) {
+    (void)arg;
+    bench_start();
+    for (;;) {
+        ping_count++;
+        switches++;
+        if (switches >= 2 * ITERATIONS) {
+            bench_stop(switches, bench_crc16_word(bench_crc16_word(0, ping_count), pong_count));
+            bench_exit(0);
+        }
+        taskYIELD();
+    }
+}
+
+static void pong(void *arg) {
+    (void)arg;
+    for (;;) {
+        pong_count++;
+        switches++;
+        taskYIELD();
+    }
+}
+
+int main(void) {
+    xTaskCreate(ping, "ping", configMINIMAL_STACK_SIZE, NULL, 2, NULL);
+    xTaskCreate(pong, "pong", configMINIMAL_STACK_SIZE, NULL, 2, NULL);
+    vTaskStartScheduler();
+    bench_exit(1);
+}
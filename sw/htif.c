@@ -0,0 +1,93 @@
+// Console output over the HTIF channel (see htif.h). htif_printf formats
+// into a buffer and hands it to the host with one SYS_write per line or
+// full buffer, instead of one request per character.
+#include "htif.h"
+
+typedef __builtin_va_list va_list;
+#define va_start(v, l) __builtin_va_start(v, l)
+#define va_end(v)      __builtin_va_end(v)
+#define va_arg(v, l)   __builtin_va_arg(v, l)
+
+#define HTIF_BUF_SIZE 128
+
+struct htif_buf {
+    char data[HTIF_BUF_SIZE];
+    size_t len;
+};
+
+static void buf_flush(struct htif_buf *b) {
+    if (b->len)
+        htif_write(1, b->data, b->len);
+    b->len = 0;
+}
+
+static void buf_putc(struct htif_buf *b, char c) {
+    b->data[b->len++] = c;
+    if (c == '\n' || b->len == HTIF_BUF_SIZE)
+        buf_flush(b);
+}
+
+static void buf_number(struct htif_buf *b, uint32_t value, unsigned base, int negative) {
+    char digits[11];
+    int n = 0;
+    if (negative)
+        buf_putc(b, '-');
+    do {
+        uint32_t d = value % base;
+        digits[n++] = (char)(d < 10 ? '0' + d : 'a' + d - 10);
+        value /= base;
+    } while (value);
+    while (n)
+        buf_putc(b, digits[--n]);
+}
+
+void htif_puts(const char *s) {
+    size_t len = 0;
+    while (s[len])
+        len++;
+    htif_write(1, s, len);
+}
+
+// Supports %d %u %x %s %c and %%
+void htif_printf(const char *format, ...) {
+    struct htif_buf b;
+    va_list args;
+    b.len = 0;
+    va_start(args, format);
+    for (; *format; format++) {
+        if (*format != '%') {
+            buf_putc(&b, *format);
+            continue;
+        }
+        switch (*++format) {
+        case 'd': {
+            int v = va_arg(args, int);
+            buf_number(&b, v < 0 ? -(uint32_t)v : (uint32_t)v, 10, v < 0);
+            break;
+        }
+        case 'u':
+            buf_number(&b, va_arg(args, uint32_t), 10, 0);
+            break;
+        case 'x':
+            buf_number(&b, va_arg(args, uint32_t), 16, 0);
+            break;
+        case 's': {
+            const char *s = va_arg(args, const char *);
+            while (*s)
+                buf_putc(&b, *s++);
+            break;
+        }
+        case 'c':
+            buf_putc(&b, (char)va_arg(args, int));
+            break;
+        case '%':
+            buf_putc(&b, '%');
+            break;
+        case '\0':
+            format--;
+            break;
+        }
+    }
+    va_end(args);
+    buf_flush(&b);
+}
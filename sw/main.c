@@ -15,6 +15,14 @@ typedef __builtin_va_list va_list;
 
 SemaphoreHandle_t xUartMutex = NULL;
 
+#ifdef HTIF_CONSOLE
+// 仿真专用（make HTIF=1）：通过 HTIF 主机接口输出，无需等待 UART
+#include "htif.h"
+
+void uart_putc(char c) {
+    htif_putchar(c);
+}
+#else
 void uart_putc(char c) {
     *UART_TX = c;
     for (volatile int i = 0; i < 5000; i++) {
@@ -23,6 +31,7 @@ void uart_putc(char c) {
         // multi-cycle FSM makes this even safer. We use 5000 to be very safe.
     }
 }
+#endif
 
 void uart_puts(const char *s) {
     if (xUartMutex != NULL) {
@@ -0,0 +1,45 @@
+#ifndef PERF_COUNTERS_H
+#define PERF_COUNTERS_H
+
+#include <stdint.h>
+
+// csr_file.v performance counters:
+//   mcycle        clock cycles
+//   minstret      retired instructions
+//   mhpmcounter3  load cycles spent in S_MEM_WB
+//   mhpmcounter4  taken branches and jumps
+//   mhpmcounter5  traps taken
+//   mhpmcounter6  debug stall cycles
+
+#define read_csr(csr) ({ uint32_t __v; __asm__ volatile ("csrr %0, " #csr : "=r"(__v)); __v; })
+#define write_csr(csr, val) __asm__ volatile ("csrw " #csr ", %0" :: "r"((uint32_t)(val)))
+
+// Reads a 64-bit counter; retries if the low half wrapped between the reads
+#define READ_COUNTER64(lo, hi) ({                                   \
+    uint32_t __hi, __lo;                                            \
+    do {                                                            \
+        __hi = read_csr(hi);                                        \
+        __lo = read_csr(lo);                                        \
+    } while (__hi != read_csr(hi));                                 \
+    ((uint64_t)__hi << 32) | __lo; })
+
+static inline uint64_t perf_cycles(void)   { return READ_COUNTER64(mcycle, mcycleh); }
+static inline uint64_t perf_instret(void)  { return READ_COUNTER64(minstret, minstreth); }
+static inline uint64_t perf_load_cycles(void) { return READ_COUNTER64(mhpmcounter3, mhpmcounter3h); }
+static inline uint64_t perf_taken(void)    { return READ_COUNTER64(mhpmcounter4, mhpmcounter4h); }
+static inline uint64_t perf_traps(void)    { return READ_COUNTER64(mhpmcounter5, mhpmcounter5h); }
+static inline uint64_t perf_stalls(void)   { return READ_COUNTER64(mhpmcounter6, mhpmcounter6h); }
+
+// Prints every counter as "PERF <name> <hi> <lo>" for scripts/perf_report.py.
+// `print` is any printf-like function supporting %s and %x (e.g. main.c's).
+#define PERF_REPORT(print) do {                                                  \
+    const char *__names[] = { "mcycle", "minstret", "mhpmcounter3",             \
+                              "mhpmcounter4", "mhpmcounter5", "mhpmcounter6" }; \
+    uint64_t __values[] = { perf_cycles(), perf_instret(), perf_load_cycles(),  \
+                            perf_taken(), perf_traps(), perf_stalls() };        \
+    for (int __i = 0; __i < 6; __i++)                                           \
+        print("PERF %s %x %x\n", __names[__i],                                  \
+              (uint32_t)(__values[__i] >> 32), (uint32_t)__values[__i]);        \
+} while (0)
+
+#endif // PERF_COUNTERS_H
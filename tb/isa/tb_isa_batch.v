@@ -0,0 +1,153 @@
+`timescale 1ns / 1ps
+`define MAX_CYCLES 100000
+`ifndef PIPELINE
+`define PIPELINE 0          // riscv_core execution mode, set by the Makefile
+`endif
+
+// Batch ISA testbench: runs every test listed in +MANIFEST=<path> inside one
+// simulator process. Each manifest line is
+//     <name> <program.mem> [<data prefix>]
+// where the optional data prefix names the <prefix>.b0..b3.mem lane files
+// written by scripts/elf_loader.py. Between tests the core is held in reset
+// while the next test's images are loaded. Only the populated addresses are
+// written, so memory outside a program's segments still holds what the
+// previous test left there: like uninitialised RAM, programs must not rely
+// on it (startup code zeroes .bss). One line is printed per test:
+//     RESULT <name> PASS <cycles>
+//     RESULT <name> FAIL <cycles> <reason>
+module tb_isa_batch;
+
+    reg clk;
+    reg rst;
+    wire timer_interrupt;
+    wire [7:0] gpio_pins;
+    wire host_write_enable;
+    wire [31:0] host_data_out;
+
+    riscv_core #(.PIPELINE(`PIPELINE)) uut (
+        .clk(clk),
+        .rst(rst),
+        .timer_interrupt(timer_interrupt),
+        .ext_interrupt(1'b0),
+        .gpio_pins(gpio_pins),
+        .host_write_enable(host_write_enable),
+        .host_data_out(host_data_out),
+        .debug_stall(1'b0),
+        .debug_reg_addr(5'b0),
+        .debug_reg_read(1'b0),
+        .debug_reg_write(1'b0),
+        .debug_reg_wdata(32'b0),
+        .debug_mem_read(1'b0),
+        .debug_mem_addr(32'b0),
+        .debug_mem_write(1'b0),
+        .debug_mem_wdata(32'b0),
+        .debug_mem_wstrb(4'b0)
+    );
+
+    initial begin
+        clk = 0;
+        forever #5 clk = ~clk;
+    end
+
+    reg [4095:0] manifest;
+    reg [8191:0] line;
+    reg [4095:0] name;
+    reg [4095:0] testfile;
+    reg [4095:0] datafile;
+    reg [4095:0] lanefile;
+    integer fd, fields;
+    integer cycles, stall_count, tests_run;
+    reg [31:0] prev_pc;
+    reg finished;
+
+    // Loads one test into the (reset) core's memories
+    task load_test;
+        begin
+            $readmemh(testfile, uut.instr_mem.mem);
+            if (fields >= 3) begin
+                $sformat(lanefile, "%0s.b0.mem", datafile); $readmemh(lanefile, uut.data_mem.mem_b0);
+                $sformat(lanefile, "%0s.b1.mem", datafile); $readmemh(lanefile, uut.data_mem.mem_b1);
+                $sformat(lanefile, "%0s.b2.mem", datafile); $readmemh(lanefile, uut.data_mem.mem_b2);
+                $sformat(lanefile, "%0s.b3.mem", datafile); $readmemh(lanefile, uut.data_mem.mem_b3);
+            end
+        end
+    endtask
+
+    // Runs the loaded test until tohost, the end-of-test self loop or timeout.
+    // Sampled on the falling edge, half a cycle after the core updates.
+    task run_test;
+        begin
+            finished = 0;
+            cycles = 0;
+            stall_count = 0;
+            prev_pc = 32'h80000000;
+            @(negedge clk) rst = 0;
+            while (!finished) begin
+                @(negedge clk);
+                cycles = cycles + 1;
+                if (host_write_enable) begin
+                    if (host_data_out == 32'd1)           // HTIF exit(0)
+                        $display("RESULT %0s PASS %0d", name, cycles);
+                    else
+                        $display("RESULT %0s FAIL %0d tohost=0x%08h (test case %0d)",
+                            name, cycles, host_data_out, host_data_out >> 1);
+                    finished = 1;
+                end else if (uut.muldiv_wait) begin   // a division holds arch_pc
+                    stall_count = 0;
+                end else if (uut.arch_pc == prev_pc) begin
+                    stall_count = stall_count + 1;
+                    if (stall_count >= 5) begin
+                        if (uut.reg_file.registers[26] == 32'd1 &&
+                            uut.reg_file.registers[27] == 32'd1)
+                            $display("RESULT %0s PASS %0d", name, cycles);
+                        else
+                            $display("RESULT %0s FAIL %0d PC stalled at 0x%08h, x26=%0d, x27=%0d",
+                                name, cycles, uut.arch_pc,
+                                uut.reg_file.registers[26], uut.reg_file.registers[27]);
+                        finished = 1;
+                    end
+                end else begin
+                    stall_count = 0;
+                    prev_pc = uut.arch_pc;
+                end
+                if (!finished && cycles >= `MAX_CYCLES) begin
+                    $display("RESULT %0s FAIL %0d Timeout after %0d cycles", name, cycles, `MAX_CYCLES);
+                    finished = 1;
+                end
+            end
+            rst = 1;
+        end
+    endtask
+
+    initial begin
+        rst = 1;
+        tests_run = 0;
+        // Let the memories' own initial blocks run first
+        #1;
+
+        if (!$value$plusargs("MANIFEST=%s", manifest)) begin
+            $display("FAIL: No +MANIFEST=<path> specified");
+            $finish;
+        end
+        fd = $fopen(manifest, "r");
+        if (fd == 0) begin
+            $display("FAIL: Cannot open manifest %0s", manifest);
+            $finish;
+        end
+
+        while ($fgets(line, fd)) begin
+            fields = $sscanf(line, "%s %s %s", name, testfile, datafile);
+            if (fields >= 2) begin
+                @(posedge clk);
+                load_test;
+                run_test;
+                tests_run = tests_run + 1;
+            end
+        end
+        $fclose(fd);
+
+        $display("BATCH DONE %0d", tests_run);
+        $finish;
+    end
+
+endmodule
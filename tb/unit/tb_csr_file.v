@@ -0,0 +1,151 @@
+`timescale 1ns / 1ps
+
+module tb_csr_file;
+
+    // --- Inputs ---
+    reg clk;
+    reg rst;
+    reg [11:0] csr_addr;
+    reg [31:0] csr_wdata;
+    reg csr_we;
+    reg trap_trigger;
+    reg mret_trigger;
+    reg instret_event;
+    reg [3:0] hpm_event;
+
+    // --- Outputs ---
+    wire [31:0] csr_rdata;
+    wire [31:0] mtvec_out, mepc_out;
+    wire mstatus_mie, mie_mtie, mie_meie, mip_mtip, mip_meip;
+
+    // --- Instantiate DUT ---
+    csr_file uut (
+        .clk(clk),
+        .rst(rst),
+        .csr_addr(csr_addr),
+        .csr_wdata(csr_wdata),
+        .csr_we(csr_we),
+        .csr_rdata(csr_rdata),
+        .timer_irq(1'b0),
+        .ext_irq(1'b0),
+        .trap_trigger(trap_trigger),
+        .trap_pc(32'h80000100),
+        .trap_cause(32'd11),
+        .mret_trigger(mret_trigger),
+        .instret_event(instret_event),
+        .hpm_event(hpm_event),
+        .mtvec_out(mtvec_out),
+        .mepc_out(mepc_out),
+        .mstatus_mie(mstatus_mie),
+        .mie_mtie(mie_mtie),
+        .mie_meie(mie_meie),
+        .mip_mtip(mip_mtip),
+        .mip_meip(mip_meip)
+    );
+
+    // --- CSR Addresses ---
+    localparam CSR_MCOUNTINHIBIT = 12'h320;
+    localparam CSR_MCYCLE    = 12'hB00;
+    localparam CSR_MINSTRET  = 12'hB02;
+    localparam CSR_MHPM3     = 12'hB03;
+    localparam CSR_MHPM6     = 12'hB06;
+    localparam CSR_MCYCLEH   = 12'hB80;
+    localparam CSR_CYCLE     = 12'hC00;
+    localparam CSR_INSTRET   = 12'hC02;
+
+    // --- Clock Generation ---
+    always #5 clk = ~clk;
+
+    task write_csr(input [11:0] addr, input [31:0] data);
+        begin
+            csr_addr = addr;
+            csr_wdata = data;
+            csr_we = 1;
+            @(posedge clk); #1;
+            csr_we = 0;
+        end
+    endtask
+
+    task expect_csr(input [11:0] addr, input [31:0] expected, input [8*24-1:0] name);
+        begin
+            csr_addr = addr;
+            #1;
+            if (csr_rdata == expected)
+                $display("PASS: %0s = %0d", name, csr_rdata);
+            else
+                $display("FAIL: %0s expected %0d, got %0d", name, expected, csr_rdata);
+        end
+    endtask
+
+    reg [31:0] before;
+
+    initial begin
+        clk = 0;
+        rst = 1;
+        csr_addr = 0;
+        csr_wdata = 0;
+        csr_we = 0;
+        trap_trigger = 0;
+        mret_trigger = 0;
+        instret_event = 0;
+        hpm_event = 4'b0;
+        $display("--- Starting CSR File Testbench ---");
+
+        #12;
+        rst = 0;
+
+        // --- Test 1: mcycle counts every cycle, cycle shadows it ---
+        csr_addr = CSR_MCYCLE;
+        #1 before = csr_rdata;
+        repeat (10) @(posedge clk);
+        #1;
+        if (csr_rdata == before + 10)
+            $display("PASS: mcycle advanced by 10 cycles");
+        else
+            $display("FAIL: mcycle advanced by %0d, expected 10", csr_rdata - before);
+        csr_addr = CSR_CYCLE;
+        #1;
+        if (csr_rdata == before + 10)
+            $display("PASS: cycle shadows mcycle");
+        else
+            $display("FAIL: cycle = %0d, mcycle = %0d", csr_rdata, before + 10);
+
+        // --- Test 2: minstret and mhpmcounters only count their events ---
+        instret_event = 1;
+        hpm_event = 4'b1001;
+        repeat (3) @(posedge clk);
+        #1;
+        instret_event = 0;
+        hpm_event = 4'b0;
+        repeat (2) @(posedge clk);
+        expect_csr(CSR_MINSTRET, 32'd3, "minstret");
+        expect_csr(CSR_INSTRET, 32'd3, "instret");
+        expect_csr(CSR_MHPM3, 32'd3, "mhpmcounter3");
+        expect_csr(CSR_MHPM3 + 12'd1, 32'd0, "mhpmcounter4");
+        expect_csr(CSR_MHPM6, 32'd3, "mhpmcounter6");
+
+        // --- Test 3: software writes take precedence over the increment ---
+        write_csr(CSR_MCYCLEH, 32'd7);
+        write_csr(CSR_MCYCLE, 32'hFFFFFFF0);
+        expect_csr(CSR_MCYCLEH, 32'd7, "mcycleh after write");
+        expect_csr(CSR_MCYCLE, 32'hFFFFFFF0, "mcycle after write");
+        repeat (32) @(posedge clk);
+        expect_csr(CSR_MCYCLEH, 32'd8, "mcycleh after carry");
+
+        // --- Test 4: shadows are read-only ---
+        write_csr(CSR_INSTRET, 32'd100);
+        expect_csr(CSR_MINSTRET, 32'd3, "minstret after shadow write");
+
+        // --- Test 5: mcountinhibit freezes mcycle ---
+        write_csr(CSR_MCOUNTINHIBIT, 32'h1);
+        csr_addr = CSR_MCYCLE;
+        #1 before = csr_rdata;
+        repeat (5) @(posedge clk);
+        expect_csr(CSR_MCYCLE, before, "inhibited mcycle");
+        write_csr(CSR_MCOUNTINHIBIT, 32'h0);
+
+        $display("--- CSR File Test Finished ---");
+        $finish;
+    end
+
+endmodule
@@ -0,0 +1,151 @@
+`timescale 1ns / 1ps
+
+module tb_muldiv;
+
+    // --- Inputs ---
+    reg clk;
+    reg rst;
+    reg start;
+    reg ack;
+    reg [2:0] funct3;
+    reg [31:0] operand1;
+    reg [31:0] operand2;
+
+    // --- Outputs ---
+    wire [31:0] result;
+    wire ready;
+
+    integer tests_passed = 0;
+    integer tests_failed = 0;
+    integer cycles;
+
+    // --- Instantiate DUT ---
+    muldiv uut (
+        .clk(clk),
+        .rst(rst),
+        .start(start),
+        .ack(ack),
+        .funct3(funct3),
+        .operand1(operand1),
+        .operand2(operand2),
+        .result(result),
+        .ready(ready)
+    );
+
+    localparam MUL = 3'b000, MULH = 3'b001, MULHSU = 3'b010, MULHU = 3'b011;
+    localparam DIV = 3'b100, DIVU = 3'b101, REM = 3'b110, REMU = 3'b111;
+
+    // --- Clock Generation ---
+    always #5 clk = ~clk;
+
+    // Holds start like the core's S_EXEC until ready, then acknowledges
+    task check;
+        input [2:0]   f3;
+        input [31:0]  op1, op2;
+        input [31:0]  expected;
+        input [255:0] test_name;
+        begin
+            @(negedge clk);
+            funct3 = f3;
+            operand1 = op1;
+            operand2 = op2;
+            start = 1;
+            cycles = 0;
+            #1;
+            while (!ready && cycles < 100) begin
+                @(negedge clk);
+                cycles = cycles + 1;
+            end
+            if (ready && result === expected) begin
+                $display("PASS: %s (%0d cycles)", test_name, cycles);
+                tests_passed = tests_passed + 1;
+            end else begin
+                $display("FAIL: %s", test_name);
+                $display("      Inputs: op1=%h, op2=%h, funct3=%b", op1, op2, f3);
+                $display("      Expected: %h, Got: %h (ready=%b)", expected, result, ready);
+                tests_failed = tests_failed + 1;
+            end
+            ack = 1;
+            @(negedge clk);
+            ack = 0;
+            start = 0;
+        end
+    endtask
+
+    initial begin
+        clk = 0;
+        rst = 1;
+        start = 0;
+        ack = 0;
+        funct3 = 0;
+        operand1 = 0;
+        operand2 = 0;
+        $display("--- Starting MulDiv Testbench ---");
+
+        #20;
+        rst = 0;
+
+        // --- Multiplies: combinational, ready at once ---
+        check(MUL,    32'd7,        32'd6,        32'd42,       "MUL: 7 * 6");
+        check(MUL,    32'hFFFFFFFF, 32'd3,        32'hFFFFFFFD, "MUL: -1 * 3");
+        check(MULH,   32'h80000000, 32'h80000000, 32'h40000000, "MULH: -2^31 * -2^31");
+        check(MULH,   32'hFFFFFFFF, 32'd1,        32'hFFFFFFFF, "MULH: -1 * 1");
+        check(MULHSU, 32'hFFFFFFFF, 32'hFFFFFFFF, 32'hFFFFFFFF, "MULHSU: -1 * (2^32-1)");
+        check(MULHU,  32'hFFFFFFFF, 32'hFFFFFFFF, 32'hFFFFFFFE, "MULHU: (2^32-1)^2");
+
+        // --- Divisions: iterative ---
+        check(DIV,    32'd20,       32'd6,        32'd3,        "DIV: 20 / 6");
+        check(DIV,    32'hFFFFFFEC, 32'd6,        32'hFFFFFFFD, "DIV: -20 / 6");
+        check(REM,    32'hFFFFFFEC, 32'd6,        32'hFFFFFFFE, "REM: -20 % 6");
+        check(DIVU,   32'hFFFFFFEC, 32'd6,        32'h2AAAAAA7, "DIVU: 0xFFFFFFEC / 6");
+        check(REMU,   32'hFFFFFFEC, 32'd6,        32'd2,        "REMU: 0xFFFFFFEC % 6");
+        check(DIV,    32'h80000000, 32'hFFFFFFFF, 32'h80000000, "DIV: overflow -2^31 / -1");
+        check(REM,    32'h80000000, 32'hFFFFFFFF, 32'd0,        "REM: overflow -2^31 % -1");
+        check(DIV,    32'hFFFFFFFB, 32'd0,        32'hFFFFFFFF, "DIV: -5 / 0");
+        check(DIVU,   32'd5,        32'd0,        32'hFFFFFFFF, "DIVU: 5 / 0");
+        check(REM,    32'hFFFFFFFB, 32'd0,        32'hFFFFFFFB, "REM: -5 % 0");
+        check(REMU,   32'd5,        32'd0,        32'd5,        "REMU: 5 % 0");
+
+        // --- Back-to-back divisions without dropping start (pipelined core) ---
+        @(negedge clk);
+        funct3 = DIVU; operand1 = 32'd100; operand2 = 32'd7; start = 1;
+        #1; while (!ready) @(negedge clk);
+        ack = 1;
+        @(negedge clk);
+        ack = 0;
+        operand1 = 32'd99; operand2 = 32'd9;
+        #1;
+        if (!ready) begin
+            while (!ready) @(negedge clk);
+            if (result === 32'd11) begin
+                $display("PASS: DIVU restarts after ack");
+                tests_passed = tests_passed + 1;
+            end else begin
+                $display("FAIL: DIVU restarts after ack, got %h", result);
+                tests_failed = tests_failed + 1;
+            end
+        end else begin
+            $display("FAIL: DIVU restarts after ack, stale result still ready");
+            tests_failed = tests_failed + 1;
+        end
+        ack = 1;
+        @(negedge clk);
+        ack = 0;
+        start = 0;
+
+        // --- Summary ---
+        $display("\n-------------------");
+        $display("TEST SUMMARY");
+        $display("Passed: %0d", tests_passed);
+        $display("Failed: %0d", tests_failed);
+        $display("-------------------");
+
+        if (tests_failed == 0)
+            $display("ALL MULDIV TESTS PASSED SUCCESSFULLY!");
+        else
+            $display("SOME MULDIV TESTS FAILED.");
+
+        $finish;
+    end
+
+endmodule
@@ -0,0 +1,134 @@
+"""Python-side memory model for the cocotb harness.
+
+Each of riscv_core's two 32 KB memories is mirrored by a `Memory`, backed
+by a bytearray or, with `path`, by an mmap'd file that other processes
+(or a later run) can inspect. The model records which byte ranges a
+program populates, so loaders only transfer those words into the RTL
+instead of clearing and rewriting the whole array.
+
+`load_program()` builds both images the way tb_isa_test.v lays them out:
+
+  * ELF: instruction image by LMA and data image by VMA (scripts/elf_loader.py);
+  * .mem ($readmemh words, @address tags allowed): instruction image, with
+    the data lane files <prefix>.b0-3.mem next to it as the data image
+    (the testbench's +DATAFILE);
+  * raw .bin, or a .mem without lane files: a flat objcopy image goes to
+    instruction memory and words 0x400-0x7FF are copied to data memory;
+  * <prefix>.state: the memories of a checkpoint (scripts/checkpoint.py),
+    which are <prefix>.mem and its lane files.
+"""
+import mmap
+
+import elf_loader
+
+MEM_BYTES = elf_loader.MEM_BYTES
+MEM_WORDS = elf_loader.MEM_WORDS
+DATA_SECTION = (0x400, 0x800)     # .data word range of flat objcopy images
+
+
+class Memory:
+    """Byte-addressed image of one riscv_core memory (address[14:0])."""
+
+    def __init__(self, size=MEM_BYTES, path=None):
+        self.size = size
+        self._file = None
+        if path:
+            self._file = open(path, 'w+b')
+            self._file.truncate(size)
+            self.buf = mmap.mmap(self._file.fileno(), size)
+        else:
+            self.buf = bytearray(size)
+        # Word view; the host is little-endian like the core
+        self.words = memoryview(self.buf).cast('I')
+        self._ranges = []
+
+    def close(self):
+        self.words.release()
+        if self._file:
+            self.buf.close()
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, offset, data):
+        """Copies `data` to byte `offset` and marks the range populated."""
+        offset &= self.size - 1
+        if offset + len(data) > self.size:
+            raise ValueError(f'{len(data)} bytes at 0x{offset:x} do not fit the {self.size // 1024} KB memory')
+        self.buf[offset:offset + len(data)] = data
+        self._ranges.append((offset & ~3, (offset + len(data) + 3) & ~3))
+
+    def write_words(self, index, values):
+        n = 0
+        for n, value in enumerate(values, 1):
+            self.words[index + n - 1] = value & 0xFFFFFFFF
+        self._ranges.append((index * 4, (index + n) * 4))
+
+    def read_word(self, offset):
+        return self.words[(offset & (self.size - 1)) >> 2]
+
+    def ranges(self):
+        """Merged, word-aligned (lo, hi) byte ranges written so far."""
+        merged = []
+        for lo, hi in sorted(self._ranges):
+            if merged and lo <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], hi)
+            else:
+                merged.append([lo, hi])
+        self._ranges = [tuple(r) for r in merged]
+        return self._ranges
+
+    def populated(self, skip_zero=False):
+        """Yields (word index, value) for every populated word.
+
+        With `skip_zero`, zero words are left out: data_memory clears itself
+        at time zero, so they need not be transferred.
+        """
+        words = self.words
+        for lo, hi in self.ranges():
+            for i in range(lo >> 2, hi >> 2):
+                value = words[i]
+                if value or not skip_zero:
+                    yield i, value
+
+    def nonzero(self):
+        """Indices of all non-zero words (for end-of-test comparisons)."""
+        words = self.words
+        return [i for i in range(len(words)) if words[i]]
+
+
+def load_program(path, imem, dmem):
+    """Fills `imem`/`dmem` from an ELF, .mem, .bin or .state; returns the ElfFile or None."""
+    if path.endswith('.state'):
+        return load_program(path[:-len('.state')] + '.mem', imem, dmem)
+    if path.endswith('.mem') or path.endswith('.bin'):
+        if path.endswith('.mem'):
+            for addr, value in elf_loader.read_mem(path):
+                imem.write_words(addr, (value,))
+            prefix = elf_loader.data_prefix(path)
+        else:
+            with open(path, 'rb') as f:
+                imem.write(0, f.read()[:MEM_BYTES])
+            prefix = None
+        if prefix:
+            buf, ranges = elf_loader.read_data_lanes(prefix)
+            for lo, hi in ranges:
+                dmem.write(lo, buf[lo:hi])
+        else:
+            lo, hi = DATA_SECTION
+            dmem.write(lo * 4, imem.buf[lo * 4:hi * 4])
+        return None
+
+    elf = elf_loader.ElfFile.load(path)
+    buf, ranges = elf_loader.instruction_image(elf)
+    for lo, hi in ranges:
+        imem.write(lo, buf[lo:hi])
+    buf, ranges = elf_loader.data_image(elf)
+    for lo, hi in ranges:
+        dmem.write(lo, buf[lo:hi])
+    return elf
@@ -0,0 +1,606 @@
+"""cocotb environment for riscv_core: loader, tohost monitor and scoreboard.
+
+Python only runs where it has to. Programs are transferred once, during
+reset, from the memory model (memory_model.py) into the RTL memories; the
+tohost monitor wakes up on host_write_enable edges only; the scoreboard
+samples the architectural state every `batch` clock cycles and catches the
+reference model (scripts/iss.py) up to the same number of retired
+instructions before comparing. Nothing awaits individual clock edges
+while the program runs.
+
+DebugTarget and GdbBridge put scripts/gdb_server.py on the debug ports.
+"""
+import queue
+import threading
+
+import cocotb
+from cocotb.clock import Clock
+from cocotb.triggers import ClockCycles, Event, FallingEdge, First, ReadOnly, RisingEdge, Timer
+
+import checkpoint
+import gdb_server
+import htif
+import iss as iss_model
+from memory_model import Memory, load_program
+
+INSN_SELF_LOOP = 0x0000006F        # jal x0, 0: end of the flat .mem tests
+INSN_ECALL = 0x00000073
+INSN_EBREAK = 0x00100073
+
+
+class ScoreboardError(AssertionError):
+    pass
+
+
+class ProgramLoader:
+    """Transfers the memory model into instruction_memory and data_memory.
+
+    Instruction memory has no write port, so it is always written through
+    direct handles to instr_mem.mem. Data memory is written through the
+    debug_mem_* port, one word per clock while the core is held in reset
+    (mode 'debug'), or through direct handles to the byte lanes ('direct').
+    Only populated, non-zero data words are transferred.
+    """
+
+    def __init__(self, dut, mode='debug'):
+        if mode not in ('debug', 'direct'):
+            raise ValueError(f"unknown load mode '{mode}' (debug or direct)")
+        self.dut = dut
+        self.mode = mode
+
+    def load_imem(self, imem):
+        mem = self.dut.instr_mem.mem
+        n = 0
+        for i, value in imem.populated():
+            mem[i].setimmediatevalue(value)
+            n += 1
+        return n
+
+    def load_dmem_direct(self, dmem):
+        data_mem = self.dut.data_mem
+        lanes = (data_mem.mem_b0, data_mem.mem_b1, data_mem.mem_b2, data_mem.mem_b3)
+        n = 0
+        for i, value in dmem.populated(skip_zero=True):
+            for lane, handle in enumerate(lanes):
+                handle[i].setimmediatevalue((value >> (8 * lane)) & 0xFF)
+            n += 1
+        return n
+
+    async def write_words(self, items):
+        """Bulk write of (word index, value) pairs, one per clock, via debug_mem_*."""
+        dut = self.dut
+        n = 0
+        dut.debug_mem_wstrb.value = 0xF
+        for i, value in items:
+            await FallingEdge(dut.clk)
+            dut.debug_mem_addr.value = i << 2
+            dut.debug_mem_wdata.value = value
+            dut.debug_mem_write.value = 1
+            n += 1
+        await FallingEdge(dut.clk)
+        dut.debug_mem_write.value = 0
+        dut.debug_mem_wstrb.value = 0
+        return n
+
+    async def read_words(self, indices):
+        """Bulk read via debug_mem_*; returns the values in order.
+
+        Pipelined on the synchronous read port: the address for word k + 1
+        goes out on the falling edge that samples word k, so n words take
+        n + 1 clocks.
+        """
+        dut = self.dut
+        values = []
+        pending = False
+        dut.debug_mem_read.value = 1
+        for i in indices:
+            await FallingEdge(dut.clk)
+            if pending:
+                values.append(int(dut.debug_mem_rdata.value))
+            dut.debug_mem_addr.value = i << 2
+            pending = True
+        await FallingEdge(dut.clk)
+        if pending:
+            values.append(int(dut.debug_mem_rdata.value))
+        dut.debug_mem_read.value = 0
+        return values
+
+    async def load(self, imem, dmem):
+        """Loads both memories; returns (imem words, dmem words) transferred."""
+        imem_words = self.load_imem(imem)
+        if self.mode == 'direct':
+            return imem_words, self.load_dmem_direct(dmem)
+        return imem_words, await self.write_words(dmem.populated(skip_zero=True))
+
+    async def write_registers(self, values):
+        """Writes x1..x31 from `values` through debug_reg_*, one per clock."""
+        dut = self.dut
+        for i in range(1, 32):
+            await FallingEdge(dut.clk)
+            dut.debug_reg_addr.value = i
+            dut.debug_reg_wdata.value = values[i]
+            dut.debug_reg_write.value = 1
+        await FallingEdge(dut.clk)
+        dut.debug_reg_write.value = 0
+        dut.debug_reg_addr.value = 0
+
+    async def restore(self, ckpt):
+        """Puts a debug-stalled core just out of reset into checkpoint `ckpt`.
+
+        x1-x31 go through debug_reg_* (direct handles in 'direct' mode). The
+        PC, CSRs, counters, timer, GPIO and fromhost have no debug port; they
+        are deposited on a falling edge, and the caller ends the stall on
+        that same edge, so the next rising edge is the first cycle after the
+        checkpoint.
+        """
+        dut = self.dut
+        if self.mode == 'direct':
+            for i in range(1, 32):
+                dut.reg_file.registers[i].value = ckpt.x[i]
+        else:
+            await self.write_registers(ckpt.x)
+        await FallingEdge(dut.clk)
+        csr = dut.csr_inst
+        dut.pc_reg.pc_out.value = ckpt.pc
+        for name, value in ckpt.csrs.items():
+            getattr(csr, name).value = value
+        csr.mcycle.value = ckpt.counters['mcycle']
+        csr.minstret.value = ckpt.counters['minstret']
+        for k in range(3, 7):
+            csr.mhpmcounter[k].value = ckpt.counters[f'mhpmcounter{k}']
+        dut.timer_inst.mtime_reg.value = ckpt.mtime
+        dut.timer_inst.mtimecmp_reg.value = ckpt.mtimecmp
+        dut.gpio_inst.gpio_data_reg.value = ckpt.gpio_data
+        dut.gpio_inst.gpio_dir_reg.value = ckpt.gpio_dir
+        dut.fromhost.value = ckpt.fromhost
+
+
+class ToHostMonitor:
+    """Services tohost writes; wakes on host_write_enable edges only.
+
+    In console mode every write is a raw character (sw/main.c). Otherwise
+    the writes are HTIF requests served by htif.HostProxy like
+    tb_isa_test.v does: console output is collected, syscall replies are
+    written to data_memory and the fromhost mailbox on the next falling
+    edge, and the program's exit ends the test (exit(0): PASS).
+    """
+
+    def __init__(self, dut, console=False, log=None):
+        self.dut = dut
+        self.console = console
+        self.log = log
+        self.values = []
+        self.text = []
+        self.done = Event()
+        data_mem = dut.data_mem
+        self.lanes = (data_mem.mem_b0, data_mem.mem_b1, data_mem.mem_b2, data_mem.mem_b3)
+        self._replies = []
+        self.proxy = htif.HostProxy(self._read_bytes,
+                                    lambda addr, value: self._replies.append((addr, value)),
+                                    lambda value: self._replies.append((None, value)),
+                                    lambda: int(dut.csr_inst.mcycle.value),
+                                    self._write)
+
+    def _read_bytes(self, addr, n):
+        out = bytearray()
+        for a in range(addr, addr + n):
+            out.append(int(self.lanes[a & 3][(a >> 2) & 0x1FFF].value))
+        return bytes(out)
+
+    def _write(self, text):
+        self.text.append(text)
+        if '\n' in text and self.log:
+            self.log.info(''.join(self.text).rstrip('\n').rsplit('\n', 1)[-1])
+
+    async def _reply(self):
+        """Applies the proxy's writes outside the ReadOnly phase."""
+        await FallingEdge(self.dut.clk)
+        for addr, value in self._replies:
+            if addr is None:
+                self.dut.fromhost.value = value
+            else:
+                for lane, handle in enumerate(self.lanes):
+                    handle[(addr >> 2) & 0x1FFF].value = (value >> (8 * lane)) & 0xFF
+        self._replies.clear()
+
+    async def run(self):
+        dut = self.dut
+        while True:
+            await RisingEdge(dut.host_write_enable)
+            await ReadOnly()
+            if not dut.host_write_enable.value:
+                continue                                  # glitch while operands settle
+            value = int(dut.host_data_out.value)
+            self.values.append(value)
+            if self.console:
+                self._write(chr(value & 0xFF))
+                continue
+            if self.proxy.handle(value):
+                self.done.set()
+                return
+            if self._replies:
+                await self._reply()
+
+    @property
+    def verdict(self):
+        if not self.proxy.exited:
+            return None
+        value = self.proxy.exit_value
+        if value == 1:
+            return 'PASS'
+        return f"FAIL: tohost=0x{value:08x} (test case {value >> 1})"
+
+
+class Scoreboard:
+    """Batched lock-step comparison of riscv_core against scripts/iss.py.
+
+    Every `batch` cycles the RTL's PC, register file and minstret are
+    sampled; the ISS then executes until it has retired as many
+    instructions and both states are compared. ECALL/EBREAK and interrupts
+    do not retire, so when only the PC differs and the ISS is about to
+    trap, it takes that trap first. With `reference` off, only the
+    end-of-program self loop is detected. Samples are taken at the core's
+    arch_boundary, when no register write is still in flight (always in
+    S_FETCH; with PIPELINE=1 not while a result waits in writeback).
+    """
+
+    def __init__(self, dut, imem, dmem, batch=1000, reference=True, ckpt=None):
+        self.dut = dut
+        self.imem = imem
+        self.batch = batch
+        self.regs = [dut.reg_file.registers[i] for i in range(32)]
+        self.minstret = dut.csr_inst.minstret
+        self.mcycle = dut.csr_inst.mcycle
+        self.checks = 0
+        self.retired = 0
+        self.errors = []
+        self.stalled = Event()
+        self.regs_at_stall = None
+        self.iss = None
+        if reference:
+            self.iss = iss_model.Iss()
+            # The monitor owns tohost; the ISS only needs the HTIF replies
+            proxy = htif.HostProxy.for_iss(self.iss, write=lambda text: None)
+            self.iss.on_tohost = lambda value: proxy.handle(value) and False
+            if ckpt is not None:
+                ckpt.restore_iss(self.iss)
+            else:
+                self.iss.load_words(list(imem.words))
+                self.iss.dmem[:] = dmem.buf
+
+    def _iss_retired(self):
+        return self.iss.instret - self.iss.exceptions
+
+    def _iss_traps_next(self):
+        iss = self.iss
+        return iss.interrupt_cause() is not None or iss.fetch(iss.pc) in (INSN_ECALL, INSN_EBREAK)
+
+    async def settle(self):
+        """Waits (in ReadOnly) for a cycle in which sample() is consistent."""
+        await ReadOnly()
+        while not self.dut.arch_boundary.value:
+            await RisingEdge(self.dut.clk)
+            await ReadOnly()
+
+    def sample(self):
+        """Reads (pc, registers, minstret) from the RTL; call after settle()."""
+        return (int(self.dut.arch_pc.value),
+                [int(r.value) for r in self.regs],
+                int(self.minstret.value))
+
+    def check(self):
+        pc, regs, retired = self.sample()
+        self.checks += 1
+        previous, self.retired = self.retired, retired
+        if self.iss is not None:
+            iss = self.iss
+            while self._iss_retired() < retired:
+                iss.step()
+            while iss.pc != pc and self._iss_traps_next():
+                iss.step()
+            diffs = [f"pc rtl=0x{pc:08x} iss=0x{iss.pc:08x}"] if iss.pc != pc else []
+            diffs += [f"x{i} rtl=0x{regs[i]:08x} iss=0x{iss.x[i]:08x}"
+                      for i in range(1, 32) if regs[i] != iss.x[i]]
+            if diffs:
+                message = f"mismatch after {retired} instructions: " + ', '.join(diffs)
+                self.errors.append(message)
+                raise ScoreboardError(message)
+        if retired > previous and self.imem.read_word(pc) == INSN_SELF_LOOP:
+            self.regs_at_stall = regs
+            self.stalled.set()
+
+    def check_memory(self, indices=None):
+        """Compares data_memory words (default: all non-zero ISS words) with the ISS."""
+        if self.iss is None:
+            return 0
+        data_mem = self.dut.data_mem
+        lanes = (data_mem.mem_b0, data_mem.mem_b1, data_mem.mem_b2, data_mem.mem_b3)
+        iss_words = self.iss.words
+        if indices is None:
+            indices = [i for i in range(len(iss_words)) if iss_words[i]]
+        bad = []
+        for i in indices:
+            rtl = 0
+            for lane, handle in enumerate(lanes):
+                rtl |= int(handle[i].value) << (8 * lane)
+            if rtl != iss_words[i]:
+                bad.append(f"0x{i << 2:04x}: rtl=0x{rtl:08x} iss=0x{iss_words[i]:08x}")
+        if bad:
+            message = f"{len(bad)} data_memory words differ: " + ', '.join(bad[:8])
+            self.errors.append(message)
+            raise ScoreboardError(message)
+        return len(indices)
+
+    async def run(self):
+        while True:
+            await ClockCycles(self.dut.clk, self.batch)
+            await self.settle()
+            self.check()
+
+
+class DebugTarget:
+    """gdb_server target on the debug ports of a running riscv_core.
+
+    The core is halted by debug_stall at an instruction boundary: the stall
+    is requested on the falling edge of a cycle with debug_halt_ok (the
+    last cycle of an instruction or of taking a trap; with PIPELINE=1 any
+    cycle that does not redirect fetch), so the core stops with nothing
+    half done, at debug_halt_pc, and the registers, data memory and PC can
+    be changed safely. Registers move through debug_reg_* (one per clock) and
+    data memory through debug_mem_* in pipelined bursts (ProgramLoader).
+    Instruction memory and the PC have no debug port and use direct
+    handles, as program loading does.
+
+    resume() watches the boundaries on every clock only while breakpoints
+    are set; otherwise it runs `poll` cycles at a time between checks for
+    an interrupt from GDB or the program's exit.
+    """
+
+    def __init__(self, dut, loader, monitor, poll=1000):
+        self.dut = dut
+        self.loader = loader
+        self.monitor = monitor
+        self.poll = poll
+        self.imem = dut.instr_mem.mem
+
+    async def read_registers(self):
+        dut = self.dut
+        values = [0]
+        dut.debug_reg_read.value = 1
+        for i in range(1, 32):
+            await FallingEdge(dut.clk)
+            dut.debug_reg_addr.value = i
+            await ReadOnly()
+            values.append(int(dut.debug_reg_rdata.value))
+        await FallingEdge(dut.clk)
+        dut.debug_reg_read.value = 0
+        dut.debug_reg_addr.value = 0
+        return values + [int(dut.debug_pc_value.value)]
+
+    async def write_registers(self, values):
+        dut = self.dut
+        await self.loader.write_registers(values)
+        if values[32] != int(dut.debug_pc_value.value):
+            # The halted core refetches from the new PC on the next clock
+            dut.pc_reg.pc_out.value = values[32]
+
+    def _imem_word(self, i):
+        try:
+            return int(self.imem[i].value)
+        except ValueError:                                # never loaded: X
+            return 0
+
+    async def _read_words(self, span):
+        kinds = [gdb_server.region((w << 2) & gdb_server.MASK) for w in span]
+        if None in kinds:
+            return None
+        index = [w & (gdb_server.MEM_WORDS - 1) for w in span]
+        dmem = iter(await self.loader.read_words(
+            [i for i, kind in zip(index, kinds) if kind == 'dmem']))
+        return [self._imem_word(i) if kind == 'imem' else next(dmem)
+                for i, kind in zip(index, kinds)]
+
+    async def read_memory(self, addr, length):
+        values = await self._read_words(gdb_server.word_span(addr, length))
+        if values is None:
+            return None
+        off = addr & 3
+        return b''.join(v.to_bytes(4, 'little') for v in values)[off:off + length]
+
+    async def write_memory(self, addr, data):
+        span = gdb_server.word_span(addr, len(data))
+        if addr & 3 or len(data) & 3:
+            old = await self._read_words(span)            # partial words at the ends
+        else:
+            old = [0] * len(span)
+            if any(gdb_server.region((w << 2) & gdb_server.MASK) is None for w in span):
+                old = None
+        if old is None:
+            return False
+        dmem = []
+        for w, value in zip(span, gdb_server.merge_bytes(addr, data, old)):
+            i = w & (gdb_server.MEM_WORDS - 1)
+            if gdb_server.region((w << 2) & gdb_server.MASK) == 'imem':
+                self.imem[i].value = value
+            else:
+                dmem.append((i, value))
+        await self.loader.write_words(dmem)
+        return True
+
+    def _exit_code(self):
+        return self.monitor.proxy.exit_value >> 1 if self.monitor.done.is_set() else None
+
+    async def _run(self, breakpoints, interrupted, single):
+        dut = self.dut
+        await FallingEdge(dut.clk)
+        dut.debug_stall.value = 0
+        await RisingEdge(dut.clk)                         # cpu_stall drops; the core holds once more
+        stop = single
+        progressed = False                                # something retired or trapped
+        cycles = 0
+        while True:
+            if not (stop or breakpoints):
+                await First(ClockCycles(dut.clk, self.poll), self.monitor.done.wait())
+                stop = interrupted() or self.monitor.done.is_set()
+                progressed = True
+                continue
+            await FallingEdge(dut.clk)
+            progressed = progressed or bool(dut.retire_event.value or dut.trap_trigger.value)
+            if progressed and dut.debug_halt_ok.value:
+                if stop or int(dut.debug_halt_pc.value) in breakpoints:
+                    break
+            cycles += 1
+            if not stop and cycles % self.poll == 0:
+                stop = interrupted() or self.monitor.done.is_set()
+        dut.debug_stall.value = 1
+        # The instruction completes and cpu_stall rises; the pipeline then
+        # drains its writeback and rewinds fetch (the FSM just holds)
+        await ClockCycles(dut.clk, 2)
+        return self._exit_code()
+
+    async def step(self):
+        return await self._run(frozenset(), None, True)
+
+    async def resume(self, breakpoints, interrupted):
+        return await self._run(breakpoints, interrupted, False)
+
+
+class GdbBridge:
+    """Serves GDB from a thread; the target calls run in the simulator.
+
+    The server thread hands each call to run() through a queue and waits
+    for the result, so every packet costs one round trip into the
+    simulation however many words it moves. While GDB is idle run() blocks
+    the simulator: simulated time only advances when the core runs or a
+    transfer needs clock edges.
+    """
+
+    def __init__(self, target, port, log=None):
+        self.target = target
+        self.port = port
+        self.outcome = None
+        self._calls = queue.Queue()
+        self._results = queue.Queue()
+        self.server = gdb_server.GdbServer(_RemoteTarget(self._call), log)
+
+    def _call(self, name, *args):
+        self._calls.put((name, args))
+        result, error = self._results.get()
+        if error is not None:
+            raise error
+        return result
+
+    def _serve(self):
+        try:
+            self.outcome = self.server.serve(self.port)
+        finally:
+            self._calls.put((None, ()))
+
+    async def run(self):
+        """Serves one GDB session; returns how it ended."""
+        thread = threading.Thread(target=self._serve, daemon=True)
+        thread.start()
+        while True:
+            name, args = self._calls.get()
+            if name is None:
+                break
+            try:
+                self._results.put((await getattr(self.target, name)(*args), None))
+            except Exception as e:
+                self._results.put((None, e))
+        thread.join()
+        return self.outcome
+
+
+class _RemoteTarget:
+    """gdb_server's view of a target whose methods run elsewhere."""
+
+    def __init__(self, call):
+        self._call = call
+
+    def read_registers(self):
+        return self._call('read_registers')
+
+    def write_registers(self, values):
+        return self._call('write_registers', values)
+
+    def read_memory(self, addr, length):
+        return self._call('read_memory', addr, length)
+
+    def write_memory(self, addr, data):
+        return self._call('write_memory', addr, data)
+
+    def step(self):
+        return self._call('step')
+
+    def resume(self, breakpoints, interrupted):
+        return self._call('resume', breakpoints, interrupted)
+
+
+class CoreEnv:
+    """Clock, reset, program loading and checkers around one riscv_core."""
+
+    def __init__(self, dut, program, load_mode='debug', batch=1000, reference=True,
+                 console=False, image_dir=None):
+        self.dut = dut
+        self.program = program
+        self.log = dut._log
+        self.imem = Memory(path=image_dir and f"{image_dir}/imem.bin")
+        self.dmem = Memory(path=image_dir and f"{image_dir}/dmem.bin")
+        self.elf = load_program(program, self.imem, self.dmem)
+        # A <prefix>.state program resumes from a checkpoint (scripts/checkpoint.py)
+        self.checkpoint = checkpoint.Checkpoint.load(program) if program.endswith('.state') else None
+        self.loader = ProgramLoader(dut, load_mode)
+        self.monitor = ToHostMonitor(dut, console, self.log)
+        self.scoreboard = Scoreboard(dut, self.imem, self.dmem, batch, reference, self.checkpoint)
+
+    def _idle_inputs(self):
+        dut = self.dut
+        dut.ext_interrupt.value = 0
+        dut.debug_stall.value = 0
+        dut.debug_reg_addr.value = 0
+        dut.debug_reg_read.value = 0
+        dut.debug_reg_write.value = 0
+        dut.debug_reg_wdata.value = 0
+        dut.debug_mem_read.value = 0
+        dut.debug_mem_addr.value = 0
+        dut.debug_mem_write.value = 0
+        dut.debug_mem_wdata.value = 0
+        dut.debug_mem_wstrb.value = 0
+
+    async def start(self, halted=False):
+        """Loads the program under reset, then releases the core (restoring a checkpoint).
+
+        With `halted`, the core stays debug-stalled at its first instruction
+        (for DebugTarget).
+        """
+        dut = self.dut
+        cocotb.start_soon(Clock(dut.clk, 10, units='ns').start())
+        dut.rst.value = 1
+        self._idle_inputs()
+        # Let the memories' own initial blocks (data_memory zero fill) run first
+        await Timer(1, units='ns')
+        imem_words, dmem_words = await self.loader.load(self.imem, self.dmem)
+        self.log.info(f"loaded {self.program}: {imem_words} instruction words, "
+                      f"{dmem_words} data words ({self.loader.mode})")
+        await ClockCycles(dut.clk, 2)
+        await FallingEdge(dut.clk)
+        if self.checkpoint or halted:
+            # Keep the core in S_FETCH while the checkpoint state goes in
+            dut.debug_stall.value = 1
+            dut.cpu_stall.value = 1
+        dut.rst.value = 0
+        if self.checkpoint:
+            await self.loader.restore(self.checkpoint)
+            self.log.info(f"restored checkpoint: pc 0x{self.checkpoint.pc:08x}, "
+                          f"mtime {self.checkpoint.mtime}, "
+                          f"{self.checkpoint.counters['minstret']} instructions retired")
+            if not halted:
+                dut.cpu_stall.value = 0
+                dut.debug_stall.value = 0
+        cocotb.start_soon(self.monitor.run())
+        cocotb.start_soon(self.scoreboard.run())
+
+    def close(self):
+        self.imem.close()
+        self.dmem.close()
@@ -0,0 +1,111 @@
+"""cocotb tests for riscv_core.
+
+Environment variables (set by tb/uvm/Makefile):
+    PROGRAM     ELF, .mem or .bin to run (default: rv32ui-p-add), or a
+                <prefix>.state checkpoint to resume (scripts/checkpoint.py)
+    MAX_CYCLES  cycle limit (default 100000, like tb_isa_test.v)
+    BATCH       cycles between scoreboard checks (default 1000)
+    LOAD        data memory load path: debug (debug_mem_* port) or direct
+    REFERENCE   0 disables the scripts/iss.py comparison
+    CONSOLE     1: tohost writes are raw console characters (sw/main.c) instead
+                of HTIF requests (scripts/htif.py); run to MAX_CYCLES
+    IMAGE_DIR   back the memory model with mmap'd files in this directory
+    GDB_PORT    instead of running PROGRAM, hold the core at its first
+                instruction and serve GDB on this port (scripts/gdb_server.py)
+"""
+import os
+import random
+
+import cocotb
+from cocotb.triggers import ClockCycles, First, RisingEdge
+
+from memory_model import Memory
+from riscv_env import CoreEnv, DebugTarget, GdbBridge, ProgramLoader
+
+REPO = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+DEFAULT_PROGRAM = os.path.join(REPO, 'tests', 'isa', 'generated', 'rv32ui-p-add')
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name) or default)
+
+
+@cocotb.test(skip=bool(os.environ.get('GDB_PORT')))
+async def run_program(dut):
+    """Runs PROGRAM to its tohost verdict, checked against the ISS in batches."""
+    console = _env_int('CONSOLE', 0) != 0
+    max_cycles = _env_int('MAX_CYCLES', 100000)
+    env = CoreEnv(dut, os.environ.get('PROGRAM') or DEFAULT_PROGRAM,
+                  load_mode=os.environ.get('LOAD') or 'debug',
+                  batch=_env_int('BATCH', 1000),
+                  reference=_env_int('REFERENCE', 1) != 0,
+                  console=console,
+                  image_dir=os.environ.get('IMAGE_DIR') or None)
+    try:
+        await env.start()
+        scoreboard, monitor = env.scoreboard, env.monitor
+        await First(monitor.done.wait(), scoreboard.stalled.wait(), ClockCycles(dut.clk, max_cycles))
+
+        # Let the final instruction retire, then compare once more
+        await RisingEdge(dut.clk)
+        await scoreboard.settle()
+        scoreboard.check()
+        words = scoreboard.check_memory()
+        cycles = int(scoreboard.mcycle.value)
+        dut._log.info(f"{scoreboard.retired} instructions in {cycles} cycles, "
+                      f"{scoreboard.checks} scoreboard checks, {words} data words compared")
+
+        if monitor.text:
+            dut._log.info(f"console output:\n{''.join(monitor.text)}")
+        if console:
+            return
+        if monitor.verdict is not None:
+            verdict = monitor.verdict
+        elif scoreboard.stalled.is_set():
+            regs = scoreboard.regs_at_stall
+            verdict = 'PASS' if regs[26] == 1 and regs[27] == 1 else \
+                f"FAIL: PC stalled, x26={regs[26]}, x27={regs[27]}"
+        else:
+            verdict = f"FAIL: Timeout after {max_cycles} cycles"
+        dut._log.info(verdict)
+        assert verdict == 'PASS', verdict
+    finally:
+        env.close()
+
+
+@cocotb.test()
+async def debug_port_bulk_transfer(dut):
+    """Writes a random block through debug_mem_* and reads it back."""
+    env = CoreEnv(dut, os.environ.get('PROGRAM') or DEFAULT_PROGRAM, reference=False)
+    try:
+        await env.start()
+        dut.debug_stall.value = 1
+        loader = ProgramLoader(dut)
+        rng = random.Random(1)
+        expected = Memory()
+        base = 0x1800
+        expected.write_words(base, (rng.getrandbits(32) for _ in range(256)))
+        await loader.write_words(expected.populated())
+        values = await loader.read_words(range(base, base + 256))
+        bad = [i for i, v in zip(range(base, base + 256), values) if v != expected.words[i]]
+        assert not bad, f"{len(bad)} words differ, first at word 0x{bad[0]:x}"
+        dut.debug_stall.value = 0
+        expected.close()
+    finally:
+        env.close()
+
+
+@cocotb.test(skip=not os.environ.get('GDB_PORT'))
+async def gdb_session(dut):
+    """Serves GDB on GDB_PORT over the debug ports until it detaches."""
+    env = CoreEnv(dut, os.environ.get('PROGRAM') or DEFAULT_PROGRAM, reference=False,
+                  console=_env_int('CONSOLE', 0) != 0)
+    try:
+        await env.start(halted=True)
+        target = DebugTarget(dut, env.loader, env.monitor)
+        outcome = await GdbBridge(target, _env_int('GDB_PORT', 3333), dut._log.info).run()
+        dut._log.info(f"GDB session {outcome} at {int(dut.csr_inst.mcycle.value)} cycles")
+        if env.monitor.text:
+            dut._log.info(f"console output:\n{''.join(env.monitor.text)}")
+    finally:
+        env.close()